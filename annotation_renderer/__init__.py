@@ -0,0 +1,5 @@
+"""Annotation renderer package initialization."""
+from .annotation_renderer import AnnotationRenderer
+from .sprite_cache import SpriteCache
+
+__all__ = ['AnnotationRenderer', 'SpriteCache']
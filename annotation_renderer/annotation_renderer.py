@@ -0,0 +1,178 @@
+"""Parallel single-pass rendering of all annotation overlays."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import get_foot_position
+from .sprite_cache import SpriteCache, blit
+
+
+class AnnotationRenderer:
+    """
+    Draw every overlay layer onto frames using a thread pool.
+
+    Replaces chaining Tracker.draw_annotations, draw_camera_movement and
+    draw_speed_and_distance: each frame is visited once, drawn in place
+    (no frame.copy()), and frames are yielded in their original order.
+    OpenCV drawing releases the GIL, so workers scale across cores.
+
+    By default ellipse arcs, ID badges and triangles are copied from a
+    SpriteCache instead of being rasterized per frame. Speed/distance
+    labels change every estimator window and the camera panel every frame,
+    so text is always drawn directly.
+    """
+
+    def __init__(self, workers=None, max_in_flight=None, use_sprites=True):
+        """
+        Initialize annotation renderer.
+
+        Args:
+            workers: Thread pool size (defaults to the CPU count)
+            max_in_flight: Frames submitted ahead of the consumer; bounds memory
+            use_sprites: Blit cached sprites instead of rasterizing each overlay
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.sprites = SpriteCache() if use_sprites else None
+
+    def put_text(self, frame, text, org, scale, thickness, line_step=0):
+        """Draw black text; a tuple of lines is placed line_step pixels apart."""
+        lines = text if isinstance(text, tuple) else (text,)
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (org[0], org[1] + i * line_step),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness)
+
+    # ------------------- LAYERS -------------------
+
+    @staticmethod
+    def _color(color):
+        return tuple(int(c) for c in color)
+
+    def draw_ellipse(self, frame, bbox, color, tid=None):
+        y2 = int(bbox[3])
+        x = int((bbox[0]+bbox[2])/2)
+        w = int(bbox[2]-bbox[0])
+
+        if self.sprites is not None and w > 0:
+            blit(frame, self.sprites.ellipse_arc(w), x, y2, color)
+        else:
+            cv2.ellipse(frame, (x, y2), (w, int(0.35*w)), 0, -45, 235, color, 2)
+
+        if tid is not None:
+            if self.sprites is not None:
+                blit(frame, self.sprites.badge(tid, color), x, y2)
+                return
+            cv2.rectangle(frame, (x-20, y2+5), (x+20, y2+25), color, -1)
+            self.put_text(frame, str(tid), (x-10, y2+20), 0.6, 2)
+
+    def draw_triangle(self, frame, bbox, color):
+        y = int(bbox[1])
+        x = int((bbox[0]+bbox[2]) / 2)
+        if self.sprites is not None:
+            blit(frame, self.sprites.triangle(color), x, y)
+            return
+        pts = np.array([[x, y], [x-12, y-22], [x+12, y-22]])
+        cv2.drawContours(frame, [pts], 0, color, -1)
+        cv2.drawContours(frame, [pts], 0, (0,0,0), 2)
+
+    def draw_camera_panel(self, frame, movement):
+        roi = frame[0:100, 0:500]
+        overlay = roi.copy()
+        cv2.rectangle(overlay, (0, 0), (roi.shape[1], roi.shape[0]), (255, 255, 255), -1)
+
+        alpha = 0.6
+        cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0, roi)
+
+        x_movement, y_movement = movement
+        self.put_text(frame, (f"Camera Movement X: {x_movement:.2f}",
+                              f"Camera Movement Y: {y_movement:.2f}"), (10, 30), 1, 3, line_step=30)
+
+    def draw_speed_and_distance(self, frame, track_info):
+        speed = track_info.get('speed')
+        distance = track_info.get('distance')
+        if speed is None or distance is None:
+            return
+
+        x, y = get_foot_position(track_info['bbox'])
+        y += 40
+        self.put_text(frame, (f"{speed:.2f} km/h", f"{distance:.2f} m"), (x, y), 0.5, 2, line_step=20)
+
+    # ------------------- SINGLE FRAME -------------------
+
+    def draw_frame(self, frame, frame_num, tracks, ball_owner, camera_movement):
+        """
+        Apply all overlay layers to one frame in place.
+
+        Args:
+            frame: Decoded frame (modified in place)
+            frame_num: Index into tracks/ball_owner/camera_movement
+            tracks: Dictionary of tracks
+            ball_owner: Per-frame id of the player owning the ball (-1 for none)
+            camera_movement: Per-frame camera movement, or None to skip the panel
+
+        Returns:
+            The same frame
+        """
+        owner_pid = ball_owner[frame_num] if frame_num < len(ball_owner) else -1
+        players = tracks["players"][frame_num]
+
+        # Players (ellipse + id, owner triangle)
+        for pid, pdata in players.items():
+            color = self._color(pdata.get("team_color", (0, 0, 255)))
+            self.draw_ellipse(frame, pdata["bbox"], color, pid)
+
+            if pid == owner_pid:
+                self.draw_triangle(frame, pdata["bbox"], (0, 0, 255))
+
+        # Referees
+        for _, ref in tracks["referees"][frame_num].items():
+            self.draw_ellipse(frame, ref["bbox"], (0, 255, 255))
+
+        # Ball
+        for _, ball in tracks["ball"][frame_num].items():
+            self.draw_triangle(frame, ball["bbox"], (0, 255, 0))
+
+        # Camera panel
+        if camera_movement is not None and frame_num < len(camera_movement):
+            self.draw_camera_panel(frame, camera_movement[frame_num])
+
+        # Speed / distance labels
+        for pdata in players.values():
+            self.draw_speed_and_distance(frame, pdata)
+
+        return frame
+
+    # ------------------- PARALLEL ORDERED RENDER -------------------
+
+    def render(self, frames, tracks, ball_owner, camera_movement=None):
+        """
+        Render frames on the worker pool, yielding them in original order.
+
+        At most max_in_flight frames are queued ahead of the consumer, so
+        the encoder can pull frames as a stream.
+
+        Args:
+            frames: Iterable of decoded frames (drawn in place)
+            tracks: Dictionary of tracks
+            ball_owner: Per-frame ball owner ids
+            camera_movement: Optional per-frame camera movement
+
+        Yields:
+            Annotated frames in input order
+        """
+        n = len(tracks["players"])
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for frame_num, frame in enumerate(frames):
+                if frame_num >= n:
+                    break
+                pending.append(pool.submit(self.draw_frame, frame, frame_num,
+                                           tracks, ball_owner, camera_movement))
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
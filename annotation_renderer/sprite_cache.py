@@ -0,0 +1,181 @@
+"""Pre-rasterized overlay sprites blitted onto frames with one or two OpenCV calls."""
+from collections import OrderedDict
+import threading
+import cv2
+import numpy as np
+
+
+class Sprite:
+    """
+    A pre-rendered BGR patch with its 8-bit coverage mask.
+
+    Shapes drawn with OpenCV's default LINE_8 have binary coverage, so a
+    single masked cv2.copyTo reproduces the drawing call exactly. Text is
+    anti-aliased by some OpenCV builds; such sprites are blended instead,
+    ``out = roi * (255 - a) / 255 + premultiplied patch``, with a multiply
+    by the inverted coverage and an add. Sprites drawn in one color keep a
+    patch per color instead of a BGR patch.
+    """
+
+    __slots__ = ("mask", "ox", "oy", "bgr", "inv", "_patches")
+
+    def __init__(self, mask, ox, oy, bgr=None):
+        self.mask = mask
+        self.ox = ox
+        self.oy = oy
+        self.inv = None
+        if ((mask > 0) & (mask < 255)).any():
+            self.inv = cv2.merge([255 - mask] * 3)
+            if bgr is not None:
+                bgr = self._premultiply(bgr)
+        self.bgr = bgr
+        self._patches = {}
+
+    def _premultiply(self, bgr):
+        a = self.mask[..., None].astype(np.float32) / 255.0
+        return np.round(bgr * a).astype(np.uint8)
+
+    def patch(self, color):
+        if self.bgr is not None:
+            return self.bgr
+        p = self._patches.get(color)
+        if p is None:
+            p = np.empty(self.mask.shape + (3,), dtype=np.uint8)
+            p[:] = color
+            if self.inv is not None:
+                p = self._premultiply(p)
+            self._patches[color] = p
+        return p
+
+
+def blit(frame, sprite, x, y, color=None):
+    """
+    Draw a sprite into ``frame`` at its anchor, clipped to the frame.
+
+    Args:
+        frame: Target frame (modified in place)
+        sprite: Sprite to draw
+        x: Frame column of the sprite's anchor
+        y: Frame row of the sprite's anchor
+        color: BGR color tuple of ints (ignored for multi-colored sprites)
+    """
+    x -= sprite.ox
+    y -= sprite.oy
+    h, w = sprite.mask.shape
+    fh, fw = frame.shape[:2]
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = min(x + w, fw), min(y + h, fh)
+    if x1 >= x2 or y1 >= y2:
+        return
+
+    roi = frame[y1:y2, x1:x2]
+    sy, sx = slice(y1 - y, y2 - y), slice(x1 - x, x2 - x)
+    patch = sprite.patch(color)[sy, sx]
+    if sprite.inv is None:
+        cv2.copyTo(patch, sprite.mask[sy, sx], roi)
+        return
+    cv2.multiply(roi, sprite.inv[sy, sx], dst=roi, scale=1.0 / 255)
+    cv2.add(roi, patch, dst=roi)
+
+
+def _crop(mask, ox, oy, bgr=None):
+    """Crop a rasterized canvas to its drawn pixels; return a Sprite anchored at (ox, oy)."""
+    x, y, w, h = cv2.boundingRect(mask)
+    if bgr is not None:
+        bgr = bgr[y:y + h, x:x + w].copy()
+    return Sprite(mask[y:y + h, x:x + w].copy(), ox - x, oy - y, bgr)
+
+
+class SpriteCache:
+    """
+    Cache of the pre-rasterized overlays that repeat across frames.
+
+    Ellipse arcs depend only on the bbox width, marker triangles only on
+    their color, and a player's ID badge (filled box plus track ID) only on
+    the ID and team color, so each is rasterized once by OpenCV itself at
+    an integer anchor. A blitted sprite matches the direct drawing calls
+    (up to stray pixels where OpenCV clips a stroke against the frame
+    border). Badges are kept in a bounded LRU. Safe to share between
+    render threads.
+    """
+
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+    def __init__(self, max_badges=4096):
+        """
+        Initialize sprite cache.
+
+        Args:
+            max_badges: Maximum number of ID badges kept in the LRU
+        """
+        self.max_badges = max_badges
+        self._badges = OrderedDict()
+        self._shapes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def badge(self, tid, color):
+        """
+        Return the Sprite of a player's ID badge anchored at the ellipse center.
+
+        The badge is the filled box below the ellipse with the black track ID
+        on top, drawn as one multi-colored patch.
+        """
+        key = (tid, color)
+        try:
+            sprite = self._badges[key]
+            self._badges.move_to_end(key)
+            self.hits += 1
+            return sprite
+        except KeyError:
+            self.misses += 1
+
+        text = str(tid)
+        (tw, _), base = cv2.getTextSize(text, self.FONT, 0.6, 2)
+        pad = 4
+        ox, oy = 20 + pad, pad
+        mask = np.zeros((oy + 25 + base + pad, ox + max(20, tw) + pad + 1), dtype=np.uint8)
+        bgr = np.zeros(mask.shape + (3,), dtype=np.uint8)
+        cv2.rectangle(mask, (ox - 20, oy + 5), (ox + 20, oy + 25), 255, -1)
+        cv2.rectangle(bgr, (ox - 20, oy + 5), (ox + 20, oy + 25), color, -1)
+        cv2.putText(mask, text, (ox - 10, oy + 20), self.FONT, 0.6, 255, 2)
+        cv2.putText(bgr, text, (ox - 10, oy + 20), self.FONT, 0.6, (0, 0, 0), 2)
+        sprite = _crop(mask, ox, oy, bgr)
+
+        with self._lock:
+            self._badges[key] = sprite
+            if len(self._badges) > self.max_badges:
+                self._badges.popitem(last=False)
+        return sprite
+
+    def ellipse_arc(self, width):
+        """Return the Sprite of the player ellipse arc for a bbox width, anchored at its center."""
+        key = ("ellipse", width)
+        s = self._shapes.get(key)
+        if s is None:
+            a, b = width, int(0.35 * width)
+            pad = 4
+            canvas = np.zeros((2 * b + 2 * pad + 1, 2 * a + 2 * pad + 1), dtype=np.uint8)
+            cv2.ellipse(canvas, (a + pad, b + pad), (a, b), 0, -45, 235, 255, 2)
+            s = _crop(canvas, a + pad, b + pad)
+            self._shapes[key] = s
+        return s
+
+    def triangle(self, color):
+        """Return the Sprite of the filled, black-outlined marker triangle anchored at its tip."""
+        key = ("triangle", color)
+        s = self._shapes.get(key)
+        if s is None:
+            pad = 4
+            tip = (12 + pad, 22 + pad)
+            pts = np.array([[tip[0], tip[1]], [tip[0]-12, tip[1]-22], [tip[0]+12, tip[1]-22]])
+            mask = np.zeros((22 + 2 * pad + 1, 24 + 2 * pad + 1), dtype=np.uint8)
+            bgr = np.zeros(mask.shape + (3,), dtype=np.uint8)
+            cv2.drawContours(mask, [pts], 0, 255, -1)
+            cv2.drawContours(mask, [pts], 0, 255, 2)
+            cv2.drawContours(bgr, [pts], 0, color, -1)
+            cv2.drawContours(bgr, [pts], 0, (0, 0, 0), 2)
+            s = _crop(mask, *tip, bgr)
+            self._shapes[key] = s
+        return s
@@ -1,15 +1,136 @@
 # app.py
 import os
-import json
-from flask import Flask, render_template, request, url_for, send_file, send_from_directory, redirect
-from process_pipeline import process_video
-from utils.pdf_report import generate_pdf_report
+import threading
+from flask import Flask, Response, render_template, request, url_for, send_file, send_from_directory, redirect, jsonify
+from process_pipeline import process_video, render_deferred, render_clip, hls_dir_for
+from utils.pdf_report import cached_pdf_report, REPORT_FIELDS
+from utils.analysis_store import load_analysis
+from utils.bounded_cache import BoundedCache
+from match_events import EventIndex, EVENT_KINDS
+from utils.metrics import REGISTRY, CONTENT_TYPE
 
 app = Flask(__name__, static_folder="static")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "input_videos")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# One lock per output file so concurrent requests never render the same video twice
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+
+def _render_lock(name):
+    with _render_locks_guard:
+        return _render_locks.setdefault(name, threading.Lock())
+
+# Web-side metrics; the pipeline registers its own in process_pipeline
+QUEUE_DEPTH = REGISTRY.gauge("app_queue_depth", "Requests waiting for a render of the same output to finish")
+BACKGROUND_JOBS = REGISTRY.gauge("app_background_jobs", "Background (progressive/preview) jobs by state", ["state"])
+HTTP_REQUESTS = REGISTRY.counter("app_http_requests_total", "HTTP requests served", ["endpoint", "status"])
+
+
+def _locked_render(name, render, *args, **kwargs):
+    """Run render(*args, **kwargs) under the output's lock, counting requests queued behind it."""
+    lock = _render_lock(name)
+    with QUEUE_DEPTH.track_inprogress():
+        lock.acquire()
+    try:
+        return render(*args, **kwargs)
+    finally:
+        lock.release()
+
+# Progressive jobs run in the background: name of the processed video -> state
+_jobs = {}
+_jobs_guard = threading.Lock()
+
+
+def _start_job(name, save_path):
+    with _jobs_guard:
+        if _jobs.get(name, {}).get("state") != "running":
+            _jobs[name] = {"state": "running", "analysis": None}
+            threading.Thread(target=_run_job, args=(name, save_path), daemon=True).start()
+
+
+def _run_job(name, save_path):
+    try:
+        # Holds the output's lock while encoding, so no deferred render of it starts meanwhile
+        analysis = _locked_render(f"{name}.mp4", process_video, save_path, progressive=True)
+    except Exception:
+        analysis = None
+    with _jobs_guard:
+        _jobs[name] = {"state": "done" if analysis else "failed", "analysis": analysis}
+    if analysis:
+        _build_report(name)
+
+# PDF reports of recent analyses, keyed by (path, mtime): (pdf path, report key)
+_reports = BoundedCache(max_size=64)
+_reports_guard = threading.Lock()
+
+
+def _report(base):
+    """Path and key of the analysis's PDF report, generated if its inputs changed."""
+    json_path = os.path.join(app.static_folder, "output_videos", f"analysis_{base}.json")
+    if not os.path.exists(json_path):
+        return None
+    key = (json_path, os.stat(json_path).st_mtime_ns)
+    with _reports_guard:
+        report = _reports.get(key)
+    if report is None or not os.path.exists(report[0]):
+        # Only the summary fields the report uses; per-frame data stays on disk
+        analysis_data = load_analysis(json_path, fields=REPORT_FIELDS)
+        report = _locked_render(f"report_{base}", cached_pdf_report, analysis_data, base)
+        with _reports_guard:
+            _reports[key] = report
+    return report
+
+
+def _build_report(base):
+    try:
+        _report(base)
+    except Exception:
+        app.logger.exception("Building the report of %s failed", base)
+
+
+def _start_report(analysis):
+    """Build the PDF report in the background so the first download is served at once."""
+    base = os.path.splitext(analysis["processed_filename"])[0]
+    threading.Thread(target=_build_report, args=(base,), daemon=True).start()
+
+@app.after_request
+def count_request(response):
+    HTTP_REQUESTS.labels(request.endpoint or "unknown", response.status_code).inc()
+    return response
+
+# Prometheus scrape endpoint: job/stage/cache metrics of this process
+@app.route("/metrics")
+def metrics():
+    with _jobs_guard:
+        states = [job["state"] for job in _jobs.values()]
+    for state in ("running", "done", "failed"):
+        BACKGROUND_JOBS.labels(state).set(states.count(state))
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+# Event indexes of recent analyses, keyed by (path, mtime) so a rerun is picked up
+_event_indexes = BoundedCache(max_size=16)
+_event_indexes_guard = threading.Lock()
+
+
+def _event_index(base):
+    json_path = os.path.join(app.static_folder, "output_videos", f"analysis_{base}.json")
+    if not os.path.exists(json_path):
+        return None
+    key = (json_path, os.path.getmtime(json_path))
+    with _event_indexes_guard:
+        index = _event_indexes.get(key)
+    if index is None:
+        data = load_analysis(json_path, fields=("events",)).get("events")
+        if data is None:
+            return None
+        index = EventIndex.from_dict(data)
+        with _event_indexes_guard:
+            _event_indexes[key] = index
+    return index
+
 # Handle favicon.ico requests (browsers often request this at root)
 @app.route('/favicon.ico')
 def favicon():
@@ -37,40 +158,161 @@ def upload():
     save_path = os.path.join(UPLOAD_DIR, file.filename)
     file.save(save_path)
 
-    # Process video (this is blocking — may take time)
-    analysis = process_video(save_path)
-    if not analysis:
-        return "Processing failed", 500
+    # Analytics-only: skip rendering, the video is drawn when first requested
+    analytics_only = request.form.get("analytics_only") in ("1", "on", "true")
+
+    # Chart data: skip drawing the PNGs, the page renders the charts from /charts/<base>
+    charts = "data" if request.form.get("chart_data") in ("1", "on", "true") else "png"
+
+    # Progressive: process in the background and answer with an HLS playlist
+    # that starts playing as soon as its first segment is encoded
+    stem = os.path.splitext(file.filename)[0]
+    name = f"processed_{stem}"
+    if request.form.get("progressive") in ("1", "on", "true") and not analytics_only:
+        _start_job(name, save_path)
+        return jsonify({
+            "playlist_url": url_for("hls", name=name, filename="index.m3u8"),
+            "status_url": url_for("job_status", name=name),
+        }), 202
+
+    # Preview: show a fast low-resolution pass now, the full job follows in the background
+    full_status_url = None
+    if request.form.get("preview") in ("1", "on", "true"):
+        analysis = _locked_render(f"preview_{stem}.mp4", process_video, save_path, preview=True,
+                                  charts=charts)
+        if not analysis:
+            return "Processing failed", 500
+        _start_job(name, save_path)
+        full_status_url = url_for("job_status", name=name)
+    else:
+        # Process video (this is blocking — may take time)
+        analysis = _locked_render(f"{name}.mp4", process_video, save_path,
+                                  render_video=not analytics_only, charts=charts)
+        if not analysis:
+            return "Processing failed", 500
+        _start_report(analysis)
 
     # Build static URLs for template
-    video_url = url_for("static", filename=f"output_videos/{analysis['processed_filename']}")
+    if analysis.get("video_deferred"):
+        video_url = url_for("output_videos", filename=analysis["processed_filename"])
+    else:
+        video_url = url_for("static", filename=f"output_videos/{analysis['processed_filename']}")
     json_rel = analysis.get("analysis_json", "")
     json_url = None
     if json_rel:
         json_url = url_for("static", filename=f"output_videos/{json_rel}")
 
-    return render_template("result.html", video_url=video_url, analysis=analysis, analysis_json_url=json_url)
+    return render_template("result.html", video_url=video_url, analysis=analysis, analysis_json_url=json_url,
+                           full_status_url=full_status_url)
 
-# Download generated PDF report by base name
+# Download the PDF report by base name; built in the background when the analysis
+# finished, regenerated only when its inputs change, and revalidated by ETag
 @app.route("/download_report/<base>")
 def download_report(base):
-    json_path = os.path.join(app.static_folder, "output_videos", f"analysis_{base}.json")
-    if not os.path.exists(json_path):
+    report = _report(base)
+    if report is None:
         return "Report not found", 404
-
-    with open(json_path, "r", encoding="utf-8") as f:
-        analysis_data = json.load(f)
-
-    pdf_path = generate_pdf_report(analysis_data, base)
+    pdf_path, key = report
     if not os.path.exists(pdf_path):
         return "Failed to create PDF", 500
 
-    return send_file(pdf_path, as_attachment=True)
+    response = send_file(os.path.abspath(pdf_path), as_attachment=True, download_name=f"report_{base}.pdf",
+                         etag=key, conditional=True, max_age=0)
+    response.cache_control.no_cache = True
+    return response
 
-# Convenience route to serve any output video
+# Convenience route to serve any output video; deferred videos are rendered on first request
 @app.route("/output_videos/<path:filename>")
 def output_videos(filename):
-    return send_from_directory(os.path.join(app.static_folder, "output_videos"), filename)
+    out_dir = os.path.join(app.static_folder, "output_videos")
+    if filename.endswith(".mp4") and not os.path.exists(os.path.join(out_dir, filename)):
+        # A background job still encoding this output writes it itself
+        name = os.path.splitext(filename)[0]
+        with _jobs_guard:
+            running = _jobs.get(name, {}).get("state") == "running"
+        if running:
+            return jsonify({"state": "running", "status_url": url_for("job_status", name=name)}), 202
+        # Behind a blocking upload of the same output this waits for it to finish;
+        # render_deferred then finds the video instead of encoding it again
+        _locked_render(filename, render_deferred, filename)
+    return send_from_directory(out_dir, filename)
+
+# Progressive job state; once done it links the final MP4 and the analysis JSON
+@app.route("/status/<name>")
+def job_status(name):
+    with _jobs_guard:
+        job = _jobs.get(name)
+    if job is None:
+        return jsonify({"state": "unknown"}), 404
+
+    payload = {"state": job["state"]}
+    analysis = job["analysis"]
+    if analysis:
+        payload["video_url"] = url_for("static", filename=f"output_videos/{analysis['processed_filename']}")
+        if analysis.get("analysis_json"):
+            payload["analysis_json_url"] = url_for("static", filename=f"output_videos/{analysis['analysis_json']}")
+    return jsonify(payload)
+
+# HLS playlist and segments of a progressive job, e.g. /hls/processed_x/index.m3u8.
+# send_from_directory answers Range requests (206) for the segments.
+@app.route("/hls/<name>/<path:filename>")
+def hls(name, filename):
+    hls_dir = hls_dir_for(os.path.join(app.static_folder, "output_videos", f"{name}.mp4"))
+    if filename.endswith(".m3u8"):
+        # The playlist grows while encoding, so players must always refetch it
+        response = send_from_directory(hls_dir, filename, mimetype="application/vnd.apple.mpegurl",
+                                       conditional=True, max_age=0)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return send_from_directory(hls_dir, filename, mimetype="video/mp2t", conditional=True)
+
+# Render only a time range of an analysed video, e.g. /render_clip/processed_x.mp4?start=60&end=90
+@app.route("/render_clip/<path:filename>")
+def render_clip_route(filename):
+    start = request.args.get("start", type=float)
+    end = request.args.get("end", type=float)
+    if start is None or end is None or end <= start:
+        return "start and end (seconds) are required", 400
+
+    clip_path = _locked_render(f"{filename}:{start}:{end}", render_clip, filename, start, end)
+    if not clip_path:
+        return "Clip not available", 404
+
+    return send_from_directory(os.path.dirname(clip_path), os.path.basename(clip_path))
+
+# Query passes, turnovers and possessions of an analysed video, e.g.
+# /events/processed_x?kind=turnover&team=2&start=1800&end=2700 or /events/processed_x?kind=possession&player=7
+@app.route("/events/<base>")
+def events(base):
+    index = _event_index(base)
+    if index is None:
+        return jsonify({"error": "No events for this analysis"}), 404
+
+    kind = request.args.get("kind") or None
+    if kind not in (None, "possession") + EVENT_KINDS:
+        return jsonify({"error": f"kind must be one of possession, {', '.join(EVENT_KINDS)}"}), 400
+    filters = {
+        "team": request.args.get("team", type=int),
+        "player": request.args.get("player", type=int),
+        "start": request.args.get("start", type=float),
+        "end": request.args.get("end", type=float),
+    }
+    if kind == "possession":
+        results = index.possessions_of(**filters)
+    else:
+        results = index.query(kind=kind, **filters)
+    return jsonify({"count": len(results), "results": results})
+
+# Chart inputs (speed curves, distances, possession spans, radar, heatmaps) for client-side rendering
+@app.route("/charts/<base>")
+def chart_data(base):
+    json_path = os.path.join(app.static_folder, "output_videos", f"analysis_{base}.json")
+    if not os.path.exists(json_path):
+        return jsonify({"error": "Analysis not found"}), 404
+    data = load_analysis(json_path, fields=("charts",)).get("charts")
+    if data is None:
+        return jsonify({"error": "No chart data for this analysis"}), 404
+    return jsonify(data)
 
 if __name__ == "__main__":
     app.run(debug=True, threaded=True)
@@ -0,0 +1,221 @@
+"""
+Per-stage pipeline benchmark on a synthetic match video, without model weights.
+
+Runs the stages of process_video in order (with detection and ByteTrack
+timed separately) and reports, per stage, wall time, throughput,
+per-frame latency and peak traced memory. Results can be saved as a
+baseline and later runs compared against it.
+
+Usage:
+    python -m benchmarks.bench_pipeline --seconds 10 --width 1280 --height 720
+    python -m benchmarks.bench_pipeline --save-baseline
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import sys
+sys.path.append('../')
+import process_pipeline as pp
+from trackers import Tracker
+from utils.video_utils import get_video_info
+from .synthetic import make_synthetic_match, FakeDetector
+
+STAGES = ["decode", "detect", "track", "camera", "identify", "kinematics",
+          "possession", "series", "heatmaps", "chart_data", "render", "encode", "charts"]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class StageTimer:
+    """Times named blocks and records their peak traced memory."""
+
+    def __init__(self, n_frames, trace_memory=True):
+        self.n_frames = max(1, n_frames)
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            value = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if self.trace_memory:
+                tracemalloc.stop()
+        self.results[name] = {
+            "seconds": round(elapsed, 4),
+            "fps": round(self.n_frames / elapsed, 1) if elapsed > 0 else None,
+            "ms_per_frame": round(elapsed / self.n_frames * 1000, 3),
+            "peak_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+        }
+        return value
+
+
+def _detect(model, frames, batch_size=32):
+    detections = []
+    for i in range(0, len(frames), batch_size):
+        detections.extend(model.predict(frames[i:i + batch_size], conf=0.1, verbose=False))
+    return detections
+
+
+def _track(model, detections, total_frames):
+    # Same steps as _stage_track, on precomputed detections
+    tracker = Tracker(model)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for det in detections:
+        for k, v in tracker.update(det).items():
+            tracks[k].append(v)
+    tracker.add_position_to_tracks(tracks)
+    for k in tracks:
+        del tracks[k][total_frames:]
+        tracks[k].extend({} for _ in range(total_frames - len(tracks[k])))
+    return tracks
+
+
+def run(seconds=10, width=1280, height=720, fps=25, players=22, seed=0, trace_memory=True,
+        work_dir=None):
+    """
+    Benchmark every pipeline stage on a freshly generated synthetic match.
+
+    Returns:
+        Dict with the run settings and per-stage results
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="bench_pipeline_")
+    video = make_synthetic_match(os.path.join(work_dir, "synthetic.mp4"), seconds, width, height,
+                                 fps, players, seed=seed)
+    info = get_video_info(video["path"])
+    total_frames = info["total_frames"]
+    params = pp.DEFAULT_PARAMS
+    model = FakeDetector()
+    timer = StageTimer(total_frames, trace_memory)
+    base = f"bench_{os.getpid()}"
+    charts = {}
+
+    try:
+        frames = timer.run("decode", pp._stage_decode, video["path"], **params["frames"])
+        detections = timer.run("detect", _detect, model, frames)
+        tracks = timer.run("track", _track, model, detections, total_frames)
+        cam = timer.run("camera", pp._stage_camera, frames,
+                        params["calibration"]["profile"], **params["camera"])
+        tracks = timer.run("identify", pp._stage_identify, frames, tracks, fps, width, **params["stitch"])
+        tracks = timer.run("kinematics", pp._stage_kinematics, tracks, cam,
+                           **dict(params["kinematics"], frame_rate=fps), frame_size=(width, height),
+                           profile=params["calibration"]["profile"])
+        possession = timer.run("possession", pp._stage_possession, tracks, **params["possession"])
+        series = timer.run("series", pp._stage_series, tracks)
+        heatmaps = timer.run("heatmaps", pp._stage_heatmaps, series, fps, total_frames,
+                             params["calibration"]["profile"], **params["heatmaps"])
+        chart_data = timer.run("chart_data", pp._stage_chart_data, series, possession, heatmaps)
+        # Render is a lazy generator; drain it so drawing is timed on its own
+        annotated = timer.run("render", lambda: list(pp._stage_render(frames, tracks, possession, cam)))
+        timer.run("encode", pp._stage_encode, annotated, os.path.join(work_dir, "annotated.mp4"), fps,
+                  expected_frames=total_frames, **{k: v for k, v in params["encode"].items() if k != "hls"})
+        # Uncached so every run draws; in the pipeline this overlaps encoding
+        charts = timer.run("charts", lambda: pp.ChartBatch(chart_data, pp.chart_paths(base),
+                                                           **params["charts"]).result())
+    finally:
+        for path in charts.values():
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total = sum(r["seconds"] for r in timer.results.values())
+    return {
+        "settings": {"seconds": seconds, "width": width, "height": height, "fps": fps,
+                     "players": players, "frames": total_frames, "trace_memory": trace_memory},
+        "stages": timer.results,
+        "total_seconds": round(total, 3),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare a run against a baseline.
+
+    Args:
+        results: run() output
+        baseline: Earlier run() output (ideally with the same settings)
+        tolerance: Allowed relative slowdown / memory growth before flagging
+
+    Returns:
+        List of (stage, metric, baseline value, current value, relative change)
+        for every metric worse than the tolerance
+    """
+    regressions = []
+    for stage, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append((stage, metric, old, new, round(change, 3)))
+    return regressions
+
+
+def _print_table(results, baseline=None):
+    settings = results["settings"]
+    print(f"{settings['frames']} frames at {settings['width']}x{settings['height']}")
+    print(f"{'stage':<11} {'seconds':>8} {'fps':>9} {'ms/frame':>9} {'peak MB':>8} {'vs base':>8}")
+    for stage in STAGES:
+        r = results["stages"].get(stage)
+        if r is None:
+            continue
+        delta = ""
+        old = (baseline or {}).get("stages", {}).get(stage, {}).get("seconds")
+        if old:
+            delta = f"{(r['seconds'] - old) / old:+.0%}"
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+        print(f"{stage:<11} {r['seconds']:>8.3f} {r['fps'] or 0:>9.1f} {r['ms_per_frame']:>9.2f} {peak:>8} {delta:>8}")
+    print(f"{'total':<11} {results['total_seconds']:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on a synthetic match.")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (lower overhead)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    res = run(args.seconds, args.width, args.height, args.fps, args.players, args.seed,
+              trace_memory=not args.no_memory)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_table(res, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline is not None:
+        if baseline.get("settings") != res["settings"]:
+            print("Note: baseline was recorded with different settings")
+        regressions = compare(res, baseline, args.tolerance)
+        for stage, metric, old, new, change in regressions:
+            print(f"REGRESSION {stage} {metric}: {old} -> {new} ({change:+.0%})")
+        sys.exit(1 if regressions else 0)
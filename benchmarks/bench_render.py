@@ -0,0 +1,93 @@
+"""
+Rendering benchmark: sprite-cache overlays vs. per-frame OpenCV rasterization.
+
+Usage:
+    python -m benchmarks.bench_render --frames 250 --players 22 --workers 1
+"""
+import argparse
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from annotation_renderer import AnnotationRenderer
+
+
+def make_synthetic_tracks(n_frames, n_players=22, width=1920, height=1080, frame_window=5, seed=0):
+    """
+    Build tracks shaped like the pipeline's: players drifting across the
+    pitch, speed/distance labels held for frame_window frames (as
+    SpeedAndDistanceEstimator writes them), one referee and a ball.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform([50, 250], [width - 100, height - 150], size=(n_players, 2))
+    vel = rng.normal(0, 2, size=(n_players, 2))
+    colors = [(255, 0, 0), (0, 255, 0)]
+    distance = np.zeros(n_players)
+    speed = np.zeros(n_players)
+
+    tracks = {"players": [], "referees": [], "ball": []}
+    for fi in range(n_frames):
+        pos += vel
+        pos[:, 0] = np.clip(pos[:, 0], 0, width - 60)
+        pos[:, 1] = np.clip(pos[:, 1], 150, height - 100)
+        if fi % frame_window == 0:
+            speed = rng.uniform(0, 30, n_players)
+            distance += speed / 3.6 * frame_window / 24
+
+        players = {}
+        for p in range(n_players):
+            x, y = pos[p]
+            players[p + 1] = {
+                "bbox": [x, y, x + 40, y + 90],
+                "team_color": colors[p % 2],
+                "speed": float(speed[p]),
+                "distance": float(distance[p]),
+            }
+        tracks["players"].append(players)
+        tracks["referees"].append({99: {"bbox": [900, 500, 940, 590]}})
+        bx, by = pos[fi % n_players]
+        tracks["ball"].append({1: {"bbox": [bx + 40, by + 80, bx + 50, by + 90]}})
+    return tracks
+
+
+def run(n_frames=250, n_players=22, workers=1, width=1920, height=1080, seed=0):
+    """
+    Time both render paths on identical synthetic input.
+
+    Returns:
+        Dict with seconds and frames/s per path plus the ID-badge hit rate
+    """
+    rng = np.random.default_rng(seed)
+    base = (rng.random((height, width, 3)) * 255).astype(np.uint8)
+    tracks = make_synthetic_tracks(n_frames, n_players, width, height, seed=seed)
+    owner = [(fi % n_players) + 1 for fi in range(n_frames)]
+    cam = rng.normal(0, 2, size=(n_frames, 2)).tolist()
+
+    results = {}
+    for name, use_sprites in (("opencv", False), ("sprites", True)):
+        renderer = AnnotationRenderer(workers=workers, use_sprites=use_sprites)
+        frames = [base.copy() for _ in range(n_frames)]
+        start = time.perf_counter()
+        for _ in renderer.render(frames, tracks, owner, cam):
+            pass
+        elapsed = time.perf_counter() - start
+        results[name] = {"seconds": round(elapsed, 4), "fps": round(n_frames / elapsed, 1)}
+        if renderer.sprites is not None:
+            total = renderer.sprites.hits + renderer.sprites.misses
+            results[name]["badge_hit_rate"] = round(renderer.sprites.hits / max(total, 1), 3)
+
+    results["speedup"] = round(results["opencv"]["seconds"] / results["sprites"]["seconds"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark overlay rendering paths.")
+    parser.add_argument("--frames", type=int, default=250)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    res = run(args.frames, args.players, args.workers)
+    for name in ("opencv", "sprites"):
+        print(f"{name:<8} {res[name]['seconds']:.3f}s  {res[name]['fps']:.1f} fps")
+    print(f"badge hit rate {res['sprites']['badge_hit_rate']:.1%}  speedup x{res['speedup']}")
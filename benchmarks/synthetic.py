@@ -0,0 +1,197 @@
+"""
+Synthetic match videos and a deterministic stand-in for the YOLO detector.
+
+The video shows a striped green pitch wider than the frame, seen by a
+panning camera, with players of two teams, a referee and a ball. Each
+object class is painted in its own flat color, which is what lets
+FakeDetector find the objects again by color, without model weights.
+"""
+import os
+import cv2
+import numpy as np
+
+CLASS_NAMES = {0: "ball", 1: "goalkeeper", 2: "player", 3: "referee"}
+
+# BGR paint colors per detectable part
+TEAM_COLORS = [(40, 40, 220), (220, 120, 30)]     # red shirts, blue shirts
+REFEREE_COLOR = (0, 230, 255)                     # yellow
+BALL_COLOR = (200, 0, 200)                        # magenta
+SHORTS_COLOR = (20, 20, 20)
+
+
+def _pitch(width, height, rng):
+    """Striped, textured pitch with white lines, wide enough for the camera pan."""
+    world = np.zeros((height, width, 3), dtype=np.uint8)
+    stripe = max(8, width // 16)
+    for i, x in enumerate(range(0, width, stripe)):
+        world[:, x:x + stripe] = (40, 140, 50) if i % 2 else (35, 120, 45)
+    # Grass texture gives the optical flow features to lock on to
+    noise = rng.integers(-18, 18, size=(height, width, 1), dtype=np.int16)
+    world = np.clip(world.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    world = cv2.GaussianBlur(world, (3, 3), 0)
+    line = max(2, height // 200)
+    cv2.rectangle(world, (width // 20, height // 10), (width - width // 20, height - height // 20),
+                  (235, 235, 235), line)
+    cv2.line(world, (width // 2, height // 10), (width // 2, height - height // 20), (235, 235, 235), line)
+    cv2.circle(world, (width // 2, height // 2), height // 6, (235, 235, 235), line)
+    return world
+
+
+def make_synthetic_match(path, seconds=10, width=1280, height=720, fps=25, players=22,
+                         pan=0.15, seed=0):
+    """
+    Write a synthetic match video.
+
+    Args:
+        path: Output .mp4 path
+        seconds: Length of the clip
+        width: Frame width
+        height: Frame height
+        fps: Frame rate
+        players: Number of players (split between two teams)
+        pan: Camera pan amplitude as a fraction of the frame width
+        seed: Random seed; the same arguments always produce the same video
+
+    Returns:
+        Dict with path, frames, width, height and fps
+    """
+    rng = np.random.default_rng(seed)
+    n_frames = int(round(seconds * fps))
+    world_w = int(width * (1 + 2 * pan))
+    world = _pitch(world_w, height, rng)
+
+    ph = max(12, int(height * 0.07))                  # player height
+    pw = max(6, ph * 2 // 5)
+    ball_r = max(3, ph // 10)
+
+    n = players + 1                                    # + referee
+    pos = rng.uniform([pw, height * 0.25], [world_w - 2 * pw, height - ph - 10], size=(n, 2))
+    vel = rng.normal(0, width / 600, size=(n, 2))
+    colors = [TEAM_COLORS[i % 2] for i in range(players)] + [REFEREE_COLOR]
+    carrier = 0
+    ball = pos[carrier] + (pw, ph)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for fi in range(n_frames):
+            vel += rng.normal(0, width / 6000, size=vel.shape)
+            vel = np.clip(vel, -width / 250, width / 250)
+            pos += vel
+            lo, hi = (pw, height * 0.2), (world_w - 2 * pw, height - ph - 10)
+            bounce = (pos < lo) | (pos > hi)
+            vel[bounce] *= -1
+            pos = np.clip(pos, lo, hi)
+
+            # Pass the ball to another player every two seconds
+            if fi % max(1, int(2 * fps)) == 0:
+                carrier = int(rng.integers(players))
+            target = pos[carrier] + (pw, ph)
+            ball += (target - ball) * 0.3
+
+            offset = int(pan * width * (1 - np.cos(2 * np.pi * fi / max(1, n_frames))))
+            frame = world[:, offset:offset + width].copy()
+            for (x, y), color in zip(pos - (offset, 0), colors):
+                x, y = int(x), int(y)
+                cv2.rectangle(frame, (x, y), (x + pw, y + ph * 3 // 5), color, -1)
+                cv2.rectangle(frame, (x, y + ph * 3 // 5), (x + pw, y + ph), SHORTS_COLOR, -1)
+            bx, by = int(ball[0] - offset), int(ball[1])
+            cv2.circle(frame, (bx, by), ball_r, BALL_COLOR, -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    return {"path": path, "frames": n_frames, "width": width, "height": height, "fps": fps}
+
+
+# ------------------- FAKE DETECTOR -------------------
+
+class _Array:
+    """Minimal torch-tensor stand-in: .cpu(), .numpy() and .int() as supervision calls them."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+    def int(self):
+        return _Array(self.values.astype(np.int64))
+
+    def __len__(self):
+        return len(self.values)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+        self.cls = _Array(cls)
+        self.id = None
+        self.data = _Array(np.column_stack([xyxy, conf, cls]) if len(xyxy) else np.zeros((0, 6)))
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class FakeResult:
+    """Detection result shaped like ultralytics' Results for sv.Detections.from_ultralytics."""
+
+    def __init__(self, xyxy, conf, cls):
+        self.names = dict(CLASS_NAMES)
+        self.boxes = _Boxes(xyxy, conf, cls)
+        self.masks = None
+        self.obb = None
+        self.keypoints = None
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class FakeDetector:
+    """
+    Deterministic detector for synthetic match videos, with YOLO's predict() interface.
+
+    Objects are found as connected components of their paint color, so the
+    same frame always gives the same detections and no model weights are
+    needed. Cost is a few color thresholds per frame, far below a real
+    model's, which keeps the benchmark focused on the pipeline itself.
+    """
+
+    def __init__(self, tolerance=50, min_area=6):
+        self.names = dict(CLASS_NAMES)
+        self.tolerance = tolerance
+        self.min_area = min_area
+
+    def _components(self, frame, color):
+        lo = np.clip(np.array(color) - self.tolerance, 0, 255).astype(np.uint8)
+        hi = np.clip(np.array(color) + self.tolerance, 0, 255).astype(np.uint8)
+        mask = cv2.inRange(frame, lo, hi)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        return [stats[i] for i in range(1, n) if stats[i][cv2.CC_STAT_AREA] >= self.min_area]
+
+    def detect(self, frame):
+        boxes, classes = [], []
+        for color, cls_id in [(c, 2) for c in TEAM_COLORS] + [(REFEREE_COLOR, 3)]:
+            for x, y, w, h, _ in self._components(frame, color):
+                # The shirt is the top 3/5 of the player; pad so the box shows some grass
+                full_h = h * 5 / 3
+                pad = max(2, w // 3)
+                boxes.append([x - pad, y - pad, x + w + pad, y + full_h + pad])
+                classes.append(cls_id)
+        balls = self._components(frame, BALL_COLOR)
+        if balls:
+            x, y, w, h, _ = max(balls, key=lambda s: s[cv2.CC_STAT_AREA])
+            boxes.append([x, y, x + w, y + h])
+            classes.append(0)
+
+        xyxy = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        return FakeResult(xyxy, np.full(len(xyxy), 0.9, dtype=np.float32), np.array(classes, dtype=np.float32))
+
+    def predict(self, frames, conf=0.1, verbose=False, **kwargs):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        return [self.detect(frame) for frame in frames]
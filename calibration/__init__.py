@@ -0,0 +1,18 @@
+"""Calibration package initialization."""
+from .calibration import (
+    CalibrationProfile,
+    DEFAULT_PROFILE,
+    get_profile,
+    load_profile,
+    register_profile,
+    save_profile
+)
+
+__all__ = [
+    'CalibrationProfile',
+    'DEFAULT_PROFILE',
+    'get_profile',
+    'load_profile',
+    'register_profile',
+    'save_profile'
+]
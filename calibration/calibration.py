@@ -0,0 +1,178 @@
+"""Per-camera pitch and feature-mask geometry in resolution-independent form."""
+import json
+import os
+import cv2
+import numpy as np
+
+
+class CalibrationProfile:
+    """
+    Geometry of one camera/venue setup, stored in normalized coordinates.
+
+    Pitch corners and feature-mask columns are fractions of the frame width
+    and height, so one profile serves any working resolution. The
+    normalized-pixel -> meters homography is computed once per profile;
+    per-resolution matrices and masks are derived from it on demand and
+    cached, so stages running at different resolutions share a profile.
+    """
+
+    def __init__(self, name, pitch_corners, pitch_size, mask_columns, min_camera_movement):
+        """
+        Initialize calibration profile.
+
+        Args:
+            name: Profile name
+            pitch_corners: Four (x, y) pitch-area corners as fractions of the
+                frame size, in the order of the target vertices
+            pitch_size: (width, length) of the calibrated pitch area in meters
+            mask_columns: (start, end) column ranges, as fractions of the frame
+                width, where camera-motion features are tracked
+            min_camera_movement: Movement threshold as a fraction of the frame width
+        """
+        self.name = name
+        self.pitch_corners = np.array(pitch_corners, dtype=np.float64)
+        self.pitch_size = tuple(pitch_size)
+        self.mask_columns = [tuple(c) for c in mask_columns]
+        self.min_camera_movement = min_camera_movement
+
+        court_width, court_length = self.pitch_size
+        self.target_vertices = np.array([
+            [0, court_width],
+            [0, 0],
+            [court_length, 0],
+            [court_length, court_width]
+        ], dtype=np.float32)
+
+        self.normalized_homography = cv2.getPerspectiveTransform(
+            self.pitch_corners.astype(np.float32), self.target_vertices).astype(np.float64)
+        self._homographies = {}
+        self._masks = {}
+
+    @classmethod
+    def from_pixels(cls, name, pixel_corners, frame_size, pitch_size, mask_columns, min_camera_movement):
+        """Build a profile from pixel measurements taken on frames of frame_size (width, height)."""
+        w, h = frame_size
+        return cls(
+            name,
+            [(x / w, y / h) for x, y in pixel_corners],
+            pitch_size,
+            [(a / w, b / w) for a, b in mask_columns],
+            min_camera_movement / w,
+        )
+
+    # ------------------- RESOLUTION-SPECIFIC GEOMETRY -------------------
+
+    def pixel_vertices(self, frame_size):
+        """Pitch corners in pixels for frames of frame_size (width, height)."""
+        w, h = frame_size
+        return (self.pitch_corners * (w, h)).astype(np.float32)
+
+    def homography(self, frame_size):
+        """Pixel -> meters perspective matrix for frames of frame_size (width, height)."""
+        key = tuple(int(v) for v in frame_size)
+        m = self._homographies.get(key)
+        if m is None:
+            w, h = key
+            m = self.normalized_homography @ np.diag([1.0 / w, 1.0 / h, 1.0])
+            self._homographies[key] = m
+        return m
+
+    def feature_mask(self, frame_size):
+        """uint8 mask of the camera-motion feature columns (1 = track features there)."""
+        key = tuple(int(v) for v in frame_size)
+        mask = self._masks.get(key)
+        if mask is None:
+            w, h = key
+            mask = np.zeros((h, w), dtype=np.uint8)
+            for a, b in self.mask_columns:
+                mask[:, int(round(a * w)):int(round(b * w))] = 1
+            self._masks[key] = mask
+        return mask
+
+    def min_movement(self, frame_size):
+        """Camera movement threshold in pixels for frames of frame_size (width, height)."""
+        return self.min_camera_movement * frame_size[0]
+
+    # ------------------- SERIALIZATION -------------------
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "pitch_corners": self.pitch_corners.tolist(),
+            "pitch_size": list(self.pitch_size),
+            "mask_columns": [list(c) for c in self.mask_columns],
+            "min_camera_movement": self.min_camera_movement,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data["pitch_corners"], data["pitch_size"],
+                   data["mask_columns"], data["min_camera_movement"])
+
+
+# The original hardcoded setup, measured on 1920x1080 broadcast footage
+DEFAULT_PROFILE = CalibrationProfile.from_pixels(
+    "default",
+    pixel_corners=[(110, 1035), (265, 275), (910, 260), (1640, 915)],
+    frame_size=(1920, 1080),
+    pitch_size=(68, 23.32),
+    mask_columns=[(0, 20), (900, 1050)],
+    min_camera_movement=5,
+)
+
+_profiles = {"default": DEFAULT_PROFILE}
+
+# Profiles loaded from calibration/profiles/: name -> (path, mtime) they were read at
+_profile_files = {}
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+
+def register_profile(profile):
+    """Make a profile available to get_profile() by name."""
+    _profiles[profile.name] = profile
+    return profile
+
+
+def load_profile(path):
+    """Load and register a profile saved as JSON (see CalibrationProfile.to_dict)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return register_profile(CalibrationProfile.from_dict(json.load(f)))
+
+
+def save_profile(profile, path=None):
+    """Save a profile as JSON (defaults to calibration/profiles/<name>.json)."""
+    path = path or os.path.join(PROFILE_DIR, f"{profile.name}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+    return path
+
+
+def get_profile(profile=None):
+    """
+    Resolve a profile.
+
+    Args:
+        profile: CalibrationProfile, its to_dict() form, registered name, or
+            None for the default. Unknown names are looked up in
+            calibration/profiles/<name>.json (reloaded when the file changes).
+
+    Returns:
+        CalibrationProfile
+    """
+    if isinstance(profile, CalibrationProfile):
+        return profile
+    if isinstance(profile, dict):
+        return CalibrationProfile.from_dict(profile)
+    name = profile or "default"
+    path = os.path.join(PROFILE_DIR, f"{name}.json")
+    if name in _profile_files and os.path.exists(path) and os.path.getmtime(path) != _profile_files[name][1]:
+        # The saved profile was edited since it was loaded
+        del _profiles[name]
+    if name not in _profiles:
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown calibration profile: {name}")
+        load_profile(path)
+        _profile_files[name] = (path, os.path.getmtime(path))
+    return _profiles[name]
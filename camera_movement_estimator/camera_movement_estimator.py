@@ -3,19 +3,29 @@ import cv2
 import numpy as np
 import pickle
 import os
+import sys
+sys.path.append('../')
+from utils.checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+from calibration import get_profile
 
 
 class CameraMovementEstimator:
     """Estimate camera movement between frames using optical flow."""
     
-    def __init__(self, frame):
+    def __init__(self, frame, profile=None, working_scale=1.0):
         """
         Initialize camera movement estimator.
         
         Args:
             frame: First video frame
+            profile: CalibrationProfile or profile name providing the
+                feature mask and movement threshold
+            working_scale: Resolution, relative to the frames, at which
+                optical flow runs (e.g. 0.5); movements are still reported
+                in frame pixels
         """
-        self.minimum_distance = 5
+        self.profile = get_profile(profile)
+        self.working_scale = working_scale
         
         self.lk_params = dict(
             winSize=(15, 15),
@@ -23,20 +33,83 @@ class CameraMovementEstimator:
             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
         )
         
-        first_frame_grayscale = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        mask_features = np.zeros_like(first_frame_grayscale)
-        mask_features[:, 0:20] = 1
-        mask_features[:, 900:1050] = 1
+        first_frame_grayscale = self._gray(frame)
+        working_size = first_frame_grayscale.shape[::-1]
+        self.minimum_distance = self.profile.min_movement(working_size)
         
         self.features = dict(
             maxCorners=100,
             qualityLevel=0.3,
             minDistance=3,
             blockSize=7,
-            mask=mask_features
+            mask=self.profile.feature_mask(working_size)
         )
     
-    def add_adjust_positions_to_tracks(self, tracks, camera_movement_per_frame):
+    def _gray(self, frame):
+        """Grayscale frame at the working resolution."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.working_scale != 1.0:
+            h, w = gray.shape
+            size = (max(1, int(w * self.working_scale)), max(1, int(h * self.working_scale)))
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return gray
+    
+    def _measure(self, old_gray, old_features, frame_gray):
+        """
+        Camera movement between two consecutive working-resolution frames.
+        
+        Returns:
+            ([dx, dy] in frame pixels, features to track from frame_gray on)
+        """
+        if old_features is None:
+            # Nothing to track in a featureless frame; look again in this one
+            return [0, 0], cv2.goodFeaturesToTrack(frame_gray, **self.features)
+        
+        new_features, status, error = cv2.calcOpticalFlowPyrLK(old_gray, frame_gray, old_features, None, **self.lk_params)
+        
+        max_distance = 0
+        camera_movement_x, camera_movement_y = 0, 0
+        
+        if new_features is not None and old_features is not None:
+            for i, (new, old) in enumerate(zip(new_features, old_features)):
+                new_features_point = new.ravel()
+                old_features_point = old.ravel()
+                
+                distance = abs(new_features_point[0] - old_features_point[0]) + abs(new_features_point[1] - old_features_point[1])
+                
+                if distance > max_distance:
+                    max_distance = distance
+                    camera_movement_x, camera_movement_y = new_features_point[0] - old_features_point[0], new_features_point[1] - old_features_point[1]
+        
+        if max_distance > self.minimum_distance:
+            movement = [camera_movement_x / self.working_scale, camera_movement_y / self.working_scale]
+            return movement, cv2.goodFeaturesToTrack(frame_gray, **self.features)
+        return [0, 0], old_features
+    
+    def update(self, frame):
+        """
+        Incremental estimation for live streams: movement of one new frame.
+        
+        The first call only initializes the optical-flow state and returns
+        [0, 0], like the first entry of get_camera_movement().
+        
+        Args:
+            frame: Next video frame
+            
+        Returns:
+            [dx, dy] camera movement relative to the previous frame
+        """
+        frame_gray = self._gray(frame)
+        if getattr(self, "_old_gray", None) is None:
+            self._old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
+            movement = [0, 0]
+        else:
+            movement, self._old_features = self._measure(self._old_gray, self._old_features, frame_gray)
+        self._old_gray = frame_gray
+        return movement
+    
+    @staticmethod
+    def add_adjust_positions_to_tracks(tracks, camera_movement_per_frame):
         """
         Adjust track positions based on camera movement.
         
@@ -57,14 +130,22 @@ class CameraMovementEstimator:
         
         return tracks
     
-    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None):
+    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None,
+                            checkpoint_path=None, checkpoint_interval=500):
         """
         Get camera movement for each frame.
         
+        With a checkpoint_path, the movements computed so far together with
+        the optical-flow state (previous grayscale frame and tracked features)
+        are saved every checkpoint_interval frames, and a restarted run skips
+        straight to the last checkpointed frame.
+        
         Args:
             frames: List or generator of video frames
             read_from_stub: Whether to read from cached stub
             stub_path: Path to stub file
+            checkpoint_path: Optional checkpoint file for crash-safe resume
+            checkpoint_interval: Frames between checkpoints
             
         Returns:
             List of camera movements per frame
@@ -83,41 +164,40 @@ class CameraMovementEstimator:
             first_frame = next(iterator)
         except StopIteration:
             return []
-            
-        camera_movement.append([0, 0])
-        
-        old_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
         
-        for frame_num, frame in enumerate(iterator, start=1):
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            new_features, status, error = cv2.calcOpticalFlowPyrLK(old_gray, frame_gray, old_features, None, **self.lk_params)
-            
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0, 0
+        state = load_checkpoint(checkpoint_path)
+        if state is not None:
+            camera_movement = state["camera_movement"]
+            old_gray = state["old_gray"]
+            old_features = state["old_features"]
+            # Skip frames already accounted for by the checkpoint
+            for _ in range(state["frame_index"] - 1):
+                next(iterator, None)
+        else:
+            camera_movement.append([0, 0])
             
-            if new_features is not None and old_features is not None:
-                for i, (new, old) in enumerate(zip(new_features, old_features)):
-                    new_features_point = new.ravel()
-                    old_features_point = old.ravel()
-                    
-                    distance = abs(new_features_point[0] - old_features_point[0]) + abs(new_features_point[1] - old_features_point[1])
-                    
-                    if distance > max_distance:
-                        max_distance = distance
-                        camera_movement_x, camera_movement_y = new_features_point[0] - old_features_point[0], new_features_point[1] - old_features_point[1]
-            
-            if max_distance > self.minimum_distance:
-                camera_movement.append([camera_movement_x, camera_movement_y])
-                old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
-            else:
-                camera_movement.append([0, 0])
+            old_gray = self._gray(first_frame)
+            old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
+        
+        for frame_num, frame in enumerate(iterator, start=len(camera_movement)):
+            frame_gray = self._gray(frame)
+            movement, old_features = self._measure(old_gray, old_features, frame_gray)
+            camera_movement.append(movement)
             
             old_gray = frame_gray.copy()
+            
+            if checkpoint_path and (frame_num + 1) % checkpoint_interval == 0:
+                save_checkpoint(checkpoint_path, {
+                    "frame_index": frame_num + 1,
+                    "camera_movement": camera_movement,
+                    "old_gray": old_gray,
+                    "old_features": old_features,
+                })
         
         if stub_path is not None:
             with open(stub_path, 'wb') as f:
                 pickle.dump(camera_movement, f)
+        clear_checkpoint(checkpoint_path)
         
         return camera_movement
     
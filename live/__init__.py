@@ -0,0 +1,5 @@
+"""Live analysis package initialization."""
+from .frame_source import FrameSource
+from .live_analyzer import LatencyStats, LiveAnalyzer
+
+__all__ = ['FrameSource', 'LatencyStats', 'LiveAnalyzer']
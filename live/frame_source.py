@@ -0,0 +1,107 @@
+"""Live frame source that always hands out the newest frame."""
+import os
+import threading
+import time
+import cv2
+
+
+class FrameSource:
+    """
+    Threaded reader for a camera/RTSP URL or a local video file.
+
+    A background thread reads frames into a single slot; a frame that is
+    replaced before the consumer picks it up is dropped, so a slow consumer
+    always works on the newest frame instead of falling further behind.
+    Local files are throttled to their frame rate to stand in for a live feed.
+    """
+
+    def __init__(self, source, realtime=None, fps=None):
+        """
+        Initialize frame source.
+
+        Args:
+            source: Video file path, stream URL (e.g. rtsp://...) or camera index
+            realtime: Throttle reading to fps (defaults to True for local files)
+            fps: Override the stream's reported frame rate
+        """
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open video source: {source}")
+
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 25
+        self.realtime = os.path.isfile(str(source)) if realtime is None else realtime
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        self.frames_read = 0
+        self.dropped = 0
+
+        self._latest = None
+        self._ended = False
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+        return self
+
+    def _reader(self):
+        t0 = time.perf_counter()
+        index = 0
+        while not self._stop:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            if self.realtime:
+                # Release each frame at its presentation time, like a camera would
+                delay = t0 + index / self.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            with self._cond:
+                if self._latest is not None:
+                    self.dropped += 1
+                self._latest = (index, time.perf_counter(), frame)
+                self.frames_read += 1
+                self._cond.notify()
+            index += 1
+
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+        self.cap.release()
+
+    def read(self, timeout=None):
+        """
+        Wait for the newest unread frame.
+
+        Returns:
+            (frame_index, arrival_time, frame), or None once the source has
+            ended (or nothing arrived within timeout)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._latest is not None or self._ended, timeout):
+                return None
+            item, self._latest = self._latest, None
+            return item
+
+    @property
+    def ended(self):
+        """True once the stream has ended (or was stopped) and every frame was handed out."""
+        with self._cond:
+            return self._ended and self._latest is None
+
+    def stop(self):
+        self._stop = True
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
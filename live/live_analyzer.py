@@ -0,0 +1,348 @@
+"""
+Real-time analysis of a live stream with bounded end-to-end latency.
+
+Usage:
+    python -m live.live_analyzer input_videos/match.mp4 --target-latency 0.25
+    python -m live.live_analyzer rtsp://camera/stream --max-seconds 600 --show
+"""
+import argparse
+import json
+import time
+from collections import deque
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+from trackers import Tracker
+from camera_movement_estimator import CameraMovementEstimator
+from view_transformer import ViewTransformer
+from team_assigner import TeamAssigner
+from player_ball_assigner import PlayerBallAssigner
+from track_stitcher import TrackStitcher
+from utils import get_foot_position, measure_distance, BallTrajectoryFilter, BoundedCache
+from .frame_source import FrameSource
+
+
+class LatencyStats:
+    """Recent end-to-end latencies with percentile summaries."""
+
+    def __init__(self, window=2000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self, qs=(50, 90, 99)):
+        """Latency percentiles in milliseconds over the recent window."""
+        if not self.samples:
+            return {f"p{q}": None for q in qs}
+        values = np.percentile(np.fromiter(self.samples, dtype=float), qs) * 1000
+        return {f"p{q}": round(float(v), 1) for q, v in zip(qs, values)}
+
+
+class LiveAnalyzer:
+    """
+    Online, causal counterpart of the offline pipeline.
+
+    Every stage only looks at the past: ByteTrack runs frame by frame,
+    camera motion is estimated incrementally, speed is measured over a
+    trailing time window, a lost ball is extrapolated by a causal
+    BallTrajectoryFilter for a short gap, and possession is a rolling share.
+    Fragmented track IDs are merged by a TrackStitcher and per-player state
+    lives in bounded caches, so memory stays flat on open-ended streams.
+
+    Latency is held near target_latency in two ways. The FrameSource drops
+    frames that were replaced before being picked up, and detection is run
+    only every detect_stride-th frame. The stride grows while latency is
+    above target and shrinks once there is headroom; frames in between
+    reuse the last tracks.
+    """
+
+    def __init__(self, model_path=None, frame_size=(1920, 1080), fps=25, profile=None,
+                 target_latency=0.25, max_detect_stride=4, speed_window=1.0,
+                 possession_window=60.0, ball_hold=0.5, max_player_ball_distance=70,
+                 imgsz=None, tracker=None, track_ttl=30.0):
+        """
+        Initialize live analyzer.
+
+        Args:
+            model_path: YOLO model path (ignored when a tracker is given)
+            frame_size: (width, height) of the incoming frames
+            fps: Stream frame rate, used to timestamp frames by index
+            profile: Calibration profile or name
+            target_latency: End-to-end latency budget in seconds
+            max_detect_stride: Upper bound for running detection every n-th frame
+            speed_window: Trailing window (s) over which speed is measured
+            possession_window: Rolling window (s) for the possession share
+            ball_hold: Seconds a lost ball keeps being extrapolated
+            max_player_ball_distance: Ball ownership distance threshold in pixels
+            imgsz: Optional YOLO input size
+            tracker: Optional ready Tracker instance
+            track_ttl: Seconds an unseen player's speed history is kept
+        """
+        self.tracker = tracker or Tracker(model_path)
+        self.frame_size = tuple(frame_size)
+        self.fps = fps
+        self.profile = profile
+        self.target_latency = target_latency
+        self.max_detect_stride = max_detect_stride
+        self.speed_window = speed_window
+        self.possession_window = possession_window
+        self.imgsz = imgsz
+
+        self.view = ViewTransformer(self.frame_size, profile=profile)
+        self.camera = None
+        self.stitcher = TrackStitcher(fps=fps, frame_width=self.frame_size[0])
+        self.team_assigner = TeamAssigner(max_tracks=512)
+        self._teams_ready = False
+        self.ball_assigner = PlayerBallAssigner()
+        self.ball_assigner.max_player_ball_distance = max_player_ball_distance
+
+        self.detect_stride = 1
+        self.latency = LatencyStats()
+        self._latency_ewma = 0.0
+        self.frames_processed = 0
+        self.detections_skipped = 0
+
+        self._frame = None              # last detected {"players", "referees", "ball"}
+        self._ball = BallTrajectoryFilter(delay=0, max_predict=max(1, int(ball_hold * fps)),
+                                          hold=False)
+        # Speed history expires once a player has been unseen for track_ttl; distance
+        # totals are kept for the whole session, one per stitched identity
+        self._history = BoundedCache(512, track_ttl)    # player id -> deque of (timestamp, meters)
+        self._distance = {}                             # player id -> meters covered
+        self._possession = deque()      # (timestamp, team)
+        self._team_totals = {1: 0, 2: 0}
+        self._last_team = 0
+
+    # ------------------- PER-FRAME STAGES -------------------
+
+    def _detect(self, frame):
+        kwargs = {"imgsz": self.imgsz} if self.imgsz else {}
+        det = self.tracker.model.predict([frame], conf=0.1, verbose=False, **kwargs)[0]
+        return self.tracker.update(det)
+
+    def _assign_teams(self, frame, players):
+        if not self._teams_ready:
+            if len(players) < 2:
+                return
+            self.team_assigner.assign_team_color(frame, players)
+            self._teams_ready = True
+        for pid, pdata in players.items():
+            team = self.team_assigner.get_player_team(frame, pdata["bbox"], pid)
+            pdata["team"] = int(team)
+            pdata["team_color"] = self.team_assigner.team_colors.get(team, (0, 255, 0))
+
+    def _update_kinematics(self, players, movement, timestamp):
+        """Causal speed over the trailing speed_window and accumulated distance."""
+        if not players:
+            return
+        ids = list(players)
+        feet = np.array([get_foot_position(players[pid]["bbox"]) for pid in ids], dtype=np.float32)
+        adjusted = feet - np.asarray(movement, dtype=np.float32)
+        meters = self.view.transform_points_batch(adjusted)
+
+        for pid, pos in zip(ids, meters):
+            pos = (float(pos[0]), float(pos[1]))
+            history = self._history.get(pid) or deque()
+            self._history[pid] = history
+            if history and history[-1][0] < timestamp:
+                self._distance[pid] = self._distance.get(pid, 0.0) + measure_distance(history[-1][1], pos)
+            if not history or history[-1][0] < timestamp:
+                history.append((timestamp, pos))
+            while history and history[0][0] < timestamp - self.speed_window:
+                history.popleft()
+
+            pdata = players[pid]
+            pdata["position_transformed"] = list(pos)
+            pdata["distance"] = self._distance.get(pid, 0.0)
+            elapsed = history[-1][0] - history[0][0]
+            if elapsed > 0:
+                pdata["speed"] = measure_distance(history[0][1], history[-1][1]) / elapsed * 3.6
+            else:
+                pdata["speed"] = players[pid].get("speed", 0.0)
+
+    def _update_possession(self, players, ball, timestamp):
+        owner = self.ball_assigner.assign_ball_to_player(players, ball) if ball else -1
+        if owner != -1:
+            self._last_team = players[owner].get("team", self._last_team)
+
+        self._possession.append((timestamp, self._last_team))
+        if self._last_team in self._team_totals:
+            self._team_totals[self._last_team] += 1
+        while self._possession and self._possession[0][0] < timestamp - self.possession_window:
+            self._possession.popleft()
+
+        teams = np.fromiter((t for _, t in self._possession), dtype=np.int16)
+        share = {f"team_{t}": round(float(np.mean(teams == t) * 100), 2) for t in (1, 2)}
+        return owner, share
+
+    def _adapt(self, latency):
+        """Run detection less often while over the latency budget, more often with headroom."""
+        self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency
+        if self._latency_ewma > self.target_latency and self.detect_stride < self.max_detect_stride:
+            self.detect_stride += 1
+        elif self._latency_ewma < self.target_latency / 2 and self.detect_stride > 1:
+            self.detect_stride -= 1
+
+    def process(self, frame, frame_index, arrival_time):
+        """
+        Analyse one frame.
+
+        Args:
+            frame: BGR frame
+            frame_index: Index of the frame in the stream (for timestamps)
+            arrival_time: time.perf_counter() when the frame became available
+
+        Returns:
+            Dict with the frame's players, ball owner, rolling possession,
+            camera movement and latency
+        """
+        timestamp = frame_index / self.fps
+
+        if self.camera is None:
+            self.camera = CameraMovementEstimator(frame, profile=self.profile)
+        movement = self.camera.update(frame)
+
+        detected = self._frame is None or self.frames_processed % self.detect_stride == 0
+        if detected:
+            self._frame = self._detect(frame)
+            self._frame["players"] = self.stitcher.update(frame, frame_index, self._frame["players"])
+            self._assign_teams(frame, self._frame["players"])
+            self._update_kinematics(self._frame["players"], movement, timestamp)
+        else:
+            self.detections_skipped += 1
+        players = self._frame["players"]
+
+        # delay=0: one frame in, one frame out
+        (_, ball), = self._ball.push(self._frame["ball"].get(1, {}).get("bbox") if detected else None)
+
+        owner, share = self._update_possession(players, ball, timestamp)
+
+        self.frames_processed += 1
+        latency = time.perf_counter() - arrival_time
+        self.latency.add(latency)
+        self._adapt(latency)
+
+        return {
+            "frame": frame_index,
+            "time": round(timestamp, 3),
+            "detected": detected,
+            "players": players,
+            "referees": self._frame["referees"],
+            "ball": ball,
+            "ball_owner": owner,
+            "possession": share,
+            "camera_movement": movement,
+            "latency_ms": round(latency * 1000, 1),
+        }
+
+    # ------------------- STREAM LOOP -------------------
+
+    def run(self, source, on_frame=None, max_seconds=None, stall_timeout=60.0):
+        """
+        Consume a started FrameSource until it ends (or max_seconds of stream time).
+
+        A stream that merely stalls (network hiccup, camera reconnect) is
+        waited for; the session only ends early once no frame has arrived
+        for stall_timeout seconds.
+
+        Args:
+            source: FrameSource
+            on_frame: Optional callback(state, frame) after each processed frame
+            max_seconds: Optional stream-time limit
+            stall_timeout: Seconds without a frame before giving up (None waits forever)
+
+        Returns:
+            Summary dict (see summary())
+        """
+        poll = 5.0
+        stalled = 0.0
+        while True:
+            item = source.read(timeout=poll)
+            if item is None:
+                if source.ended:
+                    break
+                stalled += poll
+                if stall_timeout is not None and stalled >= stall_timeout:
+                    print(f"⚠️ No frame for {stalled:.0f}s, ending the session")
+                    break
+                continue
+            stalled = 0.0
+            index, arrival, frame = item
+            state = self.process(frame, index, arrival)
+            if on_frame is not None:
+                on_frame(state, frame)
+            if max_seconds is not None and state["time"] >= max_seconds:
+                break
+        return self.summary(source)
+
+    def summary(self, source=None):
+        total = sum(self._team_totals.values()) or 1
+        out = {
+            "frames_processed": self.frames_processed,
+            "detections_skipped": self.detections_skipped,
+            "detect_stride": self.detect_stride,
+            "track_ids": self.stitcher.fragments,
+            "identities": self.stitcher.fragments - self.stitcher.merged,
+            "latency_ms": self.latency.percentiles(),
+            "possession": {f"team_{t}": round(n / total * 100, 2) for t, n in self._team_totals.items()},
+            "distance": {str(pid): round(d, 2) for pid, d in self._distance.items()},
+        }
+        if source is not None:
+            out["frames_read"] = source.frames_read
+            out["frames_dropped"] = source.dropped
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live match analysis with bounded latency.")
+    parser.add_argument("source", help="Stream URL (rtsp://...) or video file played at real-time pace")
+    parser.add_argument("--model", default="models/best.pt", help="YOLO model path")
+    parser.add_argument("--profile", default=None, help="Calibration profile name")
+    parser.add_argument("--target-latency", type=float, default=0.25, help="Latency budget in seconds")
+    parser.add_argument("--imgsz", type=int, default=None, help="YOLO input size")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Stop after this much stream time")
+    parser.add_argument("--show", action="store_true", help="Display annotated frames")
+    args = parser.parse_args(argv)
+
+    source = FrameSource(args.source).start()
+    analyzer = LiveAnalyzer(args.model, frame_size=source.frame_size, fps=source.fps,
+                            profile=args.profile, target_latency=args.target_latency,
+                            imgsz=args.imgsz)
+
+    renderer = None
+    if args.show:
+        from annotation_renderer import AnnotationRenderer
+        renderer = AnnotationRenderer(workers=1)
+
+    last_report = [time.perf_counter()]
+
+    def on_frame(state, frame):
+        if renderer is not None:
+            tracks = {"players": [state["players"]], "referees": [state["referees"]],
+                      "ball": [{1: {"bbox": state["ball"]}} if state["ball"] else {}]}
+            renderer.draw_frame(frame, 0, tracks, [state["ball_owner"]], [state["camera_movement"]])
+            cv2.imshow("live", frame)
+            cv2.waitKey(1)
+        if time.perf_counter() - last_report[0] >= 5:
+            last_report[0] = time.perf_counter()
+            print(f"t={state['time']:.1f}s possession={state['possession']} "
+                  f"latency={analyzer.latency.percentiles()} stride={analyzer.detect_stride} "
+                  f"dropped={source.dropped}")
+
+    try:
+        summary = analyzer.run(source, on_frame, args.max_seconds)
+    finally:
+        source.stop()
+        if renderer is not None:
+            cv2.destroyAllWindows()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
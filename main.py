@@ -116,8 +116,9 @@ def process_video(input_path, output_path):
         team_ball_control = []
 
         for i, players in enumerate(tracks["players"]):
-            ball_bbox = tracks["ball"][i][1]["bbox"]
-            pid = pba.assign_ball_to_player(players, ball_bbox)
+            # Frames stay empty when the ball was never detected
+            ball_bbox = tracks["ball"][i].get(1, {}).get("bbox")
+            pid = pba.assign_ball_to_player(players, ball_bbox) if ball_bbox else -1
 
             if pid != -1:
                 players[pid]["has_ball"] = True
@@ -0,0 +1,4 @@
+"""Match events package initialization."""
+from .match_events import EventIndex, EVENT_KINDS
+
+__all__ = ['EventIndex', 'EVENT_KINDS']
@@ -0,0 +1,187 @@
+"""Possession events (passes, turnovers) with indexed time-range and player queries."""
+import numpy as np
+
+from utils.possession_segments import PossessionSegments
+
+EVENT_KINDS = ("pass", "turnover")
+
+
+def _group(keys):
+    """Map each key to the (sorted) positions where it occurs."""
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind="stable")
+    uniq, starts = np.unique(keys[order], return_index=True)
+    bounds = np.r_[starts, len(keys)]
+    return {int(k): order[bounds[i]:bounds[i + 1]] for i, k in enumerate(uniq)}
+
+
+class EventIndex:
+    """
+    Possessions and the owner changes between them, indexed for queries.
+
+    A possession is a run of frames owned by one player (ownership gaps
+    where the ball is unassigned do not end it). Each change of owner is
+    an event: a "pass" when both players are on the same team, a
+    "turnover" otherwise. Events and possessions are kept as columnar
+    arrays sorted by frame, with per-player and per-team position lists,
+    so a time-range query is a binary search (O(log n + k)) and a player
+    or team lookup never scans the whole match.
+    """
+
+    def __init__(self, possessions, events, fps=25):
+        """
+        Initialize event index.
+
+        Args:
+            possessions: Dict of arrays start, end (exclusive), player, team
+            events: Dict of arrays frame, kind, from_player, to_player,
+                from_team, to_team (kind holds indices into EVENT_KINDS)
+            fps: Frame rate used to report times in seconds
+        """
+        self.fps = fps
+        self.possessions = {k: np.asarray(v, dtype=np.int64) for k, v in possessions.items()}
+        self.events = {k: np.asarray(v, dtype=np.int64) for k, v in events.items()}
+
+        # Events belong to both players involved and to the team that gave the ball away
+        ev = self.events
+        players = _group(np.r_[ev["from_player"], ev["to_player"]])
+        n = len(ev["frame"])
+        self._events_by_player = {p: np.unique(idx % n) for p, idx in players.items()} if n else {}
+        self._events_by_team = _group(ev["from_team"]) if n else {}
+        pos = self.possessions
+        self._possessions_by_player = _group(pos["player"]) if len(pos["start"]) else {}
+        self._possessions_by_team = _group(pos["team"]) if len(pos["start"]) else {}
+
+    @classmethod
+    def from_possession(cls, team_ball_control, ball_owner, fps=25, min_possession_frames=3):
+        """
+        Extract possessions and events from per-frame possession arrays.
+
+        Args:
+            team_ball_control: Controlling team per frame
+            ball_owner: Ball owner track id per frame (-1 when unassigned)
+            fps: Video frame rate
+            min_possession_frames: Shorter ownership blips (usually the
+                ball passing close to another player) are ignored
+        """
+        seg = PossessionSegments.from_frames(team_ball_control, ball_owner)
+        keep = (seg.owner >= 0) & (seg.durations >= min_possession_frames)
+        start, end, team, owner = seg.start[keep], seg.end[keep], seg.team[keep], seg.owner[keep]
+
+        if len(owner):
+            # Consecutive segments of one owner (split by unassigned frames) form one possession
+            first = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+            last = np.r_[first[1:] - 1, len(owner) - 1]
+            start, end, team, owner = start[first], end[last], team[first], owner[first]
+
+        possessions = {"start": start, "end": end, "player": owner, "team": team}
+        events = {
+            "frame": start[1:],
+            "kind": (team[1:] != team[:-1]).astype(np.int64),     # 0 = pass, 1 = turnover
+            "from_player": owner[:-1],
+            "to_player": owner[1:],
+            "from_team": team[:-1],
+            "to_team": team[1:],
+        }
+        return cls(possessions, events, fps)
+
+    # ------------------- QUERIES -------------------
+
+    def _frame_range(self, frames, positions, start, end):
+        """Positions whose frame lies in [start, end) seconds, by binary search."""
+        if positions is None:
+            lo = 0 if start is None else np.searchsorted(frames, start * self.fps, side="left")
+            hi = len(frames) if end is None else np.searchsorted(frames, end * self.fps, side="left")
+            return np.arange(lo, hi)
+        sub = frames[positions]
+        lo = 0 if start is None else np.searchsorted(sub, start * self.fps, side="left")
+        hi = len(sub) if end is None else np.searchsorted(sub, end * self.fps, side="left")
+        return positions[lo:hi]
+
+    @staticmethod
+    def _intersect(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return np.intersect1d(a, b, assume_unique=True)
+
+    def query(self, kind=None, team=None, player=None, start=None, end=None):
+        """
+        Owner-change events, optionally filtered.
+
+        Args:
+            kind: "pass", "turnover" or None for every owner change
+            team: Team that had the ball before the event (e.g. team 2's turnovers)
+            player: Track id involved as passer or receiver
+            start: Range start in seconds (inclusive)
+            end: Range end in seconds (exclusive)
+
+        Returns:
+            List of event dicts sorted by time
+        """
+        positions = None
+        if player is not None:
+            positions = self._events_by_player.get(int(player), np.array([], dtype=np.int64))
+        if team is not None:
+            positions = self._intersect(positions, self._events_by_team.get(int(team), np.array([], dtype=np.int64)))
+        positions = self._frame_range(self.events["frame"], positions, start, end)
+        if kind is not None:
+            positions = positions[self.events["kind"][positions] == EVENT_KINDS.index(kind)]
+        return [self._event(i) for i in positions]
+
+    def possessions_of(self, player=None, team=None, start=None, end=None):
+        """Possessions (optionally of one player or team) starting in [start, end) seconds."""
+        positions = None
+        if player is not None:
+            positions = self._possessions_by_player.get(int(player), np.array([], dtype=np.int64))
+        if team is not None:
+            positions = self._intersect(positions, self._possessions_by_team.get(int(team), np.array([], dtype=np.int64)))
+        positions = self._frame_range(self.possessions["start"], positions, start, end)
+        return [self._possession(i) for i in positions]
+
+    def counts(self):
+        """Passes and turnovers per team (team that had the ball)."""
+        out = {}
+        for team, positions in self._events_by_team.items():
+            kinds = np.bincount(self.events["kind"][positions], minlength=len(EVENT_KINDS))
+            out[str(team)] = {k: int(kinds[i]) for i, k in enumerate(EVENT_KINDS)}
+        return out
+
+    def _event(self, i):
+        ev = self.events
+        return {
+            "time": round(ev["frame"][i] / self.fps, 2),
+            "frame": int(ev["frame"][i]),
+            "kind": EVENT_KINDS[ev["kind"][i]],
+            "from_player": int(ev["from_player"][i]),
+            "to_player": int(ev["to_player"][i]),
+            "from_team": int(ev["from_team"][i]),
+            "to_team": int(ev["to_team"][i]),
+        }
+
+    def _possession(self, i):
+        pos = self.possessions
+        return {
+            "start": round(pos["start"][i] / self.fps, 2),
+            "end": round(pos["end"][i] / self.fps, 2),
+            "player": int(pos["player"][i]),
+            "team": int(pos["team"][i]),
+        }
+
+    # ------------------- SERIALIZATION -------------------
+
+    def __len__(self):
+        return len(self.events["frame"])
+
+    def to_dict(self):
+        """Columnar, JSON-serialisable form (see from_dict)."""
+        return {
+            "fps": self.fps,
+            "possessions": {k: v.tolist() for k, v in self.possessions.items()},
+            "events": {k: v.tolist() for k, v in self.events.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["possessions"], data["events"], data.get("fps", 25))
@@ -0,0 +1,4 @@
+"""Match store package initialization."""
+from .match_store import MatchStore, match_name, DEFAULT_DB
+
+__all__ = ['MatchStore', 'match_name', 'DEFAULT_DB']
@@ -0,0 +1,3 @@
+from .match_store import main
+
+raise SystemExit(main())
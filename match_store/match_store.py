@@ -0,0 +1,400 @@
+"""SQLite store of per-match results for queries across many analysed matches."""
+import argparse
+import glob
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from utils.analysis_store import load_analysis
+from utils.possession_segments import PossessionSegments
+from match_events import EventIndex
+
+SCHEMA_VERSION = 1
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.path.join(_ROOT, "stubs", "matches.sqlite")
+DEFAULT_ANALYSIS_DIR = os.path.join(_ROOT, "static", "output_videos")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    source_size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    recorded_at REAL NOT NULL,          -- first ingest's file mtime, kept on re-ingest
+    ingested_at REAL NOT NULL,
+    fps REAL,
+    total_frames INTEGER,
+    duration_seconds REAL,
+    possession_changes INTEGER
+);
+CREATE INDEX IF NOT EXISTS matches_recorded ON matches (recorded_at);
+
+CREATE TABLE IF NOT EXISTS team_stats (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+    team INTEGER NOT NULL,
+    possession REAL,
+    longest_streak_seconds REAL,
+    distance REAL,
+    avg_speed REAL,
+    passes INTEGER,
+    turnovers INTEGER,
+    PRIMARY KEY (match_id, team)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS team_stats_team ON team_stats (team, match_id);
+
+CREATE TABLE IF NOT EXISTS player_stats (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+    player INTEGER NOT NULL,
+    team INTEGER NOT NULL,
+    distance REAL,
+    max_speed REAL,
+    avg_speed REAL,
+    PRIMARY KEY (match_id, player)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS player_stats_player ON player_stats (player, match_id);
+CREATE INDEX IF NOT EXISTS player_stats_team ON player_stats (team, match_id);
+"""
+
+# Summary fields read from each analysis JSON; per-frame series stay in the .npz
+INGEST_FIELDS = ("fps", "total_frames", "team_ball_control", "player_stats", "events")
+
+# Columns player_totals() can sort by
+PLAYER_ORDER = ("distance", "max_speed", "avg_speed", "matches")
+
+
+def match_name(json_path):
+    """analysis_<name>.json -> <name>."""
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    return name[len("analysis_"):] if name.startswith("analysis_") else name
+
+
+class MatchStore:
+    """
+    Results of every analysed match in one indexed SQLite database.
+
+    Ingestion is incremental: a match is keyed by its name, and an analysis
+    file whose size and mtime (or, failing that, content hash) are unchanged
+    is skipped without being parsed. Only per-match summaries are stored
+    (one row per match, team and player), so aggregates over hundreds of
+    matches are index scans over a few thousand rows.
+
+    Player numbers are the tracker ids of each analysis; they only identify
+    the same person across matches if the ids were assigned consistently.
+    """
+
+    def __init__(self, path):
+        """
+        Open (and create if needed) the store.
+
+        Args:
+            path: SQLite database file (":memory:" for a throwaway store)
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        # Ad-hoc queries get their own read-only connection so a stray write
+        # ("DROP TABLE ...") fails instead of destroying data. An in-memory
+        # store can't be reopened, so it uses query_only on the shared one
+        self._reader = None
+        if path != ":memory:":
+            uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+            self._reader = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._reader.row_factory = sqlite3.Row
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------- INGESTION -------------------
+
+    def ingest(self, json_path, name=None, force=False):
+        """
+        Add or update one match from its analysis JSON.
+
+        Args:
+            json_path: analysis_<name>.json written by process_video
+            name: Match name (default: <name> of the file)
+            force: Re-ingest even if the file looks unchanged
+
+        Returns:
+            True if the match was (re)written, False if it was up to date
+        """
+        name = name or match_name(json_path)
+        stat = os.stat(json_path)
+        with self._lock:
+            row = self._conn.execute("SELECT source_mtime_ns, source_size, content_hash, recorded_at"
+                                     " FROM matches WHERE name = ?", (name,)).fetchone()
+        if not force and row and (row["source_mtime_ns"], row["source_size"]) == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        with open(json_path, "rb") as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        if not force and row and row["content_hash"] == content_hash:
+            # Touched but identical: remember the new stat so the next scan skips it
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE matches SET source_mtime_ns = ?, source_size = ? WHERE name = ?",
+                                   (stat.st_mtime_ns, stat.st_size, name))
+            return False
+
+        data = load_analysis(json_path, fields=INGEST_FIELDS)
+        match, teams, players = self._rows(data)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM matches WHERE name = ?", (name,))
+            cur = self._conn.execute(
+                "INSERT INTO matches (name, source, source_mtime_ns, source_size, content_hash, recorded_at,"
+                " ingested_at, fps, total_frames, duration_seconds, possession_changes)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, os.path.abspath(json_path), stat.st_mtime_ns, stat.st_size, content_hash,
+                 row["recorded_at"] if row else stat.st_mtime, time.time(), *match))
+            match_id = cur.lastrowid
+            self._conn.executemany("INSERT INTO team_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(match_id, *t) for t in teams])
+            self._conn.executemany("INSERT INTO player_stats VALUES (?, ?, ?, ?, ?, ?)",
+                                   [(match_id, *p) for p in players])
+        return True
+
+    def ingest_dir(self, directory, pattern="analysis_*.json", include_previews=False):
+        """
+        Ingest every analysis in directory; unchanged files are skipped.
+
+        Returns:
+            Dict with counts "added" (written) and "unchanged"
+        """
+        counts = {"added": 0, "unchanged": 0}
+        for path in sorted(glob.glob(os.path.join(glob.escape(directory), pattern))):
+            if not include_previews and match_name(path).startswith("preview_"):
+                continue
+            counts["added" if self.ingest(path) else "unchanged"] += 1
+        return counts
+
+    @staticmethod
+    def _rows(data):
+        """(match values, team rows, player rows) of one analysis."""
+        fps = float(data.get("fps") or 25)
+        total_frames = int(data.get("total_frames") or 0)
+        segments = PossessionSegments.from_frames(data.get("team_ball_control", []))
+        counts = EventIndex.from_dict(data["events"]).counts() if data.get("events") else {}
+
+        players = []
+        for pid, p in (data.get("player_stats") or {}).items():
+            players.append((int(pid), int(p.get("team", 0)), float(p.get("distance", 0.0)),
+                            float(p.get("max_speed", 0.0)), float(p.get("avg_speed", 0.0))))
+
+        teams = []
+        for team in (1, 2):
+            own = [p for p in players if p[1] == team]
+            events = counts.get(str(team), {})
+            teams.append((team, round(segments.percentage(team), 3),
+                          round(segments.longest_streak(team) / fps, 3),
+                          sum(p[2] for p in own), float(np.mean([p[4] for p in own])) if own else 0.0,
+                          events.get("pass", 0), events.get("turnover", 0)))
+
+        match = (fps, total_frames, round(total_frames / fps, 3), segments.changes())
+        return match, teams, players
+
+    def remove(self, name):
+        """Drop a match; returns True if it existed."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM matches WHERE name = ?", (name,)).rowcount > 0
+
+    # ------------------- QUERIES -------------------
+
+    def query(self, sql, params=()):
+        """
+        Run a read-only SQL query against the store; returns a list of dicts.
+
+        Raises:
+            sqlite3.OperationalError: If the statement tries to write
+        """
+        with self._lock:
+            if self._reader is not None:
+                return [dict(row) for row in self._reader.execute(sql, params)]
+            self._conn.execute("PRAGMA query_only = ON")
+            try:
+                return [dict(row) for row in self._conn.execute(sql, params)]
+            finally:
+                self._conn.execute("PRAGMA query_only = OFF")
+
+    @staticmethod
+    def _window(since=None, until=None):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("m.recorded_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("m.recorded_at < ?")
+            params.append(until)
+        return clauses, params
+
+    def matches(self, since=None, until=None):
+        """Ingested matches, oldest first."""
+        clauses, params = self._window(since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(f"SELECT m.match_id, m.name, m.recorded_at, m.duration_seconds, m.possession_changes"
+                          f" FROM matches m {where} ORDER BY m.recorded_at, m.match_id", params)
+
+    def player_totals(self, player=None, team=None, since=None, until=None, order_by="distance", limit=None):
+        """
+        Per-player aggregates over matches.
+
+        Args:
+            player: Only this player number
+            team: Only appearances for this team
+            since, until: recorded_at window (Unix seconds)
+            order_by: One of PLAYER_ORDER (descending)
+            limit: Keep the top rows only
+
+        Returns:
+            List of dicts: player, matches, distance (total), avg_distance,
+            max_speed (best), avg_speed (mean over matches)
+        """
+        if order_by not in PLAYER_ORDER:
+            raise ValueError(f"order_by must be one of {', '.join(PLAYER_ORDER)}")
+        clauses, params = self._window(since, until)
+        if player is not None:
+            clauses.append("p.player = ?")
+            params.append(int(player))
+        if team is not None:
+            clauses.append("p.team = ?")
+            params.append(int(team))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT p.player, COUNT(*) AS matches, SUM(p.distance) AS distance,"
+            " AVG(p.distance) AS avg_distance, MAX(p.max_speed) AS max_speed, AVG(p.avg_speed) AS avg_speed"
+            f" FROM player_stats p JOIN matches m ON m.match_id = p.match_id {where}"
+            f" GROUP BY p.player ORDER BY {order_by} DESC, p.player"
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.query(sql, params)
+
+    def player_history(self, player):
+        """One player's per-match rows, oldest first."""
+        return self.query(
+            "SELECT m.name, m.recorded_at, p.team, p.distance, p.max_speed, p.avg_speed"
+            " FROM player_stats p JOIN matches m ON m.match_id = p.match_id"
+            " WHERE p.player = ? ORDER BY m.recorded_at, m.match_id", (int(player),))
+
+    def team_trend(self, team, since=None, until=None):
+        """A team's possession, distance and events per match, oldest first."""
+        clauses, params = self._window(since, until)
+        clauses.append("t.team = ?")
+        params.append(int(team))
+        return self.query(
+            "SELECT m.name, m.recorded_at, t.possession, t.longest_streak_seconds, t.distance, t.avg_speed,"
+            " t.passes, t.turnovers FROM team_stats t JOIN matches m ON m.match_id = t.match_id"
+            f" WHERE {' AND '.join(clauses)} ORDER BY m.recorded_at, m.match_id", params)
+
+    def team_totals(self, since=None, until=None):
+        """Per-team averages and totals over matches."""
+        clauses, params = self._window(since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(
+            "SELECT t.team, COUNT(*) AS matches, AVG(t.possession) AS possession,"
+            " MAX(t.longest_streak_seconds) AS longest_streak_seconds, SUM(t.distance) AS distance,"
+            " AVG(t.avg_speed) AS avg_speed, SUM(t.passes) AS passes, SUM(t.turnovers) AS turnovers"
+            f" FROM team_stats t JOIN matches m ON m.match_id = t.match_id {where}"
+            " GROUP BY t.team ORDER BY t.team", params)
+
+
+# ======================================================================
+# CLI
+# ======================================================================
+
+def _print_rows(rows):
+    if not rows:
+        print("(no rows)")
+        return
+    cols = list(rows[0])
+
+    def fmt(col, v):
+        if col.endswith("_at") and isinstance(v, float):
+            return time.strftime("%Y-%m-%d %H:%M", time.localtime(v))
+        return f"{v:.2f}" if isinstance(v, float) else str(v)
+
+    cells = [[fmt(c, r[c]) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(cols)]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query results across analysed matches")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Store file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Add new or changed analyses")
+    p.add_argument("paths", nargs="*", default=[DEFAULT_ANALYSIS_DIR], help="analysis_*.json files or directories")
+    p.add_argument("--force", action="store_true", help="Re-ingest unchanged files")
+
+    sub.add_parser("matches", help="List ingested matches")
+
+    p = sub.add_parser("players", help="Per-player totals across matches")
+    p.add_argument("--player", type=int)
+    p.add_argument("--team", type=int)
+    p.add_argument("--order-by", choices=PLAYER_ORDER, default="distance")
+    p.add_argument("--top", type=int, default=20)
+
+    p = sub.add_parser("player", help="One player's matches")
+    p.add_argument("player", type=int)
+
+    p = sub.add_parser("team", help="A team's possession and distance per match")
+    p.add_argument("team", type=int)
+
+    sub.add_parser("teams", help="Per-team averages across matches")
+
+    p = sub.add_parser("sql", help="Run a read-only SQL query against the store")
+    p.add_argument("statement")
+
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with MatchStore(args.db) as store:
+        if args.command == "ingest":
+            counts = {"added": 0, "unchanged": 0}
+            for path in args.paths:
+                if os.path.isdir(path):
+                    for k, v in store.ingest_dir(path).items():
+                        counts[k] += v
+                else:
+                    counts["added" if store.ingest(path, force=args.force) else "unchanged"] += 1
+            print(f"{counts['added']} ingested, {counts['unchanged']} unchanged")
+        elif args.command == "matches":
+            _print_rows(store.matches())
+        elif args.command == "players":
+            _print_rows(store.player_totals(args.player, args.team, order_by=args.order_by, limit=args.top))
+        elif args.command == "player":
+            _print_rows(store.player_history(args.player))
+        elif args.command == "team":
+            _print_rows(store.team_trend(args.team))
+        elif args.command == "teams":
+            _print_rows(store.team_totals())
+        elif args.command == "sql":
+            _print_rows(store.query(args.statement))
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    return 0
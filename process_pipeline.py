@@ -1,27 +1,100 @@
 import os
 import json
+import argparse
 import numpy as np
+import time
 import traceback
-
-from utils.video_utils import read_video, save_video, get_video_info
-from utils.speed_plot import plot_player_speed
-from utils.distance_plot import plot_distance_covered
-from utils.possession_timeline import plot_possession_timeline
-from utils.team_radar import team_radar
+import cv2
+from sklearn.cluster import KMeans
+from ultralytics import YOLO
+
+from utils.video_utils import read_video, save_video, get_video_info, scaled_size
+from utils.possession_segments import PossessionSegments
+from utils.pitch_heatmaps import PitchHeatmaps
+from utils.charts import ChartBatch, build_chart_data, player_summary
 from utils.pdf_report import make_report_data
+from utils.analysis_store import save_analysis, tracks_to_series
+from utils.frame_store import FrameStore
+from utils.instrumentation import Instrumentation, profiled
+from utils.metrics import REGISTRY
 
 from trackers import Tracker
 from team_assigner import TeamAssigner
+from track_stitcher import TrackStitcher
 from player_ball_assigner import PlayerBallAssigner
+from match_events import EventIndex
+from match_store import MatchStore, DEFAULT_DB
 from camera_movement_estimator import CameraMovementEstimator
+from calibration import get_profile
 from view_transformer import ViewTransformer
-from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from speed_and_distance_estimator import SpeedAndDistanceEstimator, TrajectorySmoother
+from annotation_renderer import AnnotationRenderer
+from stage_graph import StageGraph, ArtifactCache, fingerprint_file
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, "static", "output_videos")
+ARTIFACT_DIR = os.path.join(BASE_DIR, "stubs", "artifacts")
+MODEL_PATH = os.path.join(BASE_DIR, "models", "best.pt")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Tunable stage parameters. Each is hashed into its stage's cache key, so
+# overriding one only reruns that stage and its dependants ("render" and
+# "encode" settings only affect speed and are passed unhashed). The
+# "calibration" profile's geometry (see calibration/) is hashed into the camera,
+# kinematics and heatmaps stages; camera.working_scale runs optical flow downscaled.
+# kinematics.smooth measures speed/distance on Kalman/RTS-smoothed positions.
+# "stitch" merges fragmented player track IDs (see track_stitcher/) in the
+# identify stage, which assigns teams in the same sweep over the frames.
+# "frames" bounds the RAM held by decoded frames (unhashed): beyond
+# memory_budget_mb they spill to a memory-mapped file in spill_dir.
+# "events" extracts passes and turnovers from the ball owner per frame.
+# "heatmaps" bins pitch positions per team; windows resolve to step_seconds.
+# "charts" sets the chart process pool size; 1 draws in-process, None uses a pool
+# on hosts with more than two cores (unhashed; images are cached by content).
+DEFAULT_PARAMS = {
+    "calibration": {"profile": "default"},
+    "camera": {"working_scale": 1.0},
+    "stitch": {"enabled": True, "max_gap": 2.0, "max_speed": 0.25, "max_color_distance": 60.0},
+    "kinematics": {"frame_window": 5, "frame_rate": 24, "smooth": True},
+    "possession": {"max_player_ball_distance": 70},
+    "events": {"min_possession_frames": 3},
+    "heatmaps": {"bins": [32, 20], "step_seconds": 10},
+    "charts": {"workers": None},
+    "frames": {"memory_budget_mb": 2048, "spill_dir": None},
+    "render": {"workers": None},
+    "encode": {"segmented": True, "segment_seconds": 10, "workers": None, "hls": False},
+}
+
+# Fast preview pass: frames downscaled by `scale` with every `stride`-th frame
+# kept, detection at a small YOLO input size and a low-bitrate encode.
+PREVIEW_PARAMS = {"scale": 0.5, "stride": 3, "imgsz": 384, "crf": 35}
+
+# Inner calls timed when a job runs with instrument=True
+HOT_CALLS = [
+    (YOLO, "predict", "model.predict"),
+    (KMeans, "fit", "KMeans.fit"),
+    (cv2, "calcOpticalFlowPyrLK", "cv2.calcOpticalFlowPyrLK"),
+    (cv2, "goodFeaturesToTrack", "cv2.goodFeaturesToTrack"),
+    (cv2, "putText", "cv2.putText"),
+]
+
+# Process-wide metrics, served by app.py at /metrics. Fed once per stage or
+# job (never per frame) so they cost nothing measurable on the hot path.
+JOBS_ACTIVE = REGISTRY.gauge("pipeline_jobs_active", "Pipeline jobs currently running")
+JOBS_TOTAL = REGISTRY.counter("pipeline_jobs_total", "Finished pipeline jobs", ["outcome"])
+JOB_SECONDS = REGISTRY.histogram("pipeline_job_seconds", "Wall time of whole pipeline jobs")
+STAGE_SECONDS = REGISTRY.histogram("pipeline_stage_seconds", "Wall time of computed stages", ["stage"])
+STAGE_RUNS = REGISTRY.counter("pipeline_stage_runs_total",
+                              "Stage evaluations by artifact cache outcome (hit, miss, uncached)",
+                              ["stage", "state"])
+FRAMES_TOTAL = REGISTRY.counter("pipeline_frames_processed_total", "Video frames analysed by finished jobs")
+JOB_FPS = REGISTRY.gauge("pipeline_last_job_fps", "Frames per second of the last finished job")
+RESULT_CACHE = REGISTRY.counter("pipeline_result_cache_total",
+                                "Lookups of rendered outputs (deferred videos, clips)", ["kind", "result"])
+MODEL_LOAD_SECONDS = REGISTRY.histogram("pipeline_model_load_seconds", "Time to load the detection model",
+                                        buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0))
+
 
 def _norm(p: str) -> str:
     return p.replace("\\", "/")
@@ -33,221 +106,440 @@ def _save_json(obj, path):
     return path
 
 
-def _ensure_png(path):
-    import matplotlib.pyplot as plt
-    fig = plt.figure(figsize=(2, 1))
-    plt.text(0.5, 0.5, "No data", ha="center", va="center")
-    plt.axis("off")
-    fig.savefig(path, dpi=120, bbox_inches="tight")
-    plt.close(fig)
+# ======================================================================
+# STAGES
+# ======================================================================
 
+def _stage_decode(source, scale=1.0, stride=1, memory_budget_mb=None, spill_dir=None):
+    frames = FrameStore(memory_budget_mb, spill_dir) if memory_budget_mb else None
+    return read_video(source, scale=scale, stride=stride, into=frames)
 
-def process_video(input_path, output_path=None):
-    """
-    Full updated pipeline with FIXED ball-owner tracking.
-    """
 
-    try:
-        print(f"Processing {input_path}...")
-        video_info = get_video_info(input_path)
-        if not video_info:
-            print("ERROR reading video info")
-            return None
+def _stage_track(frames, model, total_frames, imgsz=None, checkpoint_path=None):
+    with MODEL_LOAD_SECONDS.time():
+        tracker = Tracker(model)
+    print("Tracking...")
+    tracks = tracker.get_object_tracks(frames, checkpoint_path=checkpoint_path, imgsz=imgsz)
 
-        total_frames = int(video_info.get("total_frames", 0))
-        fps = int(video_info.get("fps", 25))
+    tracker.add_position_to_tracks(tracks)
 
-        frames = read_video(input_path)
+    # Normalize track lists
+    for k in tracks:
+        while len(tracks[k]) < total_frames:
+            tracks[k].append({})
+        while len(tracks[k]) > total_frames:
+            tracks[k].pop()
 
-        # ------------------------- TRACKING -------------------------
-        tracker = Tracker(os.path.join(BASE_DIR, "models", "best.pt"))
-        print("Tracking...")
+    return tracks
 
-        tracks = tracker.get_object_tracks(
-            frames,
-            read_from_stub=True,
-            stub_path=os.path.join(BASE_DIR, "stubs", f"track_stubs_{os.path.basename(input_path)}.pkl")
-        )
 
-        tracker.add_position_to_tracks(tracks)
+def _stage_camera(frames, profile="default", working_scale=1.0, checkpoint_path=None):
+    print("Camera movement estimation...")
+    cam_est = CameraMovementEstimator(frames[0] if frames else None, profile=profile,
+                                      working_scale=working_scale)
+    return cam_est.get_camera_movement(frames, checkpoint_path=checkpoint_path)
 
-        # Normalize track lists
-        for k in tracks:
-            while len(tracks[k]) < total_frames:
-                tracks[k].append({})
-            while len(tracks[k]) > total_frames:
-                tracks[k].pop()
 
-        # ------------------------- CAMERA -------------------------
-        print("Camera movement estimation...")
-        cam_est = CameraMovementEstimator(frames[0] if frames else None)
+def _stage_identify(frames, tracks, fps, frame_width, enabled=True, **stitch_params):
+    # One sweep over the frames, as in live mode: each frame's player IDs are
+    # stitched into identities, then those identities get their teams
+    print("Stitching track fragments and assigning teams..." if enabled else "Assigning teams...")
+    stitcher = TrackStitcher(fps=fps, frame_width=frame_width, **stitch_params) if enabled else None
+    ta = TeamAssigner()
+    players = tracks.get("players", [])
 
-        cam_movements = cam_est.get_camera_movement(
-            frames,
-            read_from_stub=True,
-            stub_path=os.path.join(BASE_DIR, "stubs", f"cam_stub_{os.path.basename(input_path)}.pkl")
-        )
+    for fi, frame in enumerate(frames):
+        if fi >= len(players):
+            break
+        if stitcher is not None:
+            players[fi] = stitcher.update(frame, fi, players[fi])
+        if fi == 0:
+            ta.assign_team_color(frame, players[0])
+        for pid, pdata in players[fi].items():
+            team = ta.get_player_team(frame, pdata.get("bbox"), pid)
+            pdata["team"] = int(team)
+            pdata["team_color"] = ta.team_colors.get(team, (0, 255, 0))
 
-        cam_est.add_adjust_positions_to_tracks(tracks, cam_movements)
-
-        # ------------------------- VIEW TRANSFORM -------------------------
-        vt = ViewTransformer()
-        vt.add_transformed_position_to_tracks(tracks)
-
-        # ------------------------- BALL + SPEED -------------------------
-        tracks["ball"] = tracker.interpolate_ball_positions(tracks.get("ball", []))
-
-        speed_calc = SpeedAndDistanceEstimator()
-        speed_calc.add_speed_and_distance_to_tracks(tracks)
-
-        # ------------------------- TEAM ASSIGN -------------------------
-        ta = TeamAssigner()
-        first_frame = frames[0] if frames else None
-
-        ta.assign_team_color(first_frame, tracks.get("players", [])[0] if tracks["players"] else {})
-
-        for fi, frame in enumerate(frames):
-            if fi >= len(tracks["players"]):
-                break
-            for pid, pdata in tracks["players"][fi].items():
-                team = ta.get_player_team(frame, pdata.get("bbox"), pid)
-                pdata["team"] = int(team)
-                pdata["team_color"] = ta.team_colors.get(team, (0, 255, 0))
-
-        # ------------------------- BALL POSSESSION -------------------------
-        player_assigner = PlayerBallAssigner()
-        team_ball_control = []
-        ball_owner = []      # <=== FIXED: actual player who owns the ball
-
-        for fi, players in enumerate(tracks.get("players", [])):
-
-            # ball missing
-            if fi >= len(tracks["ball"]):
-                team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
-                ball_owner.append(-1)
-                continue
-
-            ball_frame = tracks["ball"][fi] if isinstance(tracks["ball"][fi], dict) else {}
-            ball_bbox = ball_frame.get(1, {}).get("bbox")
-
-            if ball_bbox:
-                assigned_pid = player_assigner.assign_ball_to_player(players, ball_bbox)
-            else:
-                assigned_pid = -1
-
-            # Determine team ball possession
-            if assigned_pid != -1:
-                team_ball_control.append(players[assigned_pid].get("team", 0))
-                ball_owner.append(assigned_pid)
-            else:
-                team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
-                ball_owner.append(-1)
-
-        team_ball_control = np.array(team_ball_control)
-
-        # ---------------------- DRAW FINAL ANNOTATED FRAMES ----------------------
-        print("Drawing annotations...")
-
-        annotated = list(
-            tracker.draw_annotations(
-                frames,
-                tracks,
-                team_ball_control,
-                ball_owner       # <=== passed into draw_annotations()
-            )
-        )
+    if stitcher is not None:
+        print(f"  {stitcher.fragments} player track IDs -> {stitcher.fragments - stitcher.merged} identities")
+    return tracks
 
-        annotated = list(cam_est.draw_camera_movement(annotated, cam_movements))
-        annotated = list(speed_calc.draw_speed_and_distance(annotated, tracks))
 
-        # ---------------------- SAVE VIDEO ----------------------
-        if output_path is None:
-            base = os.path.splitext(os.path.basename(input_path))[0]
-            output_path = os.path.join(OUTPUT_DIR, f"processed_{base}.mp4")
+def _stage_kinematics(tracks, cam_movements, frame_window, frame_rate, frame_size=(1920, 1080),
+                      profile="default", smooth=False):
+    CameraMovementEstimator.add_adjust_positions_to_tracks(tracks, cam_movements)
 
-        save_video(annotated, output_path, fps=fps)
+    vt = ViewTransformer(frame_size, profile=profile)
+    vt.add_transformed_position_to_tracks(tracks)
 
-        print("Saved processed video:", output_path)
+    tracks["ball"] = Tracker.interpolate_ball_positions(tracks.get("ball", []))
 
-        # ---------------------- CHART OUTPUT FILES ----------------------
-        base = os.path.splitext(os.path.basename(output_path))[0]
+    speed_calc = SpeedAndDistanceEstimator()
+    speed_calc.frame_window = frame_window
+    speed_calc.frame_rate = frame_rate
+    if smooth:
+        TrajectorySmoother(frame_rate=frame_rate).smooth_tracks(tracks)
+        speed_calc.position_key = 'position_smoothed'
+    speed_calc.add_speed_and_distance_to_tracks(tracks)
+    return tracks
 
-        speed_png = _norm(os.path.join(OUTPUT_DIR, f"speed_{base}.png"))
-        dist_png = _norm(os.path.join(OUTPUT_DIR, f"distance_{base}.png"))
-        poss_png = _norm(os.path.join(OUTPUT_DIR, f"possession_{base}.png"))
-        radar_png = _norm(os.path.join(OUTPUT_DIR, f"radar_{base}.png"))
-        analysis_json = _norm(os.path.join(OUTPUT_DIR, f"analysis_{base}.json"))
 
-        # ---------------------- CHART GENERATION ----------------------
-        try: plot_player_speed(tracks, speed_png)
-        except: _ensure_png(speed_png)
+def _stage_possession(tracks, max_player_ball_distance):
+    player_assigner = PlayerBallAssigner()
+    player_assigner.max_player_ball_distance = max_player_ball_distance
+    team_ball_control = []
+    ball_owner = []      # <=== FIXED: actual player who owns the ball
 
-        try: plot_distance_covered(tracks, dist_png)
-        except: _ensure_png(dist_png)
+    for fi, players in enumerate(tracks.get("players", [])):
 
-        try: plot_possession_timeline(team_ball_control.tolist(), poss_png)
-        except: _ensure_png(poss_png)
+        # ball missing
+        if fi >= len(tracks["ball"]):
+            team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
+            ball_owner.append(-1)
+            continue
 
-        # ---------------------- RADAR METRICS ----------------------
-        player_stats = {}
+        ball_frame = tracks["ball"][fi] if isinstance(tracks["ball"][fi], dict) else {}
+        ball_bbox = ball_frame.get(1, {}).get("bbox")
 
-        for fi, frame in enumerate(tracks.get("players", [])):
-            for pid, pdata in frame.items():
-                pid_s = str(pid)
-                if pid_s not in player_stats:
-                    player_stats[pid_s] = {
-                        "team": int(pdata.get("team", 0)),
-                        "speeds": [],
-                        "distance": 0.0
-                    }
+        if ball_bbox:
+            assigned_pid = player_assigner.assign_ball_to_player(players, ball_bbox)
+        else:
+            assigned_pid = -1
 
-                player_stats[pid_s]["speeds"].append(float(pdata.get("speed", 0.0)))
-                player_stats[pid_s]["distance"] = float(pdata.get("distance", player_stats[pid_s]["distance"]))
+        # Determine team ball possession
+        if assigned_pid != -1:
+            team_ball_control.append(players[assigned_pid].get("team", 0))
+            ball_owner.append(assigned_pid)
+        else:
+            team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
+            ball_owner.append(-1)
 
-        def avg_safe(v):
-            arr = np.array(v, dtype=float) if v else np.array([0.0])
-            return float(np.nanmean(arr))
+    return {"team_ball_control": np.array(team_ball_control), "ball_owner": ball_owner}
 
-        t1_pos = float(np.mean(team_ball_control == 1) * 100)
-        t2_pos = float(np.mean(team_ball_control == 2) * 100)
-        t1_dist = sum(p["distance"] for p in player_stats.values() if p["team"] == 1)
-        t2_dist = sum(p["distance"] for p in player_stats.values() if p["team"] == 2)
-        t1_avg = avg_safe([avg_safe(p["speeds"]) for p in player_stats.values() if p["team"] == 1])
-        t2_avg = avg_safe([avg_safe(p["speeds"]) for p in player_stats.values() if p["team"] == 2])
 
-        metrics = {
-            "labels": ["Possession", "Avg Speed", "Total Distance"],
-            "team1": [t1_pos, t1_avg, t1_dist],
-            "team2": [t2_pos, t2_avg, t2_dist]
-        }
+def _stage_events(possession, fps, min_possession_frames=3):
+    return EventIndex.from_possession(possession["team_ball_control"], possession["ball_owner"],
+                                      fps=fps, min_possession_frames=min_possession_frames)
 
-        try:
-            team_radar(metrics, radar_png)
-        except:
-            _ensure_png(radar_png)
 
-        # ---------------------- TOP PERFORMANCE ----------------------
-        compiled = {}
-        for pid, pdata in player_stats.items():
-            compiled[pid] = {
-                "team": pdata["team"],
-                "max_speed": float(np.nanmax(pdata["speeds"])),
-                "avg_speed": float(np.nanmean(pdata["speeds"])),
-                "distance": pdata["distance"]
-            }
+def _stage_series(tracks):
+    return tracks_to_series(tracks)
+
+
+def _stage_heatmaps(series, fps, total_frames, profile="default", bins=(32, 20), step_seconds=10):
+    width, length = get_profile(profile).pitch_size
+    return PitchHeatmaps.from_series(series, (length, width), bins=tuple(bins),
+                                     step_frames=max(1, round(step_seconds * fps)),
+                                     total_frames=total_frames, fps=fps)
+
+
+def _render_frames(frames, tracks, possession, cam_movements, workers=None):
+    # Single pass per frame on a thread pool, drawn in place, yielded in order
+    renderer = AnnotationRenderer(workers=workers)
+    return renderer.render(frames, tracks, possession["ball_owner"], cam_movements)
+
+
+def _stage_render(frames, tracks, possession, cam_movements, workers=None):
+    print("Drawing annotations...")
+    return _render_frames(frames, tracks, possession, cam_movements, workers)
 
+
+def hls_dir_for(output_path):
+    """HLS playlist directory of an annotated video (``<name>_hls`` next to it)."""
+    base = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(os.path.dirname(output_path), f"{base}_hls")
+
+
+def _stage_encode(annotated, output_path, fps, expected_frames=None, segmented=True,
+                  segment_seconds=10, workers=None, hls=False, crf=None, checkpoint_path=None):
+    # Encode under a temporary name so a half-written file is never served
+    tmp_path = os.path.splitext(output_path)[0] + ".tmp.mp4"
+    if segmented or hls:
+        # HLS segments are playable as soon as each one is encoded
+        save_video(annotated, tmp_path, fps=fps, checkpoint_path=checkpoint_path,
+                   segmented=True, segment_frames=max(1, int(segment_seconds * fps)),
+                   workers=workers, expected_frames=expected_frames or None,
+                   hls_dir=hls_dir_for(output_path) if hls else None, crf=crf)
+    else:
+        save_video(annotated, tmp_path, fps=fps, checkpoint_path=checkpoint_path)
+    os.replace(tmp_path, output_path)
+    print("Saved processed video:", output_path)
+    return output_path
+
+
+def _stage_chart_data(series, possession, heatmaps):
+    segments = PossessionSegments.from_frames(possession["team_ball_control"], possession["ball_owner"])
+    return build_chart_data(series, segments, heatmaps)
+
+
+def chart_paths(base):
+    """Output PNG of each chart for a processed video base name."""
+    return {name: _norm(os.path.join(OUTPUT_DIR, f"{name}_{base}.png"))
+            for name in ("speed", "distance", "possession", "radar", "heatmap")}
+
+
+def _ingest_match(json_path):
+    """Add the finished analysis to the multi-match store; a store error never fails the job."""
+    try:
+        with MatchStore(DEFAULT_DB) as store:
+            store.ingest(json_path)
+    except Exception as e:
+        print("Match store ingest failed:", e)
+
+
+def _record_stage_metrics(report):
+    for entry in report:
+        STAGE_RUNS.labels(entry["stage"], entry["state"]).inc()
+        if entry["state"] != "hit":
+            STAGE_SECONDS.labels(entry["stage"]).observe(entry["seconds"])
+
+
+def _files_exist(paths):
+    if isinstance(paths, dict):
+        paths = paths.values()
+    elif isinstance(paths, str):
+        paths = [paths]
+    return all(os.path.exists(p) for p in paths)
+
+
+def _encode_validator(hls):
+    """The encode artifact is valid while its MP4 (and, for HLS, the playlist) exists."""
+    def validate(output_path):
+        if hls and not os.path.exists(os.path.join(hls_dir_for(output_path), "index.m3u8")):
+            return False
+        return _files_exist(output_path)
+    return validate
+
+
+def _preview_stage_params(stage_params, preview):
+    """Rescale pixel- and frame-based parameters to the preview's resolution and stride."""
+    scale, stride = preview["scale"], preview["stride"]
+    kin = stage_params["kinematics"]
+    return {
+        "decode": {"scale": scale, "stride": stride},
+        "track": {"imgsz": preview["imgsz"]},
+        "kinematics": dict(
+            kin,
+            frame_window=max(1, round(kin["frame_window"] / stride)),
+            frame_rate=kin["frame_rate"] / stride,
+        ),
+        "possession": {
+            "max_player_ball_distance": stage_params["possession"]["max_player_ball_distance"] * scale,
+        },
+        "events": {
+            "min_possession_frames": max(1, round(stage_params["events"]["min_possession_frames"] / stride)),
+        },
+        "encode": dict(stage_params["encode"], crf=preview["crf"], hls=False),
+    }
+
+
+def build_pipeline_graph(input_path, output_path=None, params=None, cache_dir=ARTIFACT_DIR,
+                         video_info=None, preview=None, monitor=None):
+    """
+    Express the analysis pipeline as a cached stage graph.
+
+    Args:
+        input_path: Source video path
+        output_path: Annotated video path (defaults to OUTPUT_DIR/processed_<name>.mp4)
+        params: Optional per-stage overrides, e.g. ``{"possession": {"max_player_ball_distance": 90}}``
+        cache_dir: Artifact cache directory (None disables caching)
+        video_info: Pre-computed ``get_video_info`` result
+        preview: Optional PREVIEW_PARAMS-like dict; builds the fast preview
+            variant, whose stages cache under their own keys
+        monitor: Optional per-stage monitor (see StageGraph)
+
+    Returns:
+        (graph, output_path) tuple
+    """
+    video_info = video_info or get_video_info(input_path) or {}
+    total_frames = int(video_info.get("total_frames", 0))
+    # The exact source rate (e.g. 29.97), so the encode keeps the source's timing
+    fps = float(video_info.get("fps") or 25)
+
+    if output_path is None:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        prefix = "preview" if preview else "processed"
+        output_path = os.path.join(OUTPUT_DIR, f"{prefix}_{base}.mp4")
+
+    stage_params = {name: dict(p) for name, p in DEFAULT_PARAMS.items()}
+    stage_params.update({"decode": {}, "track": {}})
+    for name, overrides in (params or {}).items():
+        stage_params.setdefault(name, {}).update(overrides)
+
+    if preview:
+        stage_params.update(_preview_stage_params(stage_params, preview))
+        stride = preview["stride"]
+        total_frames = -(-total_frames // stride)
+        fps = fps / stride
+
+    # Calibration geometry is rescaled to the resolution the stages work at. The
+    # geometry itself (not just the name) is hashed, so editing or re-registering
+    # a profile invalidates the camera, kinematics and heatmap artifacts
+    profile = get_profile(stage_params["calibration"]["profile"]).to_dict()
+    frame_size = scaled_size(int(video_info.get("width", 1920)), int(video_info.get("height", 1080)),
+                             stage_params["decode"].get("scale", 1.0))
+
+    graph = StageGraph(ArtifactCache(cache_dir) if cache_dir else None, monitor=monitor)
+    graph.add_source("source", input_path, fingerprint_file(input_path))
+    graph.add_source("model", MODEL_PATH, fingerprint_file(MODEL_PATH))
+
+    graph.add_stage("decode", _stage_decode, ["source"], params=stage_params["decode"],
+                    options=stage_params["frames"], cacheable=False)
+    graph.add_stage("track", _stage_track, ["decode", "model"],
+                    params=dict(stage_params["track"], total_frames=total_frames), checkpoint=True)
+    graph.add_stage("camera", _stage_camera, ["decode"],
+                    params=dict(stage_params["camera"], profile=profile), checkpoint=True)
+    graph.add_stage("identify", _stage_identify, ["decode", "track"],
+                    params=dict(stage_params["stitch"], fps=fps, frame_width=frame_size[0]))
+    graph.add_stage("kinematics", _stage_kinematics, ["identify", "camera"],
+                    params=dict(stage_params["kinematics"], frame_size=list(frame_size), profile=profile))
+    graph.add_stage("possession", _stage_possession, ["kinematics"],
+                    params=stage_params["possession"])
+    graph.add_stage("events", _stage_events, ["possession"],
+                    params=dict(stage_params["events"], fps=fps))
+    graph.add_stage("series", _stage_series, ["kinematics"])
+    graph.add_stage("heatmaps", _stage_heatmaps, ["series"],
+                    params=dict(stage_params["heatmaps"], fps=fps, total_frames=total_frames, profile=profile))
+    graph.add_stage("render", _stage_render, ["decode", "kinematics", "possession", "camera"],
+                    options=stage_params["render"], cacheable=False)
+    graph.add_stage("encode", _stage_encode, ["render"],
+                    params={"output_path": output_path, "fps": fps},
+                    options=dict(stage_params["encode"], expected_frames=total_frames),
+                    validate=_encode_validator(stage_params["encode"].get("hls")), checkpoint=True)
+    graph.add_stage("chart_data", _stage_chart_data, ["series", "possession", "heatmaps"])
+
+    return graph, output_path
+
+
+def process_video(input_path, output_path=None, params=None, use_cache=True, render_video=True,
+                  progressive=False, preview=False, instrument=False, profiler=None, charts="png"):
+    """
+    Full updated pipeline with FIXED ball-owner tracking.
+
+    With render_video=False (analytics-only mode) the render and encode
+    stages are skipped; tracks stay persisted in the artifact cache and the
+    annotated video is produced on first request by render_deferred().
+
+    With progressive=True the encoder also writes an HLS playlist
+    (see hls_dir_for) that grows segment by segment, so the annotated video
+    can be watched while the rest of it is still being rendered.
+
+    With preview=True (or a dict overriding PREVIEW_PARAMS) a fast,
+    low-resolution pass runs instead and writes preview_<name>.mp4 and
+    analysis_preview_<name>.json; see preview_then_full().
+
+    Every computed stage records wall and CPU seconds, frames/s and peak
+    RSS under "stages" in the analysis JSON. instrument=True also counts
+    and times the HOT_CALLS (model.predict, KMeans.fit, optical flow,
+    putText) into "hot_calls". profiler="cprofile" or "sampling" (default:
+    the PIPELINE_PROFILER environment variable) writes a profile of the
+    job to profile_<name>.prof / .folded next to the outputs.
+
+    Chart inputs are derived once from the per-player series ("chart_data"
+    stage) and the PNGs are drawn in the background while the video
+    encodes (see ChartBatch: a process pool on hosts with more than two
+    cores, else one thread); images are cached by a hash of their inputs. charts="data"
+    skips drawing and returns the inputs as "chart_data" for client-side
+    rendering (they are also saved under "charts" in the analysis JSON).
+
+    Stages are evaluated through a StageGraph so that only stages whose
+    inputs or parameters changed since the last run are recomputed. Tracking,
+    camera estimation and encoding checkpoint periodically, so rerunning a
+    crashed job resumes from the last checkpoint instead of frame 0.
+    """
+
+    JOBS_ACTIVE.inc()
+    started = time.perf_counter()
+    try:
+        print(f"Processing {input_path}...")
+        video_info = get_video_info(input_path)
+        if not video_info:
+            print("ERROR reading video info")
+            JOBS_TOTAL.labels("failed").inc()
+            return None
+
+        total_frames = int(video_info.get("total_frames", 0))
+        fps = float(video_info.get("fps") or 25)
+
+        if preview:
+            preview = dict(PREVIEW_PARAMS, **(preview if isinstance(preview, dict) else {}))
+            total_frames = -(-total_frames // preview["stride"])
+            fps = fps / preview["stride"]
+        else:
+            preview = None
+
+        if progressive:
+            params = dict(params or {})
+            params["encode"] = dict(params.get("encode", {}), hls=True)
+
+        instruments = Instrumentation()
+        profiler = profiler or os.environ.get("PIPELINE_PROFILER") or None
+
+        # Deferred rendering reloads the tracks, so analytics-only runs always cache
+        graph, output_path = build_pipeline_graph(
+            input_path, output_path, params,
+            cache_dir=ARTIFACT_DIR if use_cache or not render_video else None,
+            video_info=video_info, preview=preview, monitor=instruments.stage,
+        )
+        _save_json({"source": input_path, "params": params or {}, "output_path": output_path,
+                    "preview": preview}, _manifest_path(output_path))
+
+        # chart_data comes before encode so the charts render in the background during encoding
+        targets = ["chart_data", "kinematics", "possession", "events", "series", "heatmaps"]
+        if render_video:
+            targets.insert(1, "encode")
+        out_name = os.path.splitext(os.path.basename(output_path))[0]
+        profile_path = None
+        if profiler:
+            ext = "prof" if profiler == "cprofile" else "folded"
+            profile_path = _norm(os.path.join(OUTPUT_DIR, f"profile_{out_name}.{ext}"))
+
+        batches = []
+
+        def start_charts(name, value):
+            if name == "chart_data" and charts == "png":
+                batches.append(ChartBatch(value, chart_paths(out_name),
+                                          cache_dir=os.path.join(ARTIFACT_DIR, "charts") if use_cache else None,
+                                          workers=(params or {}).get("charts", {}).get("workers")))
+
+        with instruments.hot_calls(HOT_CALLS if instrument else []), profiled(profiler, profile_path):
+            values = graph.run(targets, on_ready=start_charts)
+            images = batches[0].result() if batches else None
+        if batches:
+            graph.report.append({"stage": "charts", "state": "hit" if len(batches[0].hits) == len(images) else "miss",
+                                 "seconds": batches[0].seconds})
+        _record_stage_metrics(graph.report)
+        for entry in graph.report:
+            if entry["seconds"] > 0:
+                entry["fps"] = round(total_frames / entry["seconds"], 1)
+            line = f"  {entry['stage']:<11} {entry['state']:<8} {entry['seconds']:.2f}s"
+            if "cpu_seconds" in entry:
+                line += f"  cpu {entry['cpu_seconds']:.2f}s"
+            if "peak_rss_mb" in entry:
+                line += f"  peak {entry['peak_rss_mb']:.0f} MB"
+            print(line)
+
+        team_ball_control = values["possession"]["team_ball_control"]
+        chart_data = values["chart_data"]
+        analysis_json = _norm(os.path.join(OUTPUT_DIR, f"analysis_{out_name}.json"))
+
+        # ---------------------- PLAYER TOTALS ----------------------
+        summary = player_summary(values["series"])
+        compiled = {
+            str(pid): {"team": int(team), "max_speed": float(mx), "avg_speed": float(avg), "distance": float(dist)}
+            for pid, team, mx, avg, dist in zip(summary["player_ids"].tolist(), summary["teams"].tolist(),
+                                                summary["max_speed"], summary["avg_speed"], summary["distance"])
+        }
+        segments = PossessionSegments.from_frames(team_ball_control, values["possession"]["ball_owner"])
+        t1_pos = segments.percentage(1)
+        t2_pos = segments.percentage(2)
+
+        # ---------------------- TOP PERFORMANCE ----------------------
         top_dist = sorted(compiled.items(), key=lambda x: x[1]["distance"], reverse=True)[:3]
         top_speed = sorted(compiled.items(), key=lambda x: x[1]["max_speed"], reverse=True)[:3]
 
         # longest possession streak
-        cur1 = cur2 = best1 = best2 = 0
-        for t in team_ball_control:
-            if t == 1:
-                cur1 += 1; best1 = max(best1, cur1); cur2 = 0
-            elif t == 2:
-                cur2 += 1; best2 = max(best2, cur2); cur1 = 0
-            else:
-                cur1 = cur2 = 0
+        best1, best2 = segments.longest_streak(1), segments.longest_streak(2)
 
         performance = {
             "top_distance": [{"player": int(pid), "distance": round(d["distance"], 2)} for pid, d in top_dist],
@@ -255,40 +547,266 @@ def process_video(input_path, output_path=None):
             "possession_streak": {
                 "team1_seconds": round(best1 / max(fps,1), 2),
                 "team2_seconds": round(best2 / max(fps,1), 2),
-            }
+            },
+            "possession_changes": segments.changes(),
         }
 
         analysis = {
             "fps": fps,
             "total_frames": total_frames,
-            "team_ball_control": team_ball_control.tolist(),
+            "team_ball_control": team_ball_control,
+            "ball_owner": values["possession"]["ball_owner"],
             "player_stats": compiled,
-            "images": {
-                "speed": speed_png,
-                "distance": dist_png,
-                "possession": poss_png,
-                "radar": radar_png
-            }
+            "events": values["events"].to_dict(),
+            "images": images or {},
+            "charts": chart_data,
+            "heatmaps": values["heatmaps"].summary(),
+            "stages": graph.report
         }
+        if instrument:
+            analysis["hot_calls"] = instruments.report()
+        if profile_path:
+            analysis["profile"] = profile_path
+
+        # Possession is stored as runs; per-player series and cumulative heatmap grids as typed arrays (.npz)
+        save_analysis(analysis, analysis_json, dict(values["series"], **values["heatmaps"].arrays()))
+        if preview is None:
+            _ingest_match(analysis_json)
+
+        def chart_file(name):
+            return os.path.basename(images[name]) if images else None
 
-        _save_json(analysis, analysis_json)
+        elapsed = time.perf_counter() - started
+        JOBS_TOTAL.labels("ok").inc()
+        JOB_SECONDS.observe(elapsed)
+        FRAMES_TOTAL.inc(total_frames)
+        JOB_FPS.set(total_frames / elapsed if elapsed > 0 else 0.0)
 
         return {
             "total_frames": total_frames,
             "video_fps": fps,
             "team_possession": {"team_1": round(t1_pos, 2), "team_2": round(t2_pos, 2)},
             "processed_filename": os.path.basename(output_path),
-            "speed_chart": os.path.basename(speed_png),
-            "distance_map": os.path.basename(dist_png),
-            "possession_map": os.path.basename(poss_png),
-            "radar_chart": os.path.basename(radar_png),
+            "video_deferred": not render_video,
+            "preview": preview is not None,
+            "speed_chart": chart_file("speed"),
+            "distance_map": chart_file("distance"),
+            "possession_map": chart_file("possession"),
+            "radar_chart": chart_file("radar"),
+            "heatmap_chart": chart_file("heatmap"),
             "analysis_json": os.path.basename(analysis_json),
             "player_stats": compiled,
-            "top_performance": performance
+            "event_counts": values["events"].counts(),
+            "top_performance": performance,
+            # Data-only mode: the chart inputs for client-side rendering instead of PNGs
+            "chart_data": chart_data if images is None else None,
         }
 
     except Exception as e:
         traceback.print_exc()
         print("Pipeline Error:", e)
+        JOBS_TOTAL.labels("failed").inc()
+        return None
+    finally:
+        JOBS_ACTIVE.dec()
+
+
+def preview_then_full(input_path, on_preview=None, params=None, **kwargs):
+    """
+    Run the fast preview pass, hand its result over, then run the full job.
+
+    Args:
+        input_path: Source video path
+        on_preview: Optional callback receiving the preview result as soon as
+            it is ready (e.g. to show it while the full job runs)
+        params: Per-stage overrides applied to both passes
+        **kwargs: Further process_video options for the full-quality pass
+
+    Returns:
+        (preview_result, full_result) tuple
+    """
+    preview_result = process_video(input_path, params=params, preview=True)
+    if on_preview is not None and preview_result:
+        on_preview(preview_result)
+    return preview_result, process_video(input_path, params=params, **kwargs)
+
+
+# ======================================================================
+# DEFERRED RENDERING
+# ======================================================================
+
+def _manifest_path(output_path):
+    base = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(OUTPUT_DIR, f"render_{base}.json")
+
+
+def _load_manifest(output_filename):
+    path = _manifest_path(output_filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def render_deferred(output_filename):
+    """
+    Produce the annotated video for an analytics-only run on first request.
+
+    Rebuilds the run's stage graph, so tracks, camera motion and possession
+    come from the artifact cache and only decode, render and encode execute.
+
+    Args:
+        output_filename: Basename of the processed video, e.g. processed_match.mp4
+
+    Returns:
+        Path of the rendered video, or None if the run is unknown
+    """
+    manifest = _load_manifest(output_filename)
+    if manifest is None:
         return None
 
+    output_path = manifest["output_path"]
+    if os.path.exists(output_path):
+        RESULT_CACHE.labels("video", "hit").inc()
+        return output_path
+    RESULT_CACHE.labels("video", "miss").inc()
+
+    graph, _ = build_pipeline_graph(manifest["source"], output_path, manifest["params"],
+                                    preview=manifest.get("preview"))
+    graph.run(["encode"])
+    _record_stage_metrics(graph.report)
+    return output_path
+
+
+def render_clip(output_filename, start_sec, end_sec):
+    """
+    Render only a time range of an analysed video.
+
+    Only the frames in [start_sec, end_sec) are decoded (by seeking) and
+    annotated from the cached tracks.
+
+    Args:
+        output_filename: Basename of the processed video
+        start_sec: Clip start in seconds
+        end_sec: Clip end in seconds
+
+    Returns:
+        Path of the rendered clip, or None if the run is unknown, a preview
+        or the range is empty
+    """
+    manifest = _load_manifest(output_filename)
+    if manifest is None or manifest.get("preview"):
+        return None
+
+    source = manifest["source"]
+    video_info = get_video_info(source)
+    if not video_info:
+        return None
+
+    fps = float(video_info.get("fps") or 25)
+    total_frames = int(video_info.get("total_frames", 0))
+    start = max(0, int(start_sec * fps))
+    end = min(total_frames, int(end_sec * fps))
+    if end <= start:
+        return None
+
+    base = os.path.splitext(os.path.basename(output_filename))[0]
+    clip_path = os.path.join(OUTPUT_DIR, f"{base}_{start}-{end}.mp4")
+    if os.path.exists(clip_path):
+        RESULT_CACHE.labels("clip", "hit").inc()
+        return clip_path
+    RESULT_CACHE.labels("clip", "miss").inc()
+
+    graph, _ = build_pipeline_graph(source, manifest["output_path"], manifest["params"],
+                                    video_info=video_info)
+    values = graph.run(["kinematics", "possession", "camera"])
+    _record_stage_metrics(graph.report)
+
+    frames = read_video(source, max_frames=end - start, start_frame=start)
+    end = start + len(frames)
+    if not frames:
+        return None
+
+    tracks = {k: v[start:end] for k, v in values["kinematics"].items()}
+    possession = {
+        "team_ball_control": values["possession"]["team_ball_control"][start:end],
+        "ball_owner": values["possession"]["ball_owner"][start:end],
+    }
+    annotated = _render_frames(frames, tracks, possession, values["camera"][start:end])
+    save_video(annotated, clip_path, fps=fps)
+    return clip_path
+
+
+# ======================================================================
+# CLI
+# ======================================================================
+
+def _parse_overrides(items):
+    """Parse ``stage.param=value`` strings into a nested params dict."""
+    params = {}
+    for item in items or []:
+        key, _, raw = item.partition("=")
+        stage, _, name = key.partition(".")
+        if not stage or not name or not raw:
+            raise ValueError(f"Invalid override '{item}', expected stage.param=value")
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        params.setdefault(stage, {})[name] = value
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run or inspect the cached analysis pipeline.")
+    parser.add_argument("video", help="Input video path")
+    parser.add_argument("-o", "--output", default=None, help="Annotated output video path")
+    parser.add_argument("--set", action="append", metavar="STAGE.PARAM=VALUE",
+                        help="Override a stage parameter, e.g. possession.max_player_ball_distance=90")
+    parser.add_argument("--status", action="store_true",
+                        help="Only show which stages would hit or miss the cache")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage")
+    parser.add_argument("--analytics-only", action="store_true",
+                        help="Skip rendering; the video is rendered on first request")
+    parser.add_argument("--preview", action="store_true",
+                        help="Run the fast low-resolution preview first, then the full job")
+    parser.add_argument("--preview-only", action="store_true",
+                        help="Only run the fast low-resolution preview")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Count and time hot inner calls (model.predict, KMeans.fit, ...)")
+    parser.add_argument("--profile", choices=["cprofile", "sampling"], default=None,
+                        help="Write a cProfile or sampling profile of the job")
+    parser.add_argument("--chart-data", action="store_true",
+                        help="Save chart inputs for client-side rendering instead of drawing PNGs")
+    args = parser.parse_args(argv)
+    run_options = {"instrument": args.instrument, "profiler": args.profile,
+                   "charts": "data" if args.chart_data else "png"}
+
+    params = _parse_overrides(args.set)
+
+    if args.status:
+        graph, _ = build_pipeline_graph(args.video, args.output, params)
+        for name, state, key in graph.status(["encode", "chart_data"]):
+            print(f"{name:<11} {state:<8} {key[:12]}")
+        return 0
+
+    if args.preview_only:
+        result = process_video(args.video, params=params, use_cache=not args.no_cache, preview=True,
+                               **run_options)
+        return 0 if result else 1
+
+    if args.preview:
+        def show(p):
+            print(f"Preview possession: {p['team_possession']}, video: {p['processed_filename']}")
+        _, result = preview_then_full(args.video, on_preview=show, params=params,
+                                      output_path=args.output, use_cache=not args.no_cache,
+                                      render_video=not args.analytics_only, **run_options)
+        return 0 if result else 1
+
+    result = process_video(args.video, args.output, params, use_cache=not args.no_cache,
+                           render_video=not args.analytics_only, **run_options)
+    return 0 if result else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
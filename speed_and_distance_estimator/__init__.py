@@ -1,4 +1,5 @@
 """Speed and distance estimator package initialization."""
 from .speed_and_distance_estimator import SpeedAndDistanceEstimator
+from .trajectory_smoother import TrajectorySmoother
 
-__all__ = ['SpeedAndDistanceEstimator']
+__all__ = ['SpeedAndDistanceEstimator', 'TrajectorySmoother']
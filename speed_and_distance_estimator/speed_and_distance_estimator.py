@@ -12,6 +12,7 @@ class SpeedAndDistanceEstimator:
         """Initialize speed and distance estimator."""
         self.frame_window = 5
         self.frame_rate = 24
+        self.position_key = 'position_transformed'
     
     def add_speed_and_distance_to_tracks(self, tracks):
         """
@@ -38,8 +39,8 @@ class SpeedAndDistanceEstimator:
                     if track_id not in object_tracks[last_frame]:
                         continue
                     
-                    start_position = object_tracks[frame_num][track_id]['position_transformed']
-                    end_position = object_tracks[last_frame][track_id]['position_transformed']
+                    start_position = object_tracks[frame_num][track_id][self.position_key]
+                    end_position = object_tracks[last_frame][track_id][self.position_key]
                     
                     if start_position is None or end_position is None:
                         continue
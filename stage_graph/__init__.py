@@ -0,0 +1,5 @@
+"""Stage graph package initialization."""
+from .artifact_cache import ArtifactCache, fingerprint_file, hash_params
+from .stage_graph import Stage, StageGraph
+
+__all__ = ['ArtifactCache', 'fingerprint_file', 'hash_params', 'Stage', 'StageGraph']
@@ -0,0 +1,82 @@
+"""On-disk artifact cache keyed by content hashes."""
+import hashlib
+import json
+import os
+import pickle
+
+
+def hash_params(*parts):
+    """
+    Build a stable hex digest from JSON-serialisable parts.
+
+    Args:
+        *parts: Values to hash (dicts are hashed with sorted keys)
+
+    Returns:
+        SHA1 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def fingerprint_file(path, head_bytes=1 << 20):
+    """
+    Cheap fingerprint of a (possibly huge) input file.
+
+    Hashes the size, modification time and the first ``head_bytes`` of the
+    file instead of the whole content so that multi-GB match videos can be
+    keyed in milliseconds.
+
+    Args:
+        path: File path
+        head_bytes: Number of leading bytes to include in the digest
+
+    Returns:
+        SHA1 hex digest, or None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+
+    st = os.stat(path)
+    h = hashlib.sha1()
+    h.update(f"{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    with open(path, "rb") as f:
+        h.update(f.read(head_bytes))
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """Pickle-backed artifact store, one file per cache key."""
+
+    def __init__(self, cache_dir):
+        """
+        Initialize artifact cache.
+
+        Args:
+            cache_dir: Directory holding the cached artifacts
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}_{key[:16]}.pkl")
+
+    def checkpoint_path(self, name, key):
+        """Where a stage may keep resumable partial state for this key."""
+        return os.path.join(self.cache_dir, f"{name}_{key[:16]}.ckpt")
+
+    def has(self, name, key):
+        return os.path.exists(self.path(name, key))
+
+    def load(self, name, key):
+        with open(self.path(name, key), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, name, key, value):
+        """Write atomically so a killed run never leaves a truncated artifact."""
+        path = self.path(name, key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return path
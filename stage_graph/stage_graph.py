@@ -0,0 +1,226 @@
+"""DAG executor with cached, incrementally recomputed stages."""
+from contextlib import nullcontext
+import time
+
+from .artifact_cache import hash_params
+
+
+class Stage:
+    """One node of the pipeline graph."""
+
+    def __init__(self, name, func, inputs=(), params=None, version="1",
+                 cacheable=True, validate=None, checkpoint=False, options=None):
+        """
+        Initialize stage.
+
+        Args:
+            name: Unique stage name
+            func: Callable ``func(*input_values, **params)`` producing the artifact
+            inputs: Names of upstream stages whose artifacts are passed positionally
+            params: Keyword parameters passed to ``func`` and hashed into the key
+            version: Bump when the stage implementation changes its output
+            cacheable: Whether the artifact is persisted (False for raw frames)
+            validate: Optional ``validate(value) -> bool`` rejecting stale hits,
+                e.g. when an output file was deleted
+            checkpoint: Pass a key-specific ``checkpoint_path`` keyword to
+                ``func`` so a crashed run can resume where it stopped
+            options: Keyword arguments passed to ``func`` but not hashed, for
+                settings that never change the output (e.g. worker counts)
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = dict(params or {})
+        self.version = version
+        self.cacheable = cacheable
+        self.validate = validate
+        self.checkpoint = checkpoint
+        self.options = dict(options or {})
+
+
+class StageGraph:
+    """
+    Lazily evaluated stage graph.
+
+    Every stage key is the hash of its name, version, parameters and the keys
+    of its inputs, so keys for the whole graph are known before anything runs.
+    Evaluation walks back from the requested targets and stops at the first
+    cache hit: when ``possession`` parameters change, only ``possession`` and
+    its dependants rerun while ``decode``/``track`` are never touched.
+
+    Stages may mutate their input artifacts in place (as the track
+    post-processing steps do); artifacts are persisted before any consumer runs.
+    """
+
+    def __init__(self, cache=None, monitor=None):
+        """
+        Initialize stage graph.
+
+        Args:
+            cache: Optional ArtifactCache; without one every stage recomputes
+            monitor: Optional ``monitor(name)`` context manager wrapped around
+                each computed stage; the dict it yields is merged into that
+                stage's report entry (e.g. Instrumentation.stage)
+        """
+        self.cache = cache
+        self.monitor = monitor
+        self.stages = {}
+        self.sources = {}
+        self.report = []
+        self._keys = {}
+
+    def add_source(self, name, value, fingerprint):
+        """Register an external input (e.g. the video path) with its fingerprint."""
+        self.sources[name] = (value, fingerprint)
+        self._keys = {}
+
+    def add_stage(self, name, func, inputs=(), **kwargs):
+        """Register a stage; see :class:`Stage` for arguments."""
+        if name in self.stages or name in self.sources:
+            raise ValueError(f"Duplicate stage name: {name}")
+        for dep in inputs:
+            if dep not in self.stages and dep not in self.sources:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = Stage(name, func, inputs, **kwargs)
+        self._keys = {}
+        return self.stages[name]
+
+    def set_params(self, name, **params):
+        """Override parameters of an already registered stage."""
+        self.stages[name].params.update(params)
+        self._keys = {}
+
+    # ------------------- KEYS -------------------
+
+    def key(self, name):
+        if name in self._keys:
+            return self._keys[name]
+
+        if name in self.sources:
+            k = hash_params("source", name, self.sources[name][1])
+        else:
+            stage = self.stages[name]
+            k = hash_params(stage.name, stage.version, stage.params,
+                            [self.key(dep) for dep in stage.inputs])
+        self._keys[name] = k
+        return k
+
+    def _cached(self, name):
+        """Return (hit, value) for a cacheable stage."""
+        stage = self.stages[name]
+        if not stage.cacheable or self.cache is None:
+            return False, None
+
+        key = self.key(name)
+        if not self.cache.has(name, key):
+            return False, None
+
+        try:
+            value = self.cache.load(name, key)
+        except Exception:
+            return False, None
+
+        if stage.validate is not None and not stage.validate(value):
+            return False, None
+        return True, value
+
+    def _hit(self, name):
+        """Whether a cacheable stage would hit, without loading its artifact."""
+        stage = self.stages[name]
+        if not stage.cacheable or self.cache is None:
+            return False
+        if stage.validate is not None:
+            # The validator needs the value (e.g. an output path), so these load
+            return self._cached(name)[0]
+        return self.cache.has(name, self.key(name))
+
+    # ------------------- STATUS -------------------
+
+    def status(self, targets=None):
+        """
+        Dry run: report which stages would hit, miss or be skipped.
+
+        Only checks that each artifact file exists for its key (which covers
+        the params and input keys); artifacts are not unpickled, except for
+        stages with a validator.
+
+        Returns:
+            List of (stage_name, state, key) in registration order, where state
+            is one of ``hit``, ``miss``, ``uncached`` (always recomputed) or
+            ``skip`` (not needed because a dependant hit the cache)
+        """
+        targets = list(targets or self.stages)
+        states = {}
+
+        def visit(name):
+            if name in states or name in self.sources:
+                return
+            if self._hit(name):
+                states[name] = "hit"
+                return
+            stage = self.stages[name]
+            states[name] = "miss" if stage.cacheable and self.cache is not None else "uncached"
+            for dep in stage.inputs:
+                visit(dep)
+
+        for t in targets:
+            visit(t)
+
+        return [(n, states.get(n, "skip"), self.key(n)) for n in self.stages]
+
+    # ------------------- EXECUTION -------------------
+
+    def run(self, targets=None, on_ready=None):
+        """
+        Evaluate the requested targets, recomputing only invalidated stages.
+
+        Args:
+            targets: Stage names to produce (defaults to every stage),
+                evaluated in the given order
+            on_ready: Optional ``on_ready(name, value)`` called as soon as a
+                stage's artifact is available (computed or loaded), e.g. to
+                start background work that overlaps the remaining stages
+
+        Returns:
+            Dict mapping each evaluated stage name to its artifact
+        """
+        targets = list(targets or self.stages)
+        values = {name: src[0] for name, src in self.sources.items()}
+        self.report = []
+
+        def resolve(name):
+            if name in values:
+                return values[name]
+
+            stage = self.stages[name]
+            hit, value = self._cached(name)
+            if hit:
+                self.report.append({"stage": name, "state": "hit", "seconds": 0.0})
+                values[name] = value
+                if on_ready is not None:
+                    on_ready(name, value)
+                return value
+
+            args = [resolve(dep) for dep in stage.inputs]
+            print(f"▶ Stage {name}...")
+            kwargs = dict(stage.params, **stage.options)
+            if stage.checkpoint and self.cache is not None:
+                # Not hashed: the checkpoint location never changes the output
+                kwargs["checkpoint_path"] = self.cache.checkpoint_path(name, self.key(name))
+            with (self.monitor(name) if self.monitor else nullcontext({})) as stats:
+                start = time.perf_counter()
+                value = stage.func(*args, **kwargs)
+                elapsed = time.perf_counter() - start
+
+            if stage.cacheable and self.cache is not None:
+                self.cache.save(name, self.key(name), value)
+            state = "miss" if stage.cacheable and self.cache is not None else "uncached"
+            self.report.append({"stage": name, "state": state, "seconds": round(elapsed, 3), **stats})
+            values[name] = value
+            if on_ready is not None:
+                on_ready(name, value)
+            return value
+
+        for t in targets:
+            resolve(t)
+        return values
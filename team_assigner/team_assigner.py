@@ -1,16 +1,31 @@
 """Team assignment using KMeans clustering."""
 from sklearn.cluster import KMeans
 import numpy as np
+import sys
+sys.path.append('../')
+from utils import BoundedCache
 
 
 class TeamAssigner:
-    """Assign players to teams based on shirt colors."""
+    """
+    Assign players to teams based on shirt colors.
 
-    def __init__(self):
-        """Initialize team assigner."""
+    Per-player colors and teams are cached by track ID in bounded LRU/TTL
+    caches, so memory stays flat on open-ended streams where IDs keep
+    appearing; an evicted player is simply re-classified if seen again.
+    """
+
+    def __init__(self, max_tracks=2048, track_ttl=None):
+        """
+        Initialize team assigner.
+
+        Args:
+            max_tracks: Maximum number of track IDs kept in the per-player caches
+            track_ttl: Optional seconds after which a cached player is re-classified
+        """
         self.team_colors = {}
-        self.player_team_dict = {}
-        self.player_color_cache = {}
+        self.player_team_dict = BoundedCache(max_tracks, track_ttl)
+        self.player_color_cache = BoundedCache(max_tracks, track_ttl)
 
     def get_player_color(self, frame, bbox, player_id=None):
         """
@@ -24,8 +39,10 @@ class TeamAssigner:
         Returns:
             Dominant color (BGR) as numpy array
         """
-        if player_id and player_id in self.player_color_cache:
-            return self.player_color_cache[player_id]
+        if player_id:
+            color = self.player_color_cache.get(player_id)
+            if color is not None:
+                return color
 
         x1, y1, x2, y2 = map(int, bbox)
         # Clip bbox to frame bounds
@@ -114,8 +131,9 @@ class TeamAssigner:
         """
         Get team assignment for a player.
         """
-        if player_id in self.player_team_dict:
-            return self.player_team_dict[player_id]
+        team_id = self.player_team_dict.get(player_id)
+        if team_id is not None:
+            return team_id
 
         player_color = self.get_player_color(frame, player_bbox, player_id)
         team_id = int(self.kmeans.predict(np.array(player_color).reshape(1, -1))[0]) + 1
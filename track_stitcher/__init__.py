@@ -0,0 +1,4 @@
+"""Track stitcher package initialization."""
+from .track_stitcher import TrackStitcher
+
+__all__ = ['TrackStitcher']
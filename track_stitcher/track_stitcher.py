@@ -0,0 +1,170 @@
+"""Merge fragmented ByteTrack IDs into persistent player identities."""
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import BoundedCache, get_foot_position
+
+
+class TrackStitcher:
+    """
+    Re-identify players whose track ID changed after an occlusion or missed detection.
+
+    Frames are processed in order. When an unseen track ID appears, it is
+    matched against identities lost within the last max_gap seconds: the
+    new box's foot point must lie within the distance a player could have
+    run in the gap (max_speed, plus slack for box jitter and camera pans),
+    and its mean shirt color must be close to the identity's. Matches are
+    assigned greedily by combined cost. An unmatched ID starts a new
+    identity, named after itself when that name is free.
+
+    Works online (update() per frame, used by live mode) and offline
+    (stitch_tracks() over a whole video). The raw-ID map is an LRU, and
+    identities that cannot be matched any more are dropped, so state stays
+    bounded on open-ended streams.
+    """
+
+    def __init__(self, fps=24, frame_width=1920, max_gap=2.0, max_speed=0.25, slack=0.03,
+                 max_color_distance=60.0, color_interval=0.5, max_ids=4096):
+        """
+        Initialize track stitcher.
+
+        Args:
+            fps: Frame rate of the processed frames
+            frame_width: Width of the processed frames in pixels
+            max_gap: Longest gap (s) across which fragments are merged
+            max_speed: Fastest plausible foot-point motion, in frame widths per second
+            slack: Distance always allowed, in frame widths
+            max_color_distance: Largest BGR distance between shirt colors
+            color_interval: Seconds between shirt color refreshes of a visible identity
+            max_ids: Raw track IDs remembered in the ID map (LRU)
+        """
+        self.fps = fps
+        self.max_gap_frames = max(1, int(round(max_gap * fps)))
+        self.max_step = max_speed * frame_width / fps
+        self.slack = slack * frame_width
+        self.max_color_distance = max_color_distance
+        self.color_interval = max(1, int(round(color_interval * fps)))
+
+        self.id_map = BoundedCache(max_ids)     # raw track ID -> identity
+        self._identities = {}                   # identity -> {"frame", "pos", "color", "color_frame"}
+        self._spare_id = 1_000_000                # identities for IDs whose own name is taken
+        self.fragments = 0
+        self.merged = 0
+
+    @staticmethod
+    def shirt_color(frame, bbox):
+        """Mean BGR color of the central upper half of a player box (cheap appearance cue)."""
+        x1, y1, x2, y2 = map(int, bbox)
+        h, w = frame.shape[:2]
+        bw, bh = x2 - x1, y2 - y1
+        x1, x2 = max(0, x1 + bw // 4), min(w, x2 - bw // 4)
+        y1, y2 = max(0, y1 + bh // 8), min(h, y1 + bh // 2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2].reshape(-1, 3).mean(axis=0)
+
+    def _expire(self, frame_index):
+        for identity in [i for i, s in self._identities.items()
+                         if frame_index - s["frame"] > self.max_gap_frames]:
+            del self._identities[identity]
+
+    def _match(self, frame_index, new, present):
+        """Greedily match new raw IDs to recently lost identities; returns {raw: identity}."""
+        candidates = []
+        for raw, (pos, color) in new.items():
+            for identity, state in self._identities.items():
+                gap = frame_index - state["frame"]
+                if identity in present or gap <= 0:
+                    continue
+                reach = self.max_step * gap + self.slack
+                dist = float(np.hypot(pos[0] - state["pos"][0], pos[1] - state["pos"][1]))
+                if dist > reach:
+                    continue
+                cost = dist / reach
+                if color is not None and state["color"] is not None:
+                    color_dist = float(np.linalg.norm(color - state["color"]))
+                    if color_dist > self.max_color_distance:
+                        continue
+                    cost += color_dist / self.max_color_distance
+                candidates.append((cost, raw, identity))
+
+        matches = {}
+        used = set()
+        for _, raw, identity in sorted(candidates, key=lambda c: c[0]):
+            if raw in matches or identity in used:
+                continue
+            matches[raw] = identity
+            used.add(identity)
+        return matches
+
+    def update(self, frame, frame_index, players):
+        """
+        Relabel one frame's player tracks with persistent identities.
+
+        Args:
+            frame: BGR frame the boxes belong to (for shirt colors)
+            frame_index: Index of the frame
+            players: {raw track ID: track info with 'bbox'}
+
+        Returns:
+            {identity: track info}, the same info dicts re-keyed
+        """
+        self._expire(frame_index)
+
+        out = {}
+        new = {}
+        for raw, info in players.items():
+            identity = self.id_map.get(raw)
+            # A re-found ID whose identity was taken over meanwhile is matched afresh
+            if identity is None or identity in out:
+                pos = info.get("position") or get_foot_position(info["bbox"])
+                new[raw] = (pos, self.shirt_color(frame, info["bbox"]))
+            else:
+                out[identity] = info
+
+        if new:
+            self.fragments += len(new)
+            matches = self._match(frame_index, new, out)
+            for raw, (pos, color) in new.items():
+                if raw in matches:
+                    identity = matches[raw]
+                    self.merged += 1
+                elif raw in out or raw in self._identities:
+                    identity = self._spare_id
+                    self._spare_id += 1
+                else:
+                    identity = raw
+                self.id_map[raw] = identity
+                out[identity] = players[raw]
+                state = self._identities.setdefault(identity, {"color": None, "color_frame": frame_index})
+                if color is not None:
+                    state["color"] = color
+                    state["color_frame"] = frame_index
+
+        for identity, info in out.items():
+            state = self._identities.setdefault(identity, {"color": None, "color_frame": frame_index})
+            state["frame"] = frame_index
+            state["pos"] = info.get("position") or get_foot_position(info["bbox"])
+            if frame_index - state["color_frame"] >= self.color_interval or state["color"] is None:
+                color = self.shirt_color(frame, info["bbox"])
+                if color is not None:
+                    state["color"] = color if state["color"] is None else 0.5 * (state["color"] + color)
+                state["color_frame"] = frame_index
+        return out
+
+    def stitch_tracks(self, frames, tracks, objects=('players',)):
+        """
+        Relabel whole-video tracks (returns new per-frame dicts; track infos are shared).
+
+        Args:
+            frames: Video frames matching the tracks
+            tracks: Dictionary of tracks
+            objects: Object types to stitch
+
+        Returns:
+            Tracks with fragment IDs merged into identities
+        """
+        for obj in objects:
+            tracks[obj] = [self.update(frame, fi, frame_tracks)
+                           for fi, (frame, frame_tracks) in enumerate(zip(frames, tracks.get(obj, [])))]
+        return tracks
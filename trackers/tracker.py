@@ -4,21 +4,23 @@ import supervision as sv
 import pickle
 import os
 import numpy as np
-import pandas as pd
 import cv2
 import sys
 sys.path.append('../')
-from utils import get_center_of_bbox, get_bbox_width, get_foot_position
+from utils import get_center_of_bbox, get_bbox_width, get_foot_position, interpolate_ball_positions
+from utils.checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
 
 
 class Tracker:
     """Tracker class for detecting and tracking objects in video."""
 
     def __init__(self, model_path):
-        self.model = YOLO(model_path)
+        # A ready detector with YOLO's predict() interface (e.g. a benchmark stub) is used as is
+        self.model = model_path if hasattr(model_path, "predict") else YOLO(model_path)
         self.tracker = sv.ByteTrack()
 
-    def add_position_to_tracks(self, tracks):
+    @staticmethod
+    def add_position_to_tracks(tracks):
         for obj, obj_tracks in tracks.items():
             for frame_num, track in enumerate(obj_tracks):
                 for tid, tinfo in track.items():
@@ -30,15 +32,16 @@ class Tracker:
                     tracks[obj][frame_num][tid]['position'] = pos
         return tracks
 
-    def interpolate_ball_positions(self, ball_positions):
-        ball_positions = [x.get(1, {}).get('bbox', []) for x in ball_positions]
-        df = pd.DataFrame(ball_positions, columns=['x1','y1','x2','y2'])
-        df = df.interpolate().bfill()
-        return [{1: {"bbox": row}} for row in df.to_numpy().tolist()]
+    @staticmethod
+    def interpolate_ball_positions(ball_positions):
+        # BallTrajectoryFilter's batch mode with a whole-clip lookahead,
+        # i.e. DataFrame.interpolate().bfill()
+        return interpolate_ball_positions(ball_positions)
 
     def detect_frames(self, frames, batch_size=32):
         detections = []
-        frames = list(frames)
+        if not hasattr(frames, "__getitem__"):
+            frames = list(frames)
         total = len(frames)
 
         print(f"🔍 YOLO inference on {total} frames (batch={batch_size})")
@@ -50,48 +53,111 @@ class Tracker:
 
         return detections
 
-    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
-        if read_from_stub and stub_path and os.path.exists(stub_path):
-            return pickle.load(open(stub_path, 'rb'))
+    def update(self, det):
+        """
+        Run ByteTrack on one frame's detection result.
 
-        detections = self.detect_frames(frames)
-        tracks = {"players": [], "referees": [], "ball": []}
+        Args:
+            det: Ultralytics result for a single frame
+
+        Returns:
+            {"players": {tid: {"bbox"}}, "referees": {...}, "ball": {1: {"bbox"}}}
+            for that frame
+        """
+        cls_names = det.names
+        cls_inv = {v: k for k, v in cls_names.items()}
+
+        det_super = sv.Detections.from_ultralytics(det)
 
-        for fi, det in enumerate(detections):
-            cls_names = det.names
-            cls_inv = {v: k for k, v in cls_names.items()}
+        # goalkeeper → player
+        for i, cid in enumerate(det_super.class_id):
+            if cls_names[cid] == "goalkeeper":
+                det_super.class_id[i] = cls_inv["player"]
 
-            det_super = sv.Detections.from_ultralytics(det)
+        tracked = self.tracker.update_with_detections(det_super)
 
-            # goalkeeper → player
-            for i, cid in enumerate(det_super.class_id):
-                if cls_names[cid] == "goalkeeper":
-                    det_super.class_id[i] = cls_inv["player"]
+        frame = {"players": {}, "referees": {}, "ball": {}}
 
-            tracked = self.tracker.update_with_detections(det_super)
+        for obj in tracked:
+            bbox = obj[0].tolist()
+            cid = obj[3]
+            tid = obj[4]
 
-            tracks["players"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
+            if cid == cls_inv["player"]:
+                frame["players"][tid] = {"bbox": bbox}
+            if cid == cls_inv["referee"]:
+                frame["referees"][tid] = {"bbox": bbox}
 
-            for obj in tracked:
-                bbox = obj[0].tolist()
-                cid = obj[3]
-                tid = obj[4]
+        for d in det_super:
+            bbox = d[0].tolist()
+            cid = d[3]
+            if cid == cls_inv["ball"]:
+                frame["ball"][1] = {"bbox": bbox}
 
-                if cid == cls_inv["player"]:
-                    tracks["players"][fi][tid] = {"bbox": bbox}
-                if cid == cls_inv["referee"]:
-                    tracks["referees"][fi][tid] = {"bbox": bbox}
+        return frame
 
-            for d in det_super:
-                bbox = d[0].tolist()
-                cid = d[3]
-                if cid == cls_inv["ball"]:
-                    tracks["ball"][fi][1] = {"bbox": bbox}
+    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None,
+                          checkpoint_path=None, checkpoint_interval=500, batch_size=32,
+                          imgsz=None):
+        """
+        Detect and track objects in all frames.
+
+        Detection and tracking are interleaved per batch so that, with a
+        checkpoint_path, the partial track table and the ByteTrack internals
+        (Kalman states, lost/removed tracks) can be saved every
+        checkpoint_interval frames. A restarted run resumes after the last
+        checkpointed frame instead of frame 0.
+
+        Args:
+            frames: List (or FrameStore) of video frames
+            read_from_stub: Whether to read from cached stub
+            stub_path: Path to stub file
+            checkpoint_path: Optional checkpoint file for crash-safe resume
+            checkpoint_interval: Frames between checkpoints
+            batch_size: YOLO inference batch size
+            imgsz: Optional YOLO input size (smaller is faster, e.g. for previews)
+
+        Returns:
+            Dictionary of tracks per object type
+        """
+        if read_from_stub and stub_path and os.path.exists(stub_path):
+            return pickle.load(open(stub_path, 'rb'))
+
+        tracks = {"players": [], "referees": [], "ball": []}
+        start = 0
+
+        state = load_checkpoint(checkpoint_path)
+        if state is not None:
+            tracks = state["tracks"]
+            self.tracker = state["tracker"]
+            start = state["frame_index"]
+
+        if not hasattr(frames, "__getitem__"):
+            frames = list(frames)
+        total = len(frames)
+        last_saved = start
+
+        print(f"🔍 YOLO inference on {total - start} frames (batch={batch_size})")
+
+        predict_kwargs = {"imgsz": imgsz} if imgsz else {}
+        for i in range(start, total, batch_size):
+            batch = frames[i:i+batch_size]
+            for det in self.model.predict(batch, conf=0.1, verbose=False, **predict_kwargs):
+                for k, v in self.update(det).items():
+                    tracks[k].append(v)
+
+            done = i + len(batch)
+            if checkpoint_path and done - last_saved >= checkpoint_interval and done < total:
+                save_checkpoint(checkpoint_path, {
+                    "frame_index": done,
+                    "tracks": tracks,
+                    "tracker": self.tracker,
+                })
+                last_saved = done
 
         if stub_path:
             pickle.dump(tracks, open(stub_path, 'wb'))
+        clear_checkpoint(checkpoint_path)
 
         return tracks
 
@@ -9,7 +9,10 @@ from .bbox_utils import (
     draw_ellipse,
     draw_triangle
 )
-from .ball_interpolation import interpolate_ball_positions_fast as interpolate_ball_positions
+from .ball_interpolation import interpolate_ball_positions, BallTrajectoryFilter
+from .bounded_cache import BoundedCache
+from .frame_store import FrameStore
+from .possession_segments import PossessionSegments
 
 
 __all__ = [
@@ -24,5 +27,9 @@ __all__ = [
     'get_foot_position',
     'draw_ellipse',
     'draw_triangle',
-    'interpolate_ball_positions'
+    'interpolate_ball_positions',
+    'BallTrajectoryFilter',
+    'BoundedCache',
+    'FrameStore',
+    'PossessionSegments'
 ]
@@ -0,0 +1,169 @@
+"""Compact analysis output: JSON summary, run-length possession and typed per-player series."""
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 2
+
+# Per-frame fields stored run-length encoded in the summary JSON
+RLE_FIELDS = ("team_ball_control", "ball_owner")
+
+# Arrays of the series file, one entry per (player, frame) sorted by player
+# then frame: name -> (column of the tracks_to_series table, dtype)
+SERIES_FIELDS = {
+    "frame": (1, np.int32),
+    "speed": (3, np.float32),
+    "distance": (4, np.float32),
+    "x": (5, np.float32),
+    "y": (6, np.float32),
+}
+
+
+# ------------------- RUN-LENGTH ENCODING -------------------
+
+def rle_encode(values):
+    """
+    Run-length encode a 1-D sequence.
+
+    Returns:
+        {"values": [...], "lengths": [...]} with one entry per run
+    """
+    arr = np.asarray(values)
+    if arr.size == 0:
+        return {"values": [], "lengths": []}
+    starts = np.flatnonzero(np.r_[True, arr[1:] != arr[:-1]])
+    lengths = np.diff(np.r_[starts, arr.size])
+    return {"values": arr[starts].tolist(), "lengths": lengths.tolist()}
+
+
+def rle_decode(runs, dtype=np.int64):
+    """Expand rle_encode() output back into a numpy array."""
+    return np.repeat(np.asarray(runs["values"], dtype=dtype), np.asarray(runs["lengths"], dtype=np.int64))
+
+
+# ------------------- PER-PLAYER SERIES -------------------
+
+def tracks_to_series(tracks):
+    """
+    Flatten per-frame player tracks into typed arrays.
+
+    Entries are sorted by player then frame; player ``i`` owns
+    ``offsets[i]:offsets[i + 1]`` of every per-entry array, so one player's
+    series is a slice rather than a scan.
+
+    Returns:
+        Dict of numpy arrays: player_ids, teams, offsets and SERIES_FIELDS
+    """
+    rows = []
+    for frame_num, frame_tracks in enumerate(tracks.get("players", [])):
+        for pid, info in frame_tracks.items():
+            pos = info.get("position_smoothed")
+            if pos is None:
+                pos = info.get("position_transformed")
+            if pos is None:
+                pos = (np.nan, np.nan)
+            rows.append((int(pid), frame_num, int(info.get("team", 0)),
+                         info.get("speed", np.nan), info.get("distance", np.nan), pos[0], pos[1]))
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 7)
+    table = table[np.lexsort((table[:, 1], table[:, 0]))]
+    pids = table[:, 0].astype(np.int64)
+    player_ids, starts = np.unique(pids, return_index=True)
+
+    series = {
+        "player_ids": player_ids,
+        "teams": table[starts, 2].astype(np.int8),
+        "offsets": np.r_[starts, len(pids)].astype(np.int64),
+    }
+    for name, (col, dtype) in SERIES_FIELDS.items():
+        series[name] = table[:, col].astype(dtype)
+    return series
+
+
+def player_series(series, player_id):
+    """Slice one player's arrays out of a tracks_to_series()/load_series() result."""
+    ids = series["player_ids"]
+    i = int(np.searchsorted(ids, int(player_id)))
+    if i >= len(ids) or ids[i] != int(player_id):
+        return None
+    start, end = series["offsets"][i], series["offsets"][i + 1]
+    return {name: series[name][start:end] for name in SERIES_FIELDS if name in series}
+
+
+# ------------------- SAVE / LOAD -------------------
+
+def series_path_for(json_path):
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def save_analysis(analysis, json_path, series=None):
+    """
+    Write an analysis as a compact JSON summary plus an optional series file.
+
+    RLE_FIELDS found in ``analysis`` are stored as runs under "possession"
+    instead of one value per frame; ``series`` (tracks_to_series output) goes
+    to a compressed .npz next to the JSON.
+
+    Returns:
+        json_path
+    """
+    summary = {k: v for k, v in analysis.items() if k not in RLE_FIELDS}
+    summary["format"] = FORMAT_VERSION
+    runs = {k: rle_encode(analysis[k]) for k in RLE_FIELDS if analysis.get(k) is not None}
+    if runs:
+        summary["possession"] = runs
+    if series is not None:
+        npz_path = series_path_for(json_path)
+        np.savez_compressed(npz_path, **series)
+        summary["series"] = os.path.basename(npz_path)
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    return json_path
+
+
+def load_analysis(json_path, fields=None):
+    """
+    Load an analysis summary, decoding only the requested fields.
+
+    Args:
+        json_path: analysis_<name>.json written by save_analysis (older
+            files with per-frame lists are read as well)
+        fields: Top-level keys to return (default: all); RLE_FIELDS are
+            expanded to per-frame arrays only when asked for
+
+    Returns:
+        Dict of the requested fields
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+
+    wanted = set(fields) if fields is not None else set(summary) | set(RLE_FIELDS)
+    result = {k: v for k, v in summary.items() if k in wanted}
+    for name in RLE_FIELDS:
+        if name not in wanted:
+            continue
+        runs = summary.get("possession", {}).get(name)
+        if runs is not None:
+            result[name] = rle_decode(runs)
+        elif name in summary:
+            result[name] = np.asarray(summary[name])
+    return result
+
+
+def load_series(json_path, names=None):
+    """
+    Read per-player arrays from the .npz next to an analysis JSON.
+
+    Only the requested arrays are decompressed (the index arrays
+    player_ids, teams and offsets are always included).
+
+    Returns:
+        Dict of numpy arrays, or None if the analysis has no series file
+    """
+    path = series_path_for(json_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        keys = list(data.files) if names is None else ["player_ids", "teams", "offsets", *names]
+        return {k: data[k] for k in keys if k in data.files}
@@ -1,41 +1,286 @@
-"""Ball interpolation utilities."""
-import pandas as pd
+"""Ball trajectory gap filling: a streaming filter with a vectorized batch mode."""
+from collections import deque
 import numpy as np
 
-def interpolate_ball_positions_fast(ball_positions):
+
+def _ball_bboxes(ball_positions):
+    """(n, 4) float array of ball bboxes, NaN rows where the ball is missing."""
+    bboxes = np.full((len(ball_positions), 4), np.nan)
+    for i, frame_data in enumerate(ball_positions):
+        bbox = frame_data.get(1, {}).get('bbox')
+        if bbox is not None and len(bbox) == 4:
+            bboxes[i] = bbox
+    return bboxes
+
+
+def interpolate_ball_positions(ball_positions):
+    """
+    Fill ball gaps over a whole video.
+
+    BallTrajectoryFilter's batch mode with a lookahead covering the whole
+    clip: every gap is linearly interpolated, frames before the first
+    detection take the first detection and frames after the last one keep
+    the last, which matches ``DataFrame.interpolate().bfill()``.
+
+    Args:
+        ball_positions: Per-frame ball tracks, ``{1: {"bbox": [...]}}`` or ``{}``
+
+    Returns:
+        Per-frame ball tracks (``{}`` throughout if the ball was never detected)
+    """
+    return BallTrajectoryFilter(delay=len(ball_positions)).run(ball_positions)
+
+
+class _ConstantVelocityKalman:
+    """Constant-velocity Kalman filter on the ball center (state x, y, vx, vy)."""
+
+    F = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=np.float64)
+    H = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float64)
+
+    def __init__(self, center, process_noise, measurement_noise):
+        self.x = np.array([center[0], center[1], 0.0, 0.0])
+        self.P = np.diag([measurement_noise, measurement_noise, 100.0, 100.0])
+        self.Q = np.eye(4) * process_noise
+        self.R = np.eye(2) * measurement_noise
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.x[:2]
+
+    def update(self, center):
+        y = np.asarray(center, dtype=np.float64) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(4) - K @ self.H) @ self.P
+        return self.x[:2]
+
+
+class BallTrajectoryFilter:
     """
-    Pure numpy interpolation: 2x faster than pandas.
+    Streaming ball gap filler emitting positions with a fixed delay.
+
+    Frames are pushed as they are tracked and come out ``delay`` frames
+    later. A gap that closes within the lookahead window is linearly
+    interpolated, exactly like the batch mode. A longer gap is bridged with a
+    constant-velocity Kalman prediction for up to ``max_predict`` frames and
+    then holds the last position (or reports the ball as lost with hold=False). With ``smooth=True`` detections themselves
+    are replaced by the filtered center (bbox size kept).
+
+    Memory is bounded by the window, so it runs on live streams; delay=0
+    gives a purely causal filter. run() applies the same rules to a whole
+    list of frames at once, vectorized over the frames; only the Kalman
+    recursion steps from detection to detection.
     """
-    # Extract bboxes
-    bboxes = []
-    for frame_data in ball_positions:
-        bbox = frame_data.get(1, {}).get('bbox', [np.nan]*4)
-        bboxes.append(bbox)
-    
-    bboxes = np.array(bboxes, dtype=np.float64)
-    
-    # Handle each column (x1, y1, x2, y2)
-    for col in range(4):
-        mask = ~np.isnan(bboxes[:, col])
-        if not mask.any():
-            continue
-        
-        # Linear interpolation + forward/backward fill
-        valid_indices = np.where(mask)[0]
-        valid_values = bboxes[mask, col]
-        
-        all_indices = np.arange(len(bboxes))
-        interpolated = np.interp(all_indices, valid_indices, valid_values)
-        
-        bboxes[:, col] = interpolated
-    
-    # Forward fill any remaining NaNs
-    for col in range(4):
-        mask = ~np.isnan(bboxes[:, col])
-        if mask.any():
-            first_valid = np.where(mask)[0][0]
-            if first_valid > 0:
-                bboxes[:first_valid, col] = bboxes[first_valid, col]
-    
-    # Convert back to original format
-    return [{1: {"bbox": bbox}} for bbox in bboxes.tolist()]
+
+    def __init__(self, delay=12, max_predict=None, smooth=False, hold=True,
+                 process_noise=1.0, measurement_noise=4.0):
+        """
+        Initialize ball trajectory filter.
+
+        Args:
+            delay: Lookahead in frames; output lags input by this many frames
+            max_predict: Frames a lost ball is extrapolated (defaults to 2 * delay, at least 5)
+            smooth: Emit Kalman-filtered centers for detected frames
+            hold: Keep the last position after max_predict (False emits None)
+            process_noise: Kalman process noise (pixels^2 per frame)
+            measurement_noise: Kalman measurement noise (pixels^2)
+        """
+        self.delay = delay
+        self.max_predict = max(5, 2 * delay) if max_predict is None else max_predict
+        self.smooth = smooth
+        self.hold = hold
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+
+        self._pending = deque()     # [index, bbox or None] awaiting output
+        self._next_index = 0
+        self._kalman = None
+        self._last = None           # (index, bbox) of the last detection
+        self._last_out = None       # last emitted bbox
+        self._predicted = 0         # consecutive frames emitted from prediction
+
+    def push(self, bbox):
+        """
+        Add the next frame's ball bbox (None or empty when not detected).
+
+        Returns:
+            List of (frame_index, bbox) now ready for output; bbox is None
+            before the ball was ever seen (or once it is lost, with hold=False)
+        """
+        index = self._next_index
+        self._next_index += 1
+        bbox = list(map(float, bbox)) if bbox is not None and len(bbox) == 4 else None
+
+        if bbox is not None:
+            center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+            if self._kalman is None:
+                self._kalman = _ConstantVelocityKalman(center, self.process_noise, self.measurement_noise)
+            else:
+                self._kalman.update(center)
+            if self.smooth:
+                cx, cy = self._kalman.x[:2]
+                w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                bbox = [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+            self._fill_gap(index, bbox)
+            self._last = (index, bbox)
+
+        self._pending.append([index, bbox])
+        if self._kalman is not None:
+            self._kalman.predict()
+
+        out = []
+        while self._pending and self._pending[0][0] <= index - self.delay:
+            out.append(self._emit(self._pending.popleft()))
+        return out
+
+    def flush(self):
+        """Emit every frame still held back (end of stream); trailing gaps hold the last position."""
+        out = []
+        while self._pending:
+            entry = self._pending.popleft()
+            if entry[1] is None and self._last is not None:
+                entry[1] = self._last[1]
+            out.append(self._emit(entry))
+        return out
+
+    def _fill_gap(self, index, bbox):
+        """Linearly interpolate pending frames between the last detection and this one."""
+        gap = [e for e in self._pending if e[1] is None]
+        if not gap:
+            return
+        if self._last is None:
+            # Before the first detection: take the first detection (bfill)
+            for e in gap:
+                e[1] = list(bbox)
+            return
+        i0, b0 = self._last
+        b0, b1 = np.asarray(b0), np.asarray(bbox)
+        for e in gap:
+            t = (e[0] - i0) / (index - i0)
+            e[1] = (b0 + (b1 - b0) * t).tolist()
+
+    def _emit(self, entry):
+        index, bbox = entry
+        if bbox is not None:
+            self._predicted = 0
+        elif self._last is not None:
+            # Gap longer than the lookahead: extrapolate, then hold
+            if self._predicted < self.max_predict and self._last_out is not None:
+                self._predicted += 1
+                # The Kalman prior is at frame _next_index; step back to this frame
+                cx, cy, vx, vy = self._kalman.x
+                lag = self._next_index - index
+                px, py = cx - vx * lag, cy - vy * lag
+                w = self._last[1][2] - self._last[1][0]
+                h = self._last[1][3] - self._last[1][1]
+                bbox = [px - w / 2, py - h / 2, px + w / 2, py + h / 2]
+            elif self.hold:
+                bbox = self._last_out
+            else:
+                return index, None
+        self._last_out = bbox
+        return index, bbox
+
+    def _kalman_states(self, centers, det):
+        """
+        Posterior (center, velocity) at every detection, as push() computes them.
+
+        x and y evolve independently with the same covariance, so the
+        recursion runs on one 2x2 covariance and k predict steps are applied
+        in closed form.
+        """
+        q, r = self.process_noise, self.measurement_noise
+        zs = centers.tolist()
+        steps = np.diff(det).tolist()
+        x, y = zs[0]
+        vx = vy = 0.0
+        states = [(x, y, vx, vy)]
+        p00, p01, p10, p11 = r, 0.0, 0.0, 100.0
+        for k, (zx, zy) in zip(steps, zs[1:]):
+            s1, s2 = k * (k - 1) / 2, (k - 1) * k * (2 * k - 1) / 6
+            # P <- F^k P F^kT + sum_j F^j Q F^jT
+            p00, p01, p10, p11 = (p00 + k * (p01 + p10) + k * k * p11 + q * (k + s2),
+                                  p01 + k * p11 + q * s1, p10 + k * p11 + q * s1, p11 + q * k)
+            x, y = x + vx * k, y + vy * k
+            k0, k1 = p00 / (p00 + r), p10 / (p00 + r)
+            ix, iy = zx - x, zy - y
+            x, y, vx, vy = x + k0 * ix, y + k0 * iy, vx + k1 * ix, vy + k1 * iy
+            p00, p01, p10, p11 = p00 - k0 * p00, p01 - k0 * p01, p10 - k1 * p00, p11 - k1 * p01
+            states.append((x, y, vx, vy))
+        states = np.asarray(states)
+        return states[:, :2], states[:, 2:]
+
+    def run(self, ball_positions):
+        """
+        Filter a whole list of per-frame ball tracks in one vectorized pass.
+
+        Produces what pushing every frame and flushing would, for a fresh
+        filter: with the lookahead `delay`, the last `delay` frames of a gap
+        are interpolated, earlier ones follow the Kalman prediction from the
+        detection before the gap (then hold), and trailing frames within the
+        lookahead keep the last detection.
+
+        Returns:
+            Per-frame ball tracks; frames with no ball yet are ``{}``
+        """
+        n = len(ball_positions)
+        bboxes = _ball_bboxes(ball_positions)
+        det = np.flatnonzero(~np.isnan(bboxes[:, 0]))
+        if not det.size:
+            return [{} for _ in range(n)]
+
+        boxes = bboxes[det]
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        size = boxes[:, 2:] - boxes[:, :2]
+        frames = np.arange(n)
+        prev = np.searchsorted(det, frames, side="right") - 1      # last detection at or before
+        gap = np.ones(n, dtype=bool)
+        gap[det] = False
+
+        # Which gap frames are filled from the lookahead (interpolated, bfilled or held)
+        lead = prev < 0
+        trail = gap & (prev == det.size - 1)
+        inner = gap & ~lead & ~trail
+        nxt = np.minimum(prev + 1, det.size - 1)
+        from_window = np.zeros(n, dtype=bool)
+        from_window[lead] = frames[lead] >= det[0] - self.delay
+        from_window[trail] = frames[trail] >= n - self.delay
+        from_window[inner] = frames[inner] >= det[nxt[inner]] - self.delay
+        predicted = gap & ~lead & ~from_window
+
+        need_kalman = self.smooth or (predicted.any() and self.max_predict > 0)
+        if need_kalman:
+            pos, vel = self._kalman_states(centers, det)
+            if self.smooth:
+                boxes = np.hstack([pos - size / 2, pos + size / 2])
+
+        out = np.full((n, 4), np.nan)
+        out[det] = boxes
+        out[lead & from_window] = boxes[0]
+        out[trail & from_window] = boxes[-1]
+        interp = inner & from_window
+        i0, i1 = det[prev[interp]], det[nxt[interp]]
+        t = ((frames[interp] - i0) / (i1 - i0))[:, None]
+        b0, b1 = boxes[prev[interp]], boxes[nxt[interp]]
+        out[interp] = b0 + (b1 - b0) * t
+
+        if predicted.any():
+            k = prev[predicted]
+            steps = frames[predicted] - det[k]
+            if self.hold:
+                steps = np.minimum(steps, self.max_predict)
+            else:
+                lost = steps > self.max_predict
+            if self.max_predict > 0:
+                center = pos[k] + vel[k] * steps[:, None]
+                half = (boxes[k, 2:] - boxes[k, :2]) / 2
+                filled = np.hstack([center - half, center + half])
+            else:
+                filled = boxes[k] if self.hold else np.full((k.size, 4), np.nan)
+            if not self.hold:
+                filled[lost] = np.nan
+            out[predicted] = filled
+
+        return [{1: {"bbox": bbox}} if not np.isnan(bbox[0]) else {} for bbox in out.tolist()]
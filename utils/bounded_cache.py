@@ -0,0 +1,109 @@
+"""Dictionary with LRU and TTL eviction for per-track state."""
+from collections import OrderedDict
+import time
+
+
+class BoundedCache:
+    """
+    Mapping that keeps at most max_size entries, each for at most ttl seconds.
+
+    Reads and writes mark an entry as most recently used; inserting past
+    max_size evicts the least recently used one, and entries older than ttl
+    (since last write) are dropped on access. Meant for per-track-ID state on
+    open-ended streams, where track IDs keep appearing and never come back.
+    """
+
+    def __init__(self, max_size=None, ttl=None, clock=time.monotonic):
+        """
+        Initialize bounded cache.
+
+        Args:
+            max_size: Maximum number of entries (None for no limit)
+            ttl: Seconds an entry lives after being written (None for no expiry)
+            clock: Time source used for ttl
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()      # key -> (written_at, value)
+        self.evictions = 0
+
+    def _expired(self, written_at):
+        return self.ttl is not None and self.clock() - written_at > self.ttl
+
+    def _purge(self):
+        """Drop every expired entry."""
+        if self.ttl is None:
+            return
+        for key in [k for k, (t, _) in self._data.items() if self._expired(t)]:
+            del self._data[key]
+            self.evictions += 1
+
+    def __setitem__(self, key, value):
+        self._data[key] = (self.clock(), value)
+        self._data.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __getitem__(self, key):
+        written_at, value = self._data[key]
+        if self._expired(written_at):
+            del self._data[key]
+            self.evictions += 1
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __len__(self):
+        self._purge()
+        return len(self._data)
+
+    def __iter__(self):
+        self._purge()
+        return iter(list(self._data))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def pop(self, key, *default):
+        try:
+            return self._data.pop(key)[1]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [v for _, v in self.items()]
+
+    def items(self):
+        self._purge()
+        return [(k, v) for k, (_, v) in self._data.items()]
+
+    def clear(self):
+        self._data.clear()
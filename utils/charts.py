@@ -0,0 +1,279 @@
+"""Chart inputs derived once from per-player arrays, rendered in parallel and cached by content hash."""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import numpy as np
+
+from .possession_segments import PossessionSegments
+
+# Bump when a plot's look changes so cached images are not reused
+CHART_VERSION = "1"
+
+# Points per speed curve; the curves are smoothed first, so this loses nothing visible
+MAX_CURVE_POINTS = 2000
+
+
+# ------------------- CHART DATA -------------------
+
+def player_summary(series):
+    """
+    Per-player totals from tracks_to_series() arrays, one reduceat per field.
+
+    Speed counts as 0 on frames without one (as the per-frame stats always
+    did); distance is the last value measured.
+
+    Returns:
+        Dict of arrays player_ids, teams, max_speed, avg_speed, distance
+    """
+    ids = series["player_ids"]
+    if len(ids) == 0:
+        empty = np.array([], dtype=np.float64)
+        return {"player_ids": ids, "teams": series["teams"], "max_speed": empty,
+                "avg_speed": empty, "distance": empty}
+
+    starts = series["offsets"][:-1]
+    counts = np.diff(series["offsets"])
+    speed = np.nan_to_num(series["speed"].astype(np.float64), nan=0.0)
+    distance = series["distance"].astype(np.float64)
+
+    measured = np.where(np.isnan(distance), -1, np.arange(len(distance)))
+    last = np.maximum.reduceat(measured, starts)
+    return {
+        "player_ids": ids,
+        "teams": series["teams"],
+        "max_speed": np.maximum.reduceat(speed, starts),
+        "avg_speed": np.add.reduceat(speed, starts) / counts,
+        "distance": np.where(last >= 0, distance[np.maximum(last, 0)], 0.0),
+    }
+
+
+def _smooth(signal, window=9):
+    if len(signal) < window:
+        return signal
+    return np.convolve(signal, np.ones(window) / window, mode="same")
+
+
+def team_metrics(summary, segments):
+    """Radar inputs: possession %, mean player speed and total distance per team."""
+    def avg(values):
+        return float(np.nanmean(values)) if len(values) else 0.0
+
+    metrics = {"labels": ["Possession", "Avg Speed", "Total Distance"]}
+    for team in (1, 2):
+        mask = summary["teams"] == team
+        metrics[f"team{team}"] = [segments.percentage(team), avg(summary["avg_speed"][mask]),
+                                  float(summary["distance"][mask].sum())]
+    return metrics
+
+
+def build_chart_data(series, segments, heatmaps=None, summary=None):
+    """
+    Compact, JSON-serialisable inputs of every chart.
+
+    Args:
+        series: tracks_to_series() arrays
+        segments: PossessionSegments of the match
+        heatmaps: Optional PitchHeatmaps
+        summary: player_summary(series), if already computed
+
+    Returns:
+        Dict with "speed", "distance", "possession", "radar" and (with
+        heatmaps) "heatmap" sections; the plot_* functions draw these and
+        clients can render them directly
+    """
+    if not isinstance(segments, PossessionSegments):
+        segments = PossessionSegments.from_frames(segments)
+    summary = summary if summary is not None else player_summary(series)
+    ids = summary["player_ids"]
+
+    curves = []
+    for i in np.argsort(-summary["max_speed"], kind="stable")[:5]:
+        start, end = series["offsets"][i], series["offsets"][i + 1]
+        speed = _smooth(np.nan_to_num(series["speed"][start:end].astype(np.float64), nan=0.0))
+        step = max(1, -(-len(speed) // MAX_CURVE_POINTS))
+        curves.append({"player": int(ids[i]),
+                       "frames": series["frame"][start:end:step].tolist(),
+                       "speed": np.round(speed[::step], 3).tolist()})
+
+    top = np.argsort(-summary["distance"], kind="stable")[:12]
+    top = top[summary["distance"][top] > 0]
+
+    data = {
+        "speed": {"players": curves},
+        "distance": {"players": ids[top].tolist(), "distance": np.round(summary["distance"][top], 2).tolist()},
+        "possession": {"total_frames": segments.total_frames,
+                       "spans": {"1": segments.spans(1), "2": segments.spans(2)}},
+        "radar": team_metrics(summary, segments),
+    }
+    if heatmaps is not None:
+        heat = heatmaps.summary()
+        data["heatmap"] = {"extent": heat["extent"], "teams": heat["teams"]}
+    return data
+
+
+# ------------------- RENDERING -------------------
+
+def _plotters():
+    # Imported lazily: matplotlib is only needed where charts are drawn
+    from .speed_plot import plot_speed_curves
+    from .distance_plot import plot_distance_bars
+    from .possession_timeline import plot_possession_spans
+    from .team_radar import team_radar
+    from .heatmap_plot import plot_heatmap_grids
+    return {
+        "speed": plot_speed_curves,
+        "distance": plot_distance_bars,
+        "possession": plot_possession_spans,
+        "radar": team_radar,
+        "heatmap": plot_heatmap_grids,
+    }
+
+
+def _placeholder(path):
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(2, 1))
+    plt.text(0.5, 0.5, "No data", ha="center", va="center")
+    plt.axis("off")
+    fig.savefig(path, dpi=120, bbox_inches="tight")
+    plt.close(fig)
+
+
+# pyplot keeps global state; charts drawn in this process are drawn one at a time
+_render_lock = threading.Lock()
+
+
+def _render_local(name, section, path):
+    with _render_lock:
+        return render_chart(name, section, path)
+
+
+def render_chart(name, section, path):
+    """
+    Draw one chart section to path; runs in a pool worker or on a ChartBatch thread.
+
+    Returns:
+        True if drawn, False if plotting failed and a placeholder was written
+    """
+    try:
+        _plotters()[name](section, path)
+        return True
+    except Exception:
+        _placeholder(path)
+        return False
+
+
+def chart_key(name, section):
+    """Content hash of one chart's inputs."""
+    payload = json.dumps([name, CHART_VERSION, section], sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ChartBatch:
+    """
+    Charts rendering in the background while the caller does other work.
+
+    Images whose inputs hash to an entry of cache_dir are copied from there
+    without drawing; the rest are drawn on a background thread and added to
+    the cache. Call result() to wait.
+
+    With more than one worker they are drawn concurrently in a process pool
+    instead (matplotlib holds the GIL, hence processes). Each spawned worker
+    re-imports the caller's __main__ (the pipeline, with YOLO and torch),
+    so by default the pool is only used on hosts with more than two cores,
+    where it overlaps that startup with other charts. A pool that can't
+    start falls back to the thread.
+    """
+
+    def __init__(self, data, paths, cache_dir=None, workers=None):
+        """
+        Start rendering.
+
+        Args:
+            data: build_chart_data() output
+            paths: {chart name: output PNG path} for the charts to draw
+            cache_dir: Directory of rendered images keyed by input hash (None disables)
+            workers: Process pool size; 1 draws in this process. None picks
+                the CPU count on hosts with more than two cores, else 1.
+                Capped at one per chart and the CPU count
+        """
+        self.paths = dict(paths)
+        self.cache_dir = cache_dir
+        self.hits = []
+        self.seconds = 0.0
+        self._started = time.perf_counter()
+        self._finished = self._started
+        self._futures = {}
+
+        todo = {}
+        for name, path in self.paths.items():
+            cached = self._cached_path(name, data[name])
+            if cached and os.path.exists(cached):
+                shutil.copyfile(cached, path)
+                self.hits.append(name)
+            else:
+                todo[name] = (data[name], path, cached)
+        self._finished = time.perf_counter()
+
+        if not todo:
+            return
+        cpus = os.cpu_count() or 1
+        if workers is None:
+            workers = cpus if cpus > 2 else 1
+        workers = min(len(todo), workers, cpus)
+        if workers > 1:
+            pool = None
+            try:
+                # spawn: safe to start from the web server's request threads
+                pool = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+                self._submit(pool, render_chart, todo)
+                return
+            except Exception as e:
+                print(f"⚠️ Chart process pool failed to start ({e}); drawing in-process")
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                self._futures = {}
+        self._submit(ThreadPoolExecutor(max_workers=1), _render_local, todo)
+
+    def _submit(self, pool, func, todo):
+        for name, (section, path, cached) in todo.items():
+            future = pool.submit(func, name, section, path)
+            future.add_done_callback(self._done)
+            self._futures[name] = (future, cached)
+        pool.shutdown(wait=False)
+
+    def _done(self, future):
+        self._finished = max(self._finished, time.perf_counter())
+
+    def _cached_path(self, name, section):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{name}_{chart_key(name, section)[:16]}.png")
+
+    def result(self):
+        """Wait for the remaining charts; returns {chart name: path}."""
+        for name, (future, cached) in self._futures.items():
+            path = self.paths[name]
+            try:
+                drawn = future.result()
+            except Exception as e:
+                # A crashed worker or broken pool costs this chart, not the job
+                print(f"⚠️ Chart {name} failed to render ({e!r}); writing a placeholder")
+                with _render_lock:
+                    _placeholder(path)
+                drawn = False
+            # Placeholders from failed plots are not cached
+            if drawn and cached:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = cached + ".tmp"
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, cached)
+        self._futures = {}
+        # Time the charts took to be ready, not how long the caller was busy meanwhile
+        self.seconds = round(self._finished - self._started, 3)
+        return self.paths
@@ -0,0 +1,56 @@
+"""Crash-safe checkpoint files for long-running passes."""
+import os
+import pickle
+
+
+def load_checkpoint(path):
+    """
+    Load a checkpoint if one exists.
+
+    Args:
+        path: Checkpoint file path (None disables checkpointing)
+
+    Returns:
+        Saved state dict, or None if there is nothing to resume
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+    print(f"↩️ Resuming from checkpoint {path} (frame {state.get('frame_index', 0)})")
+    return state
+
+
+def save_checkpoint(path, state):
+    """
+    Atomically write a checkpoint.
+
+    The state is written to a temporary file and moved into place, so a
+    process killed mid-write leaves the previous checkpoint intact.
+
+    Args:
+        path: Checkpoint file path
+        state: Picklable state dict
+    """
+    if not path:
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def clear_checkpoint(path):
+    """Remove a checkpoint once its pass has completed."""
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -19,7 +19,22 @@ def plot_distance_covered(tracks, save_path):
             d = float(pdata.get("distance", 0.0))
             dist_map[pid] = max(dist_map.get(pid, 0.0), d)
 
-    if not dist_map:
+    # Sort by distance
+    sorted_items = sorted(dist_map.items(), key=lambda x: x[1], reverse=True)
+
+    # Limit to top 12 players for clarity
+    sorted_items = sorted_items[:12]
+
+    plot_distance_bars({"players": [pid for pid, _ in sorted_items],
+                        "distance": [round(d, 2) for _, d in sorted_items]}, save_path)
+
+
+def plot_distance_bars(distance_data, save_path):
+    """
+    Draw prepared per-player distances (already sorted and limited) in the same style.
+    distance_data: {"players": [...], "distance": [...]}
+    """
+    if not distance_data.get("players"):
         fig = plt.figure(figsize=(8, 3))
         plt.text(0.5, 0.5, "No distance data", ha="center", va="center")
         plt.axis("off")
@@ -27,14 +42,8 @@ def plot_distance_covered(tracks, save_path):
         plt.close(fig)
         return
 
-    # Sort by distance
-    sorted_items = sorted(dist_map.items(), key=lambda x: x[1], reverse=True)
-
-    # Limit to top 12 players for clarity
-    sorted_items = sorted_items[:12]
-
-    players = [f"P{pid}" for pid, _ in sorted_items]
-    distances = [round(d, 2) for _, d in sorted_items]
+    players = [f"P{pid}" for pid in distance_data["players"]]
+    distances = distance_data["distance"]
 
     # -----------------------------------------
     # PLOT
@@ -0,0 +1,188 @@
+"""Frame sequence with a bounded RAM window spilling to a memory-mapped file."""
+from collections import OrderedDict
+import mmap
+import os
+import tempfile
+import numpy as np
+
+
+class FrameStore:
+    """
+    Random-access frame sequence held within a memory budget.
+
+    Frames live in an in-RAM LRU window of at most budget_mb. A frame
+    leaving the window is written once to a spill file on local disk, and
+    later reads map it back from there: the bytes are copied out of a
+    memory map and the mapped pages released again, so the resident set
+    stays near the window size however long the clip is. Clips that fit
+    the budget never touch the disk.
+
+    Behaves like the frames list read_video returns (len, indexing,
+    slicing, iteration), so multi-pass stages revisit frames without
+    re-decoding. In-place edits of
+    a returned frame are only kept while it stays in the window; assign it
+    back (store[i] = frame) to make them stick.
+    """
+
+    def __init__(self, budget_mb=2048, spill_dir=None):
+        """
+        Initialize frame store.
+
+        Args:
+            budget_mb: RAM budget for the hot frame window, in MB
+            spill_dir: Directory for the spill file (defaults to the system temp dir)
+        """
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+
+        self.shape = None
+        self.dtype = np.dtype(np.uint8)
+        self.frame_bytes = 0
+        self.hot_frames = 0
+
+        self._hot = OrderedDict()       # index -> frame
+        self._on_disk = set()
+        self._len = 0
+        self._file = None
+        self._path = None
+        self._mm = None
+        self._capacity = 0              # frames the spill file has room for
+
+        self.spilled = 0
+        self.spill_reads = 0
+
+    # ------------------- SPILL FILE -------------------
+
+    def _open_spill(self):
+        fd, self._path = tempfile.mkstemp(prefix="frames_", suffix=".u8", dir=self.spill_dir)
+        self._file = os.fdopen(fd, "r+b", buffering=0)
+        try:
+            # POSIX: the file disappears with the last handle, even after a crash
+            os.unlink(self._path)
+            self._path = None
+        except OSError:
+            pass
+
+    def _ensure_capacity(self, index):
+        if index < self._capacity:
+            return
+        if self._file is None:
+            self._open_spill()
+        if self._mm is not None:
+            self._mm.close()
+        self._capacity = max(index + 1, 2 * self._capacity, 64)
+        self._file.truncate(self._capacity * self.frame_bytes)
+        self._mm = mmap.mmap(self._file.fileno(), self._capacity * self.frame_bytes)
+
+    def _spill(self, index, frame):
+        self._ensure_capacity(index)
+        self._file.seek(index * self.frame_bytes)
+        self._file.write(np.ascontiguousarray(frame).data)
+        self._on_disk.add(index)
+        self.spilled += 1
+
+    def _load(self, index):
+        offset = index * self.frame_bytes
+        view = np.frombuffer(self._mm, dtype=self.dtype, count=self.frame_bytes, offset=offset)
+        frame = view.reshape(self.shape).copy()
+        del view
+        if hasattr(self._mm, "madvise"):
+            # Drop the mapped pages from the resident set; the copy is all we keep
+            start = offset - offset % mmap.PAGESIZE
+            self._mm.madvise(mmap.MADV_DONTNEED, start, offset + self.frame_bytes - start)
+        self.spill_reads += 1
+        return frame
+
+    # ------------------- HOT WINDOW -------------------
+
+    def _keep(self, index, frame):
+        self._hot[index] = frame
+        self._hot.move_to_end(index)
+        while len(self._hot) > self.hot_frames:
+            old_index, old = self._hot.popitem(last=False)
+            if old_index not in self._on_disk:
+                self._spill(old_index, old)
+
+    def _check(self, frame):
+        frame = np.asarray(frame)
+        if self.shape is None:
+            self.shape = frame.shape
+            self.dtype = frame.dtype
+            self.frame_bytes = frame.nbytes
+            self.hot_frames = max(1, self.budget_bytes // max(1, self.frame_bytes))
+        elif frame.shape != self.shape or frame.dtype != self.dtype:
+            raise ValueError(f"Frame of shape {frame.shape} does not match store shape {self.shape}")
+        return frame
+
+    # ------------------- SEQUENCE INTERFACE -------------------
+
+    def append(self, frame):
+        frame = self._check(frame)
+        self._len += 1
+        self._keep(self._len - 1, frame)
+
+    def extend(self, frames):
+        for frame in frames:
+            self.append(frame)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("frame index out of range")
+
+        frame = self._hot.get(index)
+        if frame is not None:
+            self._hot.move_to_end(index)
+            return frame
+        frame = self._load(index)
+        self._keep(index, frame)
+        return frame
+
+    def __setitem__(self, index, frame):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("frame index out of range")
+        frame = self._check(frame)
+        self._on_disk.discard(index)
+        self._keep(index, frame)
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    @property
+    def resident_bytes(self):
+        """Bytes of frames currently held in RAM."""
+        return len(self._hot) * self.frame_bytes
+
+    def close(self):
+        """Release the RAM window and delete the spill file."""
+        self._hot.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
+            self._path = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,51 @@
+# utils/heatmap_plot.py
+import matplotlib.pyplot as plt
+import numpy as np
+plt.switch_backend("Agg")
+
+TEAM_CMAPS = {1: "Greens", 2: "Blues"}
+
+def plot_team_heatmaps(heatmaps, save_path, start=None, end=None):
+    """
+    Side-by-side pitch occupancy heatmaps, one per team.
+    heatmaps: PitchHeatmaps (utils/pitch_heatmaps.py)
+    start, end: optional window in frames (default: whole match)
+    """
+    plot_heatmap_grids({"extent": list(heatmaps.extent),
+                        "teams": {str(t): heatmaps.window(start, end, team=t) for t in heatmaps.teams}},
+                       save_path)
+
+
+def plot_heatmap_grids(heatmap_data, save_path):
+    """
+    Draw prepared team grids.
+    heatmap_data: {"extent": [length, width], "teams": {"1": grid, "2": grid}}
+    """
+    grids = {int(t): np.asarray(g) for t, g in heatmap_data.get("teams", {}).items()}
+
+    if not grids or all(g.sum() == 0 for g in grids.values()):
+        fig = plt.figure(figsize=(8, 3))
+        plt.text(0.5, 0.5, "No position data", ha="center", va="center")
+        plt.axis("off")
+        fig.savefig(save_path, bbox_inches="tight")
+        plt.close(fig)
+        return
+
+    length, width = heatmap_data["extent"]
+    fig, axes = plt.subplots(1, len(grids), figsize=(6 * len(grids), 4.2), squeeze=False)
+    fig.patch.set_facecolor("white")
+
+    for ax, (team, grid) in zip(axes[0], grids.items()):
+        # Share of the team's time per cell, so both teams use the same scale
+        share = grid / max(grid.sum(), 1) * 100
+        im = ax.imshow(np.ma.masked_equal(share, 0), origin="lower", extent=(0, length, 0, width),
+                       cmap=TEAM_CMAPS.get(team, "Oranges"), aspect="auto", interpolation="nearest")
+        ax.add_patch(plt.Rectangle((0, 0), length, width, fill=False, color="#333333", linewidth=1))
+        ax.set_title(f"Team {team} Heatmap", fontsize=12, color="#333333")
+        ax.set_xlabel("Pitch length (m)", fontsize=9)
+        ax.set_ylabel("Pitch width (m)", fontsize=9)
+        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04, label="% of time")
+
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=200, bbox_inches="tight")
+    plt.close(fig)
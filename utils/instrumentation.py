@@ -0,0 +1,212 @@
+"""Stage timers, hot-call counters and opt-in profilers for pipeline runs."""
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+
+# ------------------- PEAK RSS -------------------
+
+def _read_status(field):
+    """A memory field of /proc/self/status in MB, or None off Linux."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS mark (Linux); returns False where that is unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size in MB (since the last reset_peak_rss() on Linux)."""
+    peak = _read_status("VmHWM")
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        peak = peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+    return peak
+
+
+# ------------------- TIMERS AND COUNTERS -------------------
+
+class Instrumentation:
+    """
+    Wall/CPU timers per stage plus call counters around hot functions.
+
+    stage(name) is a context manager yielding a dict that is filled with
+    the block's CPU seconds (all threads) and peak RSS when it exits;
+    StageGraph uses it as its monitor next to its own wall time.
+    hot_calls() temporarily wraps functions such as cv2.putText or
+    KMeans.fit so every call is counted and timed; the wrappers are
+    thread-safe and removed on exit.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.call_seconds = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        stats = {}
+        reset = reset_peak_rss()
+        cpu = time.process_time()
+        try:
+            yield stats
+        finally:
+            stats["cpu_seconds"] = round(time.process_time() - cpu, 3)
+            peak = peak_rss_mb()
+            if peak is not None:
+                # Without a reset the mark is the process-wide peak so far
+                stats["peak_rss_mb" if reset else "process_peak_rss_mb"] = round(peak, 1)
+
+    def _wrap(self, func, name):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.calls[name] += 1
+                    self.call_seconds[name] += elapsed
+        return timed
+
+    @contextmanager
+    def hot_calls(self, targets):
+        """
+        Count and time calls to the given functions while the block runs.
+
+        Args:
+            targets: (owner, attribute, name) triples, e.g.
+                (cv2, "putText", "cv2.putText") or (KMeans, "fit", "KMeans.fit")
+        """
+        patched = []
+        try:
+            for owner, attr, name in targets:
+                if not hasattr(owner, attr):
+                    continue
+                # Remember whether the attribute was inherited, to restore it exactly
+                own = getattr(owner, "__dict__", {})
+                original = own.get(attr)
+                setattr(owner, attr, self._wrap(getattr(owner, attr), name))
+                patched.append((owner, attr, attr in own, original))
+            yield self
+        finally:
+            for owner, attr, was_own, original in reversed(patched):
+                if was_own:
+                    setattr(owner, attr, original)
+                else:
+                    delattr(owner, attr)
+
+    def report(self):
+        """Hot-call totals as {name: {"calls", "seconds", "ms_per_call"}}."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": n,
+                    "seconds": round(self.call_seconds[name], 3),
+                    "ms_per_call": round(self.call_seconds[name] / n * 1000, 3),
+                }
+                for name, n in self.calls.most_common()
+            }
+
+
+# ------------------- PROFILERS -------------------
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler.
+
+    A background thread samples the stacks of all other threads every
+    `interval` seconds; the result is written in the folded-stack format
+    that flamegraph.pl and speedscope read ("a;b;c count" per line).
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(kind, path):
+    """
+    Profile the block and write the result to path.
+
+    Args:
+        kind: "cprofile" (pstats file, open with ``python -m pstats``),
+            "sampling" (folded stacks) or None to do nothing
+        path: Output file
+    """
+    if not kind:
+        yield None
+        return
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    elif kind == "sampling":
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield path
+        finally:
+            profiler.stop()
+            profiler.dump(path)
+    else:
+        raise ValueError(f"Unknown profiler '{kind}', expected 'cprofile' or 'sampling'")
@@ -1,5 +1,10 @@
 # utils/pdf_report.py
+import glob
+import hashlib
+import io
+import json
 import os
+import cv2
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
@@ -7,15 +12,79 @@ from reportlab.lib.utils import ImageReader
 STATIC_OUT = os.path.join("static", "output_videos")
 os.makedirs(STATIC_OUT, exist_ok=True)
 
-def generate_pdf_report(analysis_data, base_name):
+# Analysis fields the report reads; bump REPORT_VERSION when its layout changes
+REPORT_FIELDS = ("fps", "total_frames", "images", "player_stats")
+REPORT_IMAGES = ("speed", "distance", "radar", "possession")
+REPORT_VERSION = "2"
+
+# Charts are drawn about 240 pt wide; 600 px keeps them sharp in print at a fraction of the size
+THUMBNAIL_WIDTH = 600
+
+
+def report_key(analysis_data):
+    """
+    Hash of everything the report shows: the REPORT_FIELDS values and the
+    bytes of the chart images, so a rerun with identical results maps to
+    the same report.
+    """
+    h = hashlib.sha1(REPORT_VERSION.encode("utf-8"))
+    h.update(json.dumps({k: analysis_data.get(k) for k in REPORT_FIELDS}, sort_keys=True, default=str).encode("utf-8"))
+    images = analysis_data.get("images") or {}
+    for key in REPORT_IMAGES:
+        path = images.get(key)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(key.encode("utf-8") + hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+def report_path(base_name, key):
+    return os.path.join(STATIC_OUT, f"report_{base_name}.{key[:16]}.pdf")
+
+
+def cached_pdf_report(analysis_data, base_name):
+    """
+    Return (pdf path, key) of the report, generating it only if no report
+    with the same inputs exists. Older reports of base_name are removed.
+    """
+    key = report_key(analysis_data)
+    pdf_path = report_path(base_name, key)
+    if not os.path.exists(pdf_path):
+        generate_pdf_report(analysis_data, base_name, pdf_path)
+        # report_<base>.<key>.pdf of earlier inputs, and the unkeyed report_<base>.pdf
+        stale = glob.glob(os.path.join(STATIC_OUT, glob.escape(f"report_{base_name}") + ".*pdf"))
+        for path in stale:
+            if os.path.abspath(path) != os.path.abspath(pdf_path):
+                os.remove(path)
+    return pdf_path, key
+
+
+def _thumbnail(path, width=THUMBNAIL_WIDTH):
+    """Chart image downscaled to width pixels, as an in-memory PNG for ImageReader."""
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError(f"Unreadable image: {path}")
+    if img.shape[1] > width:
+        height = max(1, round(img.shape[0] * width / img.shape[1]))
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError(f"Could not encode thumbnail of {path}")
+    return ImageReader(io.BytesIO(buf.tobytes()))
+
+
+def generate_pdf_report(analysis_data, base_name, pdf_path=None):
     """
     Create a simple PDF summarizing key charts and top players.
     analysis_data: dict produced by process_pipeline (analysis JSON)
     base_name: base filename to use
+    pdf_path: output path (default: report_<base_name>.pdf); written
+        atomically, so a concurrent reader never sees a partial file
     Returns path to pdf
     """
-    pdf_path = os.path.join(STATIC_OUT, f"report_{base_name}.pdf")
-    c = canvas.Canvas(pdf_path, pagesize=letter)
+    pdf_path = pdf_path or os.path.join(STATIC_OUT, f"report_{base_name}.pdf")
+    tmp_path = pdf_path + ".tmp"
+    c = canvas.Canvas(tmp_path, pagesize=letter)
     w, h = letter
 
     # Title
@@ -37,7 +106,7 @@ def generate_pdf_report(analysis_data, base_name):
         p = imgs.get(key)
         if p and os.path.exists(p):
             try:
-                img = ImageReader(p)
+                img = _thumbnail(p)
                 c.drawImage(img, x, y0 - 140, width=240, height=120, preserveAspectRatio=True)
             except Exception:
                 pass
@@ -48,12 +117,12 @@ def generate_pdf_report(analysis_data, base_name):
     poss = imgs.get("possession")
     if radar and os.path.exists(radar):
         try:
-            c.drawImage(ImageReader(radar), 40, y - 140, width=240, height=140, preserveAspectRatio=True)
+            c.drawImage(_thumbnail(radar), 40, y - 140, width=240, height=140, preserveAspectRatio=True)
         except Exception:
             pass
     if poss and os.path.exists(poss):
         try:
-            c.drawImage(ImageReader(poss), 300, y - 140, width=240, height=140, preserveAspectRatio=True)
+            c.drawImage(_thumbnail(poss), 300, y - 140, width=240, height=140, preserveAspectRatio=True)
         except Exception:
             pass
 
@@ -72,6 +141,7 @@ def generate_pdf_report(analysis_data, base_name):
 
     c.showPage()
     c.save()
+    os.replace(tmp_path, pdf_path)
     return pdf_path
 
 # optional helper used in pipeline for generating a small prepped object (not required)
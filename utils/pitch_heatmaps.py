@@ -0,0 +1,128 @@
+"""Pitch occupancy grids with cumulative sums for O(grid) time-window heatmaps."""
+import numpy as np
+
+
+class PitchHeatmaps:
+    """
+    Occupancy grids of the pitch per team, queryable over any time window.
+
+    All player positions are binned with a single np.bincount over a
+    combined (time step, team, row, column) index. The per-step grids are
+    then prefix-summed along time, so the heatmap of any interval is the
+    difference of two cumulative grids: O(grid) instead of a rescan of the
+    positions. Windows are resolved to whole steps of step_frames.
+    """
+
+    def __init__(self, cumulative, teams, extent, step_frames, fps=25):
+        """
+        Initialize heatmaps (use from_positions/from_series to build them).
+
+        Args:
+            cumulative: (steps + 1, teams, rows, cols) prefix sums of frame counts
+            teams: Team number of each grid along axis 1
+            extent: (length, width) of the pitch area in meters
+            step_frames: Frames per time step
+            fps: Frame rate, for windows given in seconds
+        """
+        self.cumulative = cumulative
+        self.teams = [int(t) for t in teams]
+        self.extent = tuple(extent)
+        self.step_frames = int(step_frames)
+        self.fps = fps
+
+    @classmethod
+    def from_positions(cls, frames, x, y, team, extent, bins=(32, 20), step_frames=250,
+                       total_frames=None, teams=(1, 2), fps=25):
+        """
+        Bin per-observation positions into cumulative team grids.
+
+        Args:
+            frames: Frame index of each observation
+            x: Pitch x (along the length) in meters, NaN if unknown
+            y: Pitch y (across the width) in meters, NaN if unknown
+            team: Team of each observation
+            extent: (length, width) of the pitch area in meters
+            bins: (cols, rows) of the grid
+            step_frames: Time resolution of window queries, in frames
+            total_frames: Frames of the match (defaults to the last observation)
+            teams: Teams to keep a grid for
+            fps: Frame rate
+        """
+        cols, rows = bins
+        length, width = extent
+        frames = np.asarray(frames, dtype=np.int64)
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        team = np.asarray(team, dtype=np.int64)
+        if total_frames is None:
+            total_frames = int(frames.max()) + 1 if frames.size else 0
+        steps = max(1, -(-int(total_frames) // step_frames))
+
+        slot = np.full(len(team), -1, dtype=np.int64)
+        for i, t in enumerate(teams):
+            slot[team == t] = i
+
+        ix = np.floor(x / length * cols)
+        iy = np.floor(y / width * rows)
+        valid = (slot >= 0) & (ix >= 0) & (ix < cols) & (iy >= 0) & (iy < rows) & (frames < steps * step_frames)
+        key = ((frames[valid] // step_frames * len(teams) + slot[valid]) * rows
+               + iy[valid].astype(np.int64)) * cols + ix[valid].astype(np.int64)
+
+        counts = np.bincount(key, minlength=steps * len(teams) * rows * cols)
+        counts = counts.reshape(steps, len(teams), rows, cols)
+        cumulative = np.zeros((steps + 1, len(teams), rows, cols), dtype=np.int32)
+        np.cumsum(counts, axis=0, out=cumulative[1:])
+        return cls(cumulative, teams, extent, step_frames, fps)
+
+    @classmethod
+    def from_series(cls, series, extent, **kwargs):
+        """Build from analysis_store.tracks_to_series()/load_series() arrays."""
+        team = np.repeat(series["teams"].astype(np.int64), np.diff(series["offsets"]))
+        return cls.from_positions(series["frame"], series["x"], series["y"], team, extent, **kwargs)
+
+    @property
+    def shape(self):
+        """(rows, cols) of each grid."""
+        return self.cumulative.shape[2:]
+
+    def window(self, start=None, end=None, team=None, seconds=False):
+        """
+        Occupancy grid (frames spent per cell) over [start, end).
+
+        Args:
+            start: Window start (frames, or seconds with seconds=True); None = kick-off
+            end: Window end (exclusive); None = end of match
+            team: Team number, or None for all players
+
+        Returns:
+            (rows, cols) int array, row 0 at y = 0
+        """
+        scale = self.fps if seconds else 1
+        steps = self.cumulative.shape[0] - 1
+        s = 0 if start is None else int(np.clip(start * scale // self.step_frames, 0, steps))
+        e = steps if end is None else int(np.clip(-(-end * scale // self.step_frames), s, steps))
+        grid = self.cumulative[e] - self.cumulative[s]
+        if team is None:
+            return grid.sum(axis=0)
+        return grid[self.teams.index(int(team))]
+
+    def summary(self):
+        """Full-match grids per team, JSON-serialisable, for the analysis output."""
+        return {
+            "extent": list(self.extent),
+            "shape": list(self.shape),
+            "step_frames": self.step_frames,
+            "teams": {str(t): self.window(team=t).tolist() for t in self.teams},
+        }
+
+    def arrays(self):
+        """Cumulative grids for the analysis .npz (see from_arrays)."""
+        return {
+            "heatmap_cumulative": self.cumulative,
+            "heatmap_teams": np.asarray(self.teams, dtype=np.int64),
+            "heatmap_meta": np.asarray([*self.extent, self.step_frames, self.fps], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        length, width, step_frames, fps = arrays["heatmap_meta"]
+        return cls(arrays["heatmap_cumulative"], arrays["heatmap_teams"], (length, width), step_frames, fps)
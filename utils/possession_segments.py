@@ -0,0 +1,112 @@
+"""Run-length possession segments derived from per-frame possession arrays."""
+import numpy as np
+
+
+class PossessionSegments:
+    """
+    Possession as contiguous segments instead of per-frame lists.
+
+    A segment is a maximal run of frames with the same controlling team and
+    ball owner; ``end`` is exclusive. Segments are built with one vectorized
+    pass over the per-frame arrays, after which percentages, streaks,
+    possession changes and the timeline chart are all O(segments).
+    """
+
+    def __init__(self, start, end, team, owner, total_frames=None):
+        """
+        Initialize possession segments.
+
+        Args:
+            start: Segment start frames
+            end: Segment end frames (exclusive)
+            team: Controlling team per segment (0 = nobody yet)
+            owner: Ball owner track id per segment (-1 = unassigned)
+            total_frames: Frames covered (defaults to the last end)
+        """
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.team = np.asarray(team, dtype=np.int64)
+        self.owner = np.asarray(owner, dtype=np.int64)
+        if total_frames is None:
+            total_frames = self.end[-1] if len(self.end) else 0
+        self.total_frames = int(total_frames)
+
+    @classmethod
+    def from_frames(cls, team_ball_control, ball_owner=None):
+        """
+        Build segments from per-frame arrays.
+
+        Args:
+            team_ball_control: Controlling team per frame
+            ball_owner: Optional ball owner per frame (-1 when unassigned);
+                without it segments split on team changes only
+        """
+        team = np.asarray(team_ball_control, dtype=np.int64)
+        n = len(team)
+        if n == 0:
+            return cls([], [], [], [], 0)
+        owner = np.full(n, -1, dtype=np.int64) if ball_owner is None else np.asarray(ball_owner, dtype=np.int64)
+
+        change = np.empty(n, dtype=bool)
+        change[0] = True
+        change[1:] = (team[1:] != team[:-1]) | (owner[1:] != owner[:-1])
+        start = np.flatnonzero(change)
+        end = np.r_[start[1:], n]
+        return cls(start, end, team[start], owner[start], n)
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def durations(self):
+        return self.end - self.start
+
+    def to_frames(self):
+        """Per-frame (team, owner) arrays, the inverse of from_frames."""
+        return np.repeat(self.team, self.durations), np.repeat(self.owner, self.durations)
+
+    # ------------------- TEAM RUNS -------------------
+
+    def team_runs(self):
+        """
+        Merge adjacent segments of the same team (owner changes within a team are passes).
+
+        Returns:
+            (start, end, team) arrays of the team-level runs
+        """
+        if len(self) == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty
+        first = np.r_[True, self.team[1:] != self.team[:-1]]
+        idx = np.flatnonzero(first)
+        return self.start[idx], np.r_[self.start[idx[1:]], self.end[-1]], self.team[idx]
+
+    def frames(self, team):
+        """Frames controlled by team."""
+        return int(self.durations[self.team == team].sum())
+
+    def percentage(self, team):
+        """Share of all frames controlled by team, in percent."""
+        return 100.0 * self.frames(team) / self.total_frames if self.total_frames else 0.0
+
+    def longest_streak(self, team):
+        """Longest uninterrupted control by team, in frames."""
+        start, end, teams = self.team_runs()
+        lengths = (end - start)[teams == team]
+        return int(lengths.max()) if lengths.size else 0
+
+    def changes(self):
+        """Times possession passed from one team to the other (gaps with team 0 ignored)."""
+        _, _, teams = self.team_runs()
+        teams = teams[teams > 0]
+        return int(np.count_nonzero(teams[1:] != teams[:-1]))
+
+    def spans(self, team):
+        """(start, length) pairs of the team's runs, as matplotlib's broken_barh expects."""
+        start, end, teams = self.team_runs()
+        mask = teams == team
+        return list(zip(start[mask].tolist(), (end - start)[mask].tolist()))
+
+    def to_dict(self):
+        return {"start": self.start.tolist(), "end": self.end.tolist(),
+                "team": self.team.tolist(), "owner": self.owner.tolist()}
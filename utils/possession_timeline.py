@@ -1,18 +1,32 @@
 # utils/possession_timeline.py
 import matplotlib.pyplot as plt
-import numpy as np
+from .possession_segments import PossessionSegments
 plt.switch_backend("Agg")
 
 def plot_possession_timeline(team_control, save_path):
     """
-    Creates clean rectangular-style possession blocks:
+    Creates clean rectangular-style possession blocks from per-frame team
+    control or PossessionSegments:
     - Green = Team 1
     - Blue = Team 2
     - Matches the screenshot style provided
     """
-    arr = np.array(team_control, dtype=int)
+    segments = team_control
+    if not isinstance(segments, PossessionSegments):
+        segments = PossessionSegments.from_frames(team_control)
+    plot_possession_spans({"total_frames": segments.total_frames,
+                           "spans": {"1": segments.spans(1), "2": segments.spans(2)}}, save_path)
 
-    if arr.size == 0:
+
+def plot_possession_spans(possession_data, save_path):
+    """
+    Draw the timeline from prepared spans.
+    possession_data: {"total_frames": n, "spans": {"1": [[start, length], ...], "2": [...]}}
+    """
+    total_frames = possession_data.get("total_frames", 0)
+    spans = possession_data.get("spans", {})
+
+    if total_frames == 0:
         fig = plt.figure(figsize=(10, 2))
         plt.text(0.5, 0.5, "No possession data", ha="center", va="center")
         plt.axis("off")
@@ -20,39 +34,15 @@ def plot_possession_timeline(team_control, save_path):
         plt.close(fig)
         return
 
-    x = np.arange(len(arr))
-
-    # Identify blocks (rectangles)
-    team1_mask = arr == 1
-    team2_mask = arr == 2
-
     # Create figure similar to screenshot
     fig, ax = plt.subplots(figsize=(14, 2.8))
 
     ax.set_facecolor("white")
     fig.patch.set_facecolor("white")
 
-    # Draw TEAM 1 rectangles
-    start = None
-    for i in range(len(arr)):
-        if team1_mask[i] and start is None:
-            start = i
-        if (not team1_mask[i] or i == len(arr) - 1) and start is not None:
-            end = i if not team1_mask[i] else i + 1
-            ax.fill_between(range(start, end), 0.6, 1.3,
-                            color="#00cc66", alpha=0.45)
-            start = None
-
-    # Draw TEAM 2 rectangles
-    start = None
-    for i in range(len(arr)):
-        if team2_mask[i] and start is None:
-            start = i
-        if (not team2_mask[i] or i == len(arr) - 1) and start is not None:
-            end = i if not team2_mask[i] else i + 1
-            ax.fill_between(range(start, end), 1.7, 2.4,
-                            color="#4ac0ff", alpha=0.45)
-            start = None
+    # One broken_barh collection per team instead of one patch per block
+    ax.broken_barh(spans.get("1", []), (0.6, 0.7), facecolors="#00cc66", alpha=0.45)
+    ax.broken_barh(spans.get("2", []), (1.7, 0.7), facecolors="#4ac0ff", alpha=0.45)
 
     # Y axis labels like screenshot
     ax.set_yticks([1.0, 2.0])
@@ -61,7 +51,7 @@ def plot_possession_timeline(team_control, save_path):
     ax.set_xlabel("Frames", fontsize=10)
     ax.set_title("Ball Possession Timeline", fontsize=12)
 
-    ax.set_xlim(0, len(arr))
+    ax.set_xlim(0, total_frames)
     ax.set_ylim(0.5, 2.6)
 
     # Remove borders for a clean card look
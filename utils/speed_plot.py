@@ -27,14 +27,6 @@ def plot_player_speed(tracks, save_path):
             sp = float(pdata.get("speed", 0.0))
             players.setdefault(pid, []).append(sp)
 
-    if not players:
-        fig = plt.figure(figsize=(10, 3))
-        plt.text(0.5, 0.5, "No speed data", ha="center", va="center")
-        plt.axis("off")
-        fig.savefig(save_path, bbox_inches="tight")
-        plt.close(fig)
-        return
-
     # -----------------------------------------
     # Compute max speed for ranking players
     # -----------------------------------------
@@ -42,7 +34,27 @@ def plot_player_speed(tracks, save_path):
 
     # pick top 5 fastest players
     top_players = sorted(max_speeds.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_ids = [pid for pid, _ in top_players]
+    curves = [
+        {"player": pid, "frames": list(range(len(players[pid]))),
+         "speed": smooth(np.array(players[pid]), window=9).tolist()}
+        for pid, _ in top_players
+    ]
+    plot_speed_curves({"players": curves}, save_path)
+
+
+def plot_speed_curves(speed_data, save_path):
+    """
+    Draw prepared (already smoothed) speed curves in the same style.
+    speed_data: {"players": [{"player", "frames", "speed"}, ...]}
+    """
+    curves = speed_data.get("players", [])
+    if not curves:
+        fig = plt.figure(figsize=(10, 3))
+        plt.text(0.5, 0.5, "No speed data", ha="center", va="center")
+        plt.axis("off")
+        fig.savefig(save_path, bbox_inches="tight")
+        plt.close(fig)
+        return
 
     # -----------------------------------------
     # Modern UI color palette (neon cyan/green/purple/orange)
@@ -61,15 +73,11 @@ def plot_player_speed(tracks, save_path):
     # soft grey grid
     ax.grid(True, color="#cccccc", alpha=0.4, linewidth=0.6)
 
-    for idx, pid in enumerate(top_ids):
-        arr = players[pid]
-
-        # smooth line
-        arr_smooth = smooth(np.array(arr), window=9)
-
+    for idx, curve in enumerate(curves):
         ax.plot(
-            arr_smooth,
-            label=f"Player {pid}",
+            curve["frames"],
+            curve["speed"],
+            label=f"Player {curve['player']}",
             linewidth=2.2,
             color=colors[idx % len(colors)],
             alpha=0.95
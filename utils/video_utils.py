@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 import os
+import re
+import shutil
 import subprocess
 from pathlib import Path
 
@@ -43,14 +45,37 @@ def read_video_batched(video_path, batch_size=32, max_frames=None):
 # -----------------------------------
 # READ VIDEO (FULL)
 # -----------------------------------
-def read_video(video_path, max_frames=None):
-    """Loads full video with safe memory usage."""
+def scaled_size(width, height, scale):
+    """(width, height) of frames downsized by scale, rounded to even numbers for H264."""
+    if scale == 1.0:
+        return (width, height)
+    return (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2))
+
+def read_video(video_path, max_frames=None, start_frame=0, scale=1.0, stride=1, into=None):
+    """
+    Loads full video (or max_frames from start_frame) with safe memory usage.
+
+    scale < 1 downsizes every frame (to even dimensions, as H264 requires)
+    and stride > 1 keeps only every stride-th frame; skipped frames are
+    grabbed without being converted. max_frames counts kept frames.
+    Frames are appended to `into` (e.g. a FrameStore) when given, instead
+    of a new list.
+    """
+    frames = [] if into is None else into
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         print(f"❌ Error: Could not open video file {video_path}")
-        return []
+        return frames
+
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    size = None
+    if scale != 1.0:
+        size = scaled_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), scale)
 
-    frames = []
     frame_count = 0
     
     while True:
@@ -58,11 +83,17 @@ def read_video(video_path, max_frames=None):
         if not ret:
             break
         
+        if size is not None:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
         frames.append(frame)
         frame_count += 1
         
         if max_frames and frame_count >= max_frames:
             break
+
+        for _ in range(stride - 1):
+            if not cap.grab():
+                break
     
     cap.release()
     print(f"✅ Read {len(frames)} frames from {video_path}")
@@ -122,14 +153,342 @@ def save_video_optimized(output_frames, output_video_path, fps=24):
     print(f"✅ Browser-compatible MP4 saved: {output_video_path} ({frame_count} frames)")
     return True
 
+# -----------------------------------
+# SAVE VIDEO (RESUMABLE)
+# -----------------------------------
+def save_video_resumable(output_frames, output_video_path, fps=24,
+                         checkpoint_path=None, part_frames=1000):
+    """
+    Save video in fixed-size MJPG parts so an interrupted encode can resume.
+
+    - Step 1: Write MJPG AVI parts of part_frames frames next to the output;
+      the checkpoint records every completed part
+    - Step 2: Join the parts with the ffmpeg concat demuxer into H264 MP4
+
+    On resume, frames covered by completed parts are consumed from
+    output_frames without being written again. If ffmpeg fails, the parts
+    and checkpoint are kept so the next run only repeats Step 2.
+    """
+    if not output_video_path.endswith(".mp4"):
+        output_video_path = output_video_path.rsplit(".", 1)[0] + ".mp4"
+
+    from .checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+
+    parts_dir = output_video_path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+
+    state = load_checkpoint(checkpoint_path) or {"frame_index": 0, "parts": []}
+    parts = [p for p in state["parts"] if os.path.exists(p)]
+    done = state["frame_index"] if len(parts) == len(state["parts"]) else 0
+    if not done:
+        parts = []
+
+    out = None
+    part_path = None
+    part_count = 0
+    frame_count = 0
+
+    # STEP 1 — Write AVI parts, skipping frames already checkpointed
+    for frame in output_frames:
+        frame_count += 1
+        if frame_count <= done:
+            continue
+
+        if out is None:
+            height, width = frame.shape[:2]
+            part_path = os.path.join(parts_dir, f"part_{len(parts):05d}.avi")
+            fourcc = cv2.VideoWriter_fourcc(*"MJPG")
+            out = cv2.VideoWriter(part_path, fourcc, fps, (width, height))
+
+            if not out.isOpened():
+                raise RuntimeError("Cannot initialize AVI VideoWriter")
+
+        out.write(frame)
+        part_count += 1
+
+        if part_count >= part_frames:
+            out.release()
+            out = None
+            part_count = 0
+            parts.append(part_path)
+            save_checkpoint(checkpoint_path, {"frame_index": frame_count, "parts": parts})
+
+    if out:
+        out.release()
+        parts.append(part_path)
+        save_checkpoint(checkpoint_path, {"frame_index": frame_count, "parts": parts})
+
+    print(f"🔄 Joining {len(parts)} AVI parts → MP4 (H264)...")
+
+    # STEP 2 — Concatenate parts and encode H264
+    list_path = os.path.join(parts_dir, "parts.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in parts:
+            f.write(f"file '{os.path.abspath(p)}'\n")
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0",
+        "-i", list_path,
+        "-vcodec", "libx264",
+        "-pix_fmt", "yuv420p",
+        output_video_path
+    ]
+
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed, parts kept for resume: {proc.stderr.decode(errors='ignore')[-500:]}")
+
+    for p in parts:
+        os.remove(p)
+    os.remove(list_path)
+    os.rmdir(parts_dir)
+    clear_checkpoint(checkpoint_path)
+
+    print(f"✅ Browser-compatible MP4 saved: {output_video_path} ({frame_count} frames)")
+    return True
+
+# -----------------------------------
+# SAVE VIDEO (SEGMENT-PARALLEL H264)
+# -----------------------------------
+def _start_segment_encoder(segment_path, width, height, fps, hls_path=None, start_frame=0, crf=None):
+    """
+    Spawn an ffmpeg process encoding raw BGR frames from stdin into one H264 segment.
+
+    With an hls_path, the same encode is also muxed to an MPEG-TS segment
+    through the tee muxer. Only the TS output is time-shifted to its position
+    in the video; the MP4 segment starts at 0 so that the stream-copy concat
+    gets monotonic timestamps.
+    """
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24",
+        "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "-",
+        "-vcodec", "libx264",
+        "-pix_fmt", "yuv420p",
+    ]
+    if crf is not None:
+        cmd += ["-crf", str(crf)]
+    if hls_path:
+        # Forward slashes: the tee muxer treats backslashes as escapes
+        offset = f"{start_frame / fps:.6f}"
+        targets = f"[f=mpegts:output_ts_offset={offset}]{hls_path}|[f=mp4]{segment_path}".replace("\\", "/")
+        cmd += ["-map", "0:v", "-f", "tee", targets]
+    else:
+        cmd.append(segment_path)
+    log = open(segment_path + ".log", "wb")
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log)
+    return proc, log
+
+
+def _finish_segment_encoder(proc, log, segment_path):
+    proc.wait()
+    log.close()
+    if proc.returncode != 0:
+        with open(segment_path + ".log", "rb") as f:
+            err = f.read().decode(errors="ignore")[-500:]
+        raise RuntimeError(f"ffmpeg failed on segment {segment_path}: {err}")
+    os.remove(segment_path + ".log")
+
+
+def _probe_duration(path):
+    """Container duration in seconds as reported by ffmpeg, or None."""
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", path],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    m = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", proc.stderr.decode(errors="ignore"))
+    if not m:
+        return None
+    h, mnt, s = m.groups()
+    return int(h) * 3600 + int(mnt) * 60 + float(s)
+
+
+def _write_hls_playlist(hls_dir, segments, fps, segment_frames, ended=False):
+    """Atomically rewrite the EVENT playlist listing the finished segments."""
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+        f"#EXT-X-TARGETDURATION:{int(np.ceil(segment_frames / fps))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for path, n in segments:
+        lines.append(f"#EXTINF:{n / fps:.3f},")
+        lines.append(os.path.splitext(os.path.basename(path))[0] + ".ts")
+    if ended:
+        lines.append("#EXT-X-ENDLIST")
+
+    playlist = os.path.join(hls_dir, "index.m3u8")
+    with open(playlist + ".tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(playlist + ".tmp", playlist)
+
+
+def save_video_segmented(output_frames, output_video_path, fps=24, segment_frames=250,
+                         workers=None, expected_frames=None, checkpoint_path=None,
+                         hls_dir=None, crf=None):
+    """
+    Save video by encoding fixed-length segments in parallel ffmpeg processes.
+
+    - Step 1: Frames are piped raw into one ffmpeg process per segment of
+      segment_frames frames. Each segment starts with an IDR frame, so
+      segment boundaries are GOP-aligned. A finished segment keeps encoding
+      in the background while the next one is fed; at most `workers`
+      encoders run at once.
+    - Step 2: Segments are joined with the ffmpeg concat demuxer using
+      stream copy (no re-encode).
+    - Step 3: Frame count, frame rate and duration of the result are
+      verified against the frames fed in and fps, which should be the
+      source's exact (e.g. 29.97) rate. expected_frames (e.g. the
+      container's CAP_PROP_FRAME_COUNT, which is only an estimate for many
+      formats) is checked too, but a mismatch only prints a warning.
+
+    With a checkpoint_path, completed segments are recorded and skipped on
+    resume, like save_video_resumable.
+
+    With an hls_dir, every segment is also written there as MPEG-TS and an
+    HLS playlist (index.m3u8) is updated as each one finishes, so the video
+    can be played while the rest is still being encoded. The HLS segments
+    are kept after the MP4 is joined.
+
+    crf overrides libx264's default quality (23); higher means smaller files.
+    """
+    if not output_video_path.endswith(".mp4"):
+        output_video_path = output_video_path.rsplit(".", 1)[0] + ".mp4"
+
+    from collections import deque
+    from .checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+
+    workers = workers or os.cpu_count() or 1
+    seg_dir = output_video_path + ".segments"
+    os.makedirs(seg_dir, exist_ok=True)
+    if hls_dir:
+        os.makedirs(hls_dir, exist_ok=True)
+
+    state = load_checkpoint(checkpoint_path) or {}
+    segments = state.get("segments", [])
+    if not all(os.path.exists(p) for p, _ in segments):
+        segments = []
+    done = sum(n for _, n in segments)
+    if hls_dir:
+        _write_hls_playlist(hls_dir, segments, fps, segment_frames)
+
+    running = deque()
+    current = None
+    current_count = 0
+    frame_count = 0
+
+    def finish_oldest():
+        proc, log, path, n = running.popleft()
+        _finish_segment_encoder(proc, log, path)
+        segments.append((path, n))
+        save_checkpoint(checkpoint_path, {"segments": segments})
+        if hls_dir:
+            _write_hls_playlist(hls_dir, segments, fps, segment_frames)
+
+    # STEP 1 — Feed segments to parallel encoders
+    try:
+        for frame in output_frames:
+            frame_count += 1
+            if frame_count <= done:
+                continue
+
+            if current is None:
+                while len(running) >= workers:
+                    finish_oldest()
+                height, width = frame.shape[:2]
+                name = f"seg_{len(segments) + len(running):05d}"
+                path = os.path.join(seg_dir, name + ".mp4")
+                hls_path = os.path.join(hls_dir, name + ".ts") if hls_dir else None
+                proc, log = _start_segment_encoder(path, width, height, fps, hls_path, frame_count - 1, crf)
+                current = (proc, log, path)
+
+            current[0].stdin.write(np.ascontiguousarray(frame).data)
+            current_count += 1
+
+            if current_count >= segment_frames:
+                current[0].stdin.close()
+                running.append(current + (current_count,))
+                current = None
+                current_count = 0
+
+        if current is not None:
+            current[0].stdin.close()
+            running.append(current + (current_count,))
+            current = None
+
+        while running:
+            finish_oldest()
+    finally:
+        # On error, do not leave orphaned encoders behind
+        if current is not None:
+            current[0].kill()
+            current[1].close()
+        for proc, log, _, _ in running:
+            proc.kill()
+            log.close()
+
+    print(f"🔄 Joining {len(segments)} H264 segments (stream copy)...")
+
+    # STEP 2 — Concatenate without re-encoding
+    list_path = os.path.join(seg_dir, "segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p, _ in segments:
+            f.write(f"file '{os.path.abspath(p)}'\n")
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0",
+        "-i", list_path,
+        "-c", "copy",
+        "-movflags", "+faststart",
+        output_video_path
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed, segments kept for resume: {proc.stderr.decode(errors='ignore')[-500:]}")
+
+    # STEP 3 — Verify frame count and timing
+    info = get_video_info(output_video_path) or {}
+    written = sum(n for _, n in segments)
+    if info.get("total_frames") != written:
+        raise RuntimeError(f"Segmented encode has {info.get('total_frames')} frames, expected {written}")
+    if abs(float(info.get("fps", 0)) - float(fps)) > float(fps) * 1e-3:
+        raise RuntimeError(f"Segmented encode runs at {info.get('fps')} fps, expected {fps}")
+    duration = _probe_duration(output_video_path)
+    # ffmpeg prints the duration in centiseconds; allow that plus one frame
+    if duration is not None and abs(duration - written / fps) > 1 / fps + 0.01:
+        raise RuntimeError(f"Segmented encode lasts {duration:.2f}s, expected {written / fps:.2f}s")
+    if written != frame_count:
+        raise RuntimeError(f"Encoded {written} frames but {frame_count} were rendered")
+    if expected_frames is not None and written != expected_frames:
+        print(f"⚠️ Encoded {written} frames; the source header reports {expected_frames}")
+
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    if hls_dir:
+        _write_hls_playlist(hls_dir, segments, fps, segment_frames, ended=True)
+    clear_checkpoint(checkpoint_path)
+
+    print(f"✅ Browser-compatible MP4 saved: {output_video_path} ({written} frames, {len(segments)} segments)")
+    return True
+
 # -----------------------------------
 # COMPATIBILITY WRAPPER
 # -----------------------------------
-def save_video(output_frames, output_video_path, fps=24):
+def save_video(output_frames, output_video_path, fps=24, checkpoint_path=None,
+               segmented=False, **segment_options):
     """
     Backwards compatible wrapper.
-    Always produces browser-friendly MP4 output.
+    Always produces browser-friendly MP4 output; with a checkpoint_path the
+    encode is resumable (see save_video_resumable), and segmented=True
+    encodes segments in parallel (see save_video_segmented).
     """
+    if segmented:
+        return save_video_segmented(output_frames, output_video_path, fps=fps,
+                                    checkpoint_path=checkpoint_path, **segment_options)
+    if checkpoint_path:
+        return save_video_resumable(output_frames, output_video_path, fps=fps,
+                                    checkpoint_path=checkpoint_path)
     return save_video_optimized(output_frames, output_video_path, fps=fps)
 
 # -----------------------------------
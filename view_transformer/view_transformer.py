@@ -1,34 +1,31 @@
 """Perspective transformation for converting pixel coordinates to meters."""
 import numpy as np
 import cv2
+import sys
+sys.path.append('../')
+from calibration import get_profile
 
 
 class ViewTransformer:
     """Transform pixel coordinates to real-world coordinates."""
     
-    def __init__(self):
-        """Initialize view transformer."""
-        court_width = 68
-        court_length = 23.32
-        
-        self.pixel_vertices = np.array([
-            [110, 1035],
-            [265, 275],
-            [910, 260],
-            [1640, 915]
-        ])
+    def __init__(self, frame_size=(1920, 1080), profile=None):
+        """
+        Initialize view transformer.
         
-        self.target_vertices = np.array([
-            [0, court_width],
-            [0, 0],
-            [court_length, 0],
-            [court_length, court_width]
-        ])
+        Args:
+            frame_size: (width, height) of the frames the track positions
+                were measured on
+            profile: CalibrationProfile or profile name (default camera setup)
+        """
+        self.profile = get_profile(profile)
+        self.frame_size = tuple(frame_size)
         
-        self.pixel_vertices = self.pixel_vertices.astype(np.float32)
-        self.target_vertices = self.target_vertices.astype(np.float32)
+        self.pixel_vertices = self.profile.pixel_vertices(self.frame_size)
+        self.target_vertices = self.profile.target_vertices
         
-        self.perspective_transformer = cv2.getPerspectiveTransform(self.pixel_vertices, self.target_vertices)
+        # Derived from the profile's precomputed normalized homography
+        self.perspective_transformer = self.profile.homography(self.frame_size)
     
     
     def transform_points_batch(self, points):